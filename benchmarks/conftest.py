@@ -0,0 +1,17 @@
+import os
+import pytest
+from dh5io.synthetic import SyntheticConfig, generate_session
+
+# size of the CONT data of the benchmark session, override with DH5_BENCH_MB
+BENCH_MB = int(os.environ.get("DH5_BENCH_MB", "64"))
+
+
+@pytest.fixture(scope="session")
+def session_config() -> SyntheticConfig:
+    return SyntheticConfig.for_size(BENCH_MB * 2**20, n_cont=2, n_channels=16, n_regions=50)
+
+
+@pytest.fixture(scope="session")
+def session_file(tmp_path_factory, session_config):
+    filename = tmp_path_factory.mktemp("bench") / "session.dh5"
+    return generate_session(filename, session_config)
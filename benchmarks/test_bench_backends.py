@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from dh5io.reader import open_session
+
+pytest.importorskip("zarr")
+from dhzio.convert import dh5_to_dhz  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def session_paths(tmp_path_factory, session_file):
+    folder = tmp_path_factory.mktemp("bench_dhz") / "session.dhz"
+    dh5_to_dhz(session_file, folder)
+    return {"dh5": session_file, "dhz": folder}
+
+
+@pytest.mark.parametrize("backend", ["dh5", "dhz"])
+def test_open_and_list(benchmark, session_paths, backend):
+    def open_and_list():
+        with open_session(session_paths[backend]) as session:
+            return session.cont_ids()
+
+    assert benchmark(open_and_list) == [1, 2]
+
+
+@pytest.mark.parametrize("backend", ["dh5", "dhz"])
+def test_read_cont_windows(benchmark, session_paths, backend):
+    # the same 100 windows of 1 s through the storage-agnostic reader
+    with open_session(session_paths[backend]) as session:
+        regions = session.regions(1)
+        rng = np.random.default_rng(0)
+        starts = rng.choice(regions["time"], 100) * 1e-9
+
+        def read_windows():
+            return [session.read_cont(1, t, t + 1.0) for t in starts]
+
+        windows = benchmark(read_windows)
+    assert len(windows) == 100
+
+
+@pytest.mark.parametrize("backend", ["dh5", "dhz"])
+def test_spike_queries(benchmark, session_paths, backend):
+    with open_session(session_paths[backend]) as session:
+        spike_id = session.spike_ids()[0]
+        trials = session.trialmap()
+
+        def spikes_per_trial():
+            return [
+                session.read_spikes(spike_id, int(start), int(end))
+                for start, end in zip(trials["StartTime"], trials["EndTime"])
+            ]
+
+        assert len(benchmark(spikes_per_trial)) == len(trials)
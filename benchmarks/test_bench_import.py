@@ -0,0 +1,19 @@
+import subprocess
+import sys
+import pytest
+
+# every round starts a fresh interpreter; "python" is the baseline
+COMMANDS = {
+    "python": ["-c", "pass"],
+    "import_dh5io": ["-c", "import dh5io"],
+    "import_dh5file": ["-c", "from dh5io import DH5File"],
+    "dh5tree_help": ["-m", "dh5cli.dh5tree", "--help"],
+}
+
+
+@pytest.mark.parametrize("command", list(COMMANDS))
+def test_cold_start(benchmark, command):
+    args = [sys.executable, "-I", *COMMANDS[command]]
+    benchmark.pedantic(
+        subprocess.run, args=(args,), kwargs={"check": True, "capture_output": True}, rounds=10
+    )
@@ -0,0 +1,77 @@
+import h5py
+import numpy as np
+import pytest
+from dh5io.cont import enumerate_cont_groups
+from dh5io.dh5file import DH5File
+from dh5io.header import read_header
+from dh5io.pool import DEFAULT_POOL_SIZE, set_pool_size
+
+
+@pytest.fixture
+def dh5file(session_file):
+    with DH5File(session_file) as dh5file:
+        yield dh5file
+
+
+def test_open_and_read_header(benchmark, session_file):
+    def open_header():
+        with h5py.File(session_file, "r") as file:
+            return read_header(file)
+
+    header = benchmark(open_header)
+    assert len(header.conts) == 2
+
+
+@pytest.mark.parametrize("pool_size", [0, 8])
+def test_enumerate_by_path(benchmark, session_file, pool_size):
+    # functions taking a path open the file through the handle pool
+    set_pool_size(pool_size)
+    try:
+        assert benchmark(enumerate_cont_groups, session_file) == [1, 2]
+    finally:
+        set_pool_size(DEFAULT_POOL_SIZE)
+
+
+def test_windowed_reads(benchmark, dh5file, session_config):
+    data = dh5file.get_cont_data_dataset_by_id(1)
+    rng = np.random.default_rng(0)
+    window = int(1e9 / session_config.sample_period_ns)  # 1 s
+    starts = rng.integers(0, data.shape[0] - window, 100)
+
+    def read_windows():
+        return [data[start : start + window, :] for start in starts]
+
+    windows = benchmark(read_windows)
+    assert windows[0].shape == (window, session_config.n_channels)
+
+
+def test_epoching(benchmark, dh5file, session_config):
+    # cut the same window around the stimulus marker out of every trial
+    data = dh5file.get_cont_data_dataset_by_id(1)
+    index = dh5file.get_cont_group_by_id(1)["INDEX"][()]
+    period = session_config.sample_period_ns
+    n_pre, n_post = int(0.2e9 / period), int(0.5e9 / period)
+
+    def epochs():
+        stimulus = dh5file.get_markers()["stimulus"]
+        region = np.searchsorted(index["time"], stimulus, side="right") - 1
+        centers = index["offset"][region] + (stimulus - index["time"][region]) // period
+        return np.stack([data[c - n_pre : c + n_post] for c in centers])
+
+    result = benchmark(epochs)
+    assert result.shape == (session_config.n_regions, n_pre + n_post, session_config.n_channels)
+
+
+def test_spike_query(benchmark, dh5file):
+    spike_group = dh5file.get_spike_group_by_id(0)
+    trialmap = dh5file.get_trialmap()
+
+    def spikes_per_trial_and_cluster():
+        times = spike_group["INDEX"][()]
+        clusters = spike_group["CLUSTER_INFO"][()]
+        first = np.searchsorted(times, trialmap.StartTime)
+        last = np.searchsorted(times, trialmap.EndTime)
+        return [np.bincount(clusters[a:b]) for a, b in zip(first, last)]
+
+    counts = benchmark(spikes_per_trial_and_cluster)
+    assert len(counts) == len(trialmap)
@@ -0,0 +1,8 @@
+import pytest
+from dh5io.validation import validate
+
+
+@pytest.mark.parametrize("level", ["quick", "standard", "deep"])
+def test_validate(benchmark, session_file, level):
+    report = benchmark(validate, session_file, level)
+    assert report.ok
@@ -0,0 +1,24 @@
+import numpy as np
+import dh5io.cont as cont
+from dh5io.create import create_dh_file
+from dhspec.cont import CHANNELS_DTYPE
+
+
+def test_write_cont(benchmark, tmp_path):
+    data = np.random.default_rng(0).integers(-1000, 1000, (1 << 20, 16), dtype=np.int16)
+    index = cont.create_empty_index_array(1)
+    filename = tmp_path / "write.dh5"
+
+    def write():
+        with create_dh_file(filename, overwrite=True) as dh5file:
+            cont.create_cont_group_from_data_in_file(
+                dh5file.file,
+                1,
+                data=data,
+                index=index,
+                sample_period_ns=np.int32(1_000_000),
+                calibration=np.ones(16),
+                channels=np.zeros(16, dtype=CHANNELS_DTYPE),
+            )
+
+    benchmark(write)
@@ -0,0 +1,90 @@
+import argparse
+import dataclasses
+import json
+import pathlib
+import sys
+
+COMPRESSORS = ["blosc-zstd", "zstd", "none"]
+
+
+def get_compressors(name: str):
+    # imported here so that --help does not load zarr
+    import zarr.codecs
+    from dhzio.cont import default_compressors
+
+    if name == "blosc-zstd":
+        return default_compressors()
+    if name == "zstd":
+        return (zarr.codecs.ZstdCodec(level=3),)
+    return None
+
+
+def convert(args: argparse.Namespace) -> dict:
+    from dhzio.convert import DEFAULT_MAX_MEMORY, dh5_to_dhz, dhz_to_dh5
+
+    max_memory = DEFAULT_MAX_MEMORY if args.max_memory is None else args.max_memory * 2**20
+    options = dict(
+        max_workers=args.workers,
+        max_memory=max_memory,
+        verify=not args.no_verify,
+        overwrite=args.overwrite,
+    )
+    if pathlib.Path(args.source).is_dir():
+        report = dhz_to_dh5(args.source, args.target, **options)
+    else:
+        report = dh5_to_dhz(
+            args.source,
+            args.target,
+            chunk_samples=args.chunk_samples,
+            shard_chunks=args.shard_chunks,
+            compressors=get_compressors(args.compressor),
+            **options,
+        )
+    return dataclasses.asdict(report)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Convert a .dh5 file to a Zarr folder or a Zarr folder to a .dh5 file. "
+        "An interrupted conversion is resumed by running the same command again."
+    )
+    parser.add_argument("source", help="A .dh5 file or a DAQ-HDF Zarr folder")
+    parser.add_argument("target", help="The Zarr folder or .dh5 file to create")
+    parser.add_argument(
+        "--workers", type=int, help="Threads for compression (default: number of CPUs, max 8)"
+    )
+    parser.add_argument(
+        "--max-memory", type=int, help="Approximate memory limit for data in MiB (default: 256)"
+    )
+    parser.add_argument(
+        "--chunk-samples",
+        type=int,
+        default=2**16,
+        help="Samples per chunk of CONT data in the Zarr folder (default: 65536)",
+    )
+    parser.add_argument(
+        "--shard-chunks", type=int, help="Chunks per shard (default: no shards)"
+    )
+    parser.add_argument(
+        "--compressor",
+        choices=COMPRESSORS,
+        default=COMPRESSORS[0],
+        help="Compression of the Zarr arrays (default: blosc-zstd)",
+    )
+    parser.add_argument("--no-verify", action="store_true", help="Skip the checksum comparison")
+    parser.add_argument(
+        "--overwrite", action="store_true", help="Replace the target instead of resuming"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        report = convert(args)
+    except Exception as e:
+        print(f"Error: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,10 @@
-import dh5io
 import argparse
-from dh5io.dh5file import DH5File
 
 
 def display_tree(file_path: str):
+    # imported here so that --help does not load h5py and numpy
+    from dh5io.dh5file import DH5File
+
     with DH5File(file_path, mode="r") as dh5_file:
         print(dh5_file)
 
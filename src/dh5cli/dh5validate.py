@@ -0,0 +1,219 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import pathlib
+import sys
+import time
+
+# version of the result format stored in the results cache
+CACHE_FORMAT_VERSION = 1
+# minimum time between two saves of the results cache during a run
+CACHE_SAVE_INTERVAL_S = 10.0
+
+
+def find_files(paths: list[str], pattern: str) -> list[pathlib.Path]:
+    files = []
+    for path in map(pathlib.Path, paths):
+        if path.is_dir():
+            files.extend(p for p in sorted(path.rglob(pattern)) if p.is_file())
+        else:
+            files.append(path)
+    return [f.resolve() for f in files]
+
+
+def validate_file(path: str, level: str) -> dict:
+    """Validate one file and return the JSON-serializable result. Runs in workers."""
+    from dh5io.validation import validate
+
+    start = time.perf_counter()
+    result: dict = {"path": path}
+    try:
+        stat = os.stat(path)
+        result.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        result.update(validate(path, level).to_dict())
+    except Exception as e:
+        # e.g. not an HDF5 file at all
+        result.update(
+            level=level,
+            ok=False,
+            checks=[
+                {
+                    "check": "open",
+                    "location": "/",
+                    "duration_s": time.perf_counter() - start,
+                    "issues": [{"severity": "error", "message": f"{type(e).__name__}: {e}"}],
+                }
+            ],
+        )
+    result["duration_s"] = time.perf_counter() - start
+    return result
+
+
+def load_cache(cache_file: pathlib.Path | None) -> dict:
+    if cache_file is None or not cache_file.exists():
+        return {}
+    try:
+        content = json.loads(cache_file.read_text())
+    except ValueError:
+        return {}
+    if content.get("format_version") != CACHE_FORMAT_VERSION:
+        return {}
+    return content.get("results", {})
+
+
+def save_cache(cache_file: pathlib.Path, results: dict) -> None:
+    tmp_file = cache_file.with_name(cache_file.name + ".tmp")
+    tmp_file.write_text(
+        json.dumps({"format_version": CACHE_FORMAT_VERSION, "results": results})
+    )
+    os.replace(tmp_file, cache_file)
+
+
+def is_cached(cached: dict | None, path: pathlib.Path, level: str) -> bool:
+    if cached is None or cached.get("level") != level:
+        return False
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        # removed after the scan; validate_file reports the error
+        return False
+    return cached.get("mtime_ns") == stat.st_mtime_ns and cached.get("size") == stat.st_size
+
+
+def run(
+    files: list[pathlib.Path],
+    level: str,
+    workers: int,
+    cache: dict,
+    emit,
+    save=None,
+) -> bool:
+    """Validate `files` with `workers` processes and emit one result per file.
+
+    At most `workers` files are open at the same time, and no more than twice as many
+    tasks are queued. `save` is called after every new result is added to `cache`.
+    """
+    all_ok = True
+    pending_paths = []
+    for path in files:
+        cached = cache.get(str(path))
+        if is_cached(cached, path, level):
+            emit(dict(cached, cached=True))
+            all_ok &= bool(cached["ok"])
+        else:
+            pending_paths.append(str(path))
+
+    def handle(result: dict) -> None:
+        nonlocal all_ok
+        cache[result["path"]] = result
+        emit(dict(result, cached=False))
+        all_ok &= bool(result["ok"])
+        if save is not None:
+            save()
+
+    if workers <= 1:
+        for path in pending_paths:
+            handle(validate_file(path, level))
+        return all_ok
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        queue = iter(pending_paths)
+        running: set[concurrent.futures.Future] = set()
+        for path in queue:
+            running.add(executor.submit(validate_file, path, level))
+            if len(running) >= 2 * workers:
+                done, running = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    handle(future.result())
+        for future in concurrent.futures.as_completed(running):
+            handle(future.result())
+    return all_ok
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Validate .dh5 files or directory trees and write a JSON report."
+    )
+    parser.add_argument("paths", nargs="+", help="Files or directories to validate")
+    parser.add_argument(
+        "--level",
+        choices=["quick", "standard", "deep"],
+        default="standard",
+        help="Validation level (default: standard)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes, i.e. maximum number of open files",
+    )
+    parser.add_argument(
+        "--pattern", default="*.dh5", help="File pattern in directories (default: *.dh5)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=["ndjson", "json"],
+        default="ndjson",
+        help="One JSON object per line (default) or a single JSON document",
+    )
+    parser.add_argument("--output", "-o", help="Write the report to this file")
+    parser.add_argument(
+        "--cache",
+        help="Results cache; files with unchanged mtime and size are not validated again",
+    )
+    args = parser.parse_args(argv)
+
+    files = find_files(args.paths, args.pattern)
+    cache_file = None if args.cache is None else pathlib.Path(args.cache)
+    cache = load_cache(cache_file)
+
+    out = sys.stdout if args.output is None else open(args.output, "w")
+    results = []
+
+    last_save = time.monotonic()
+
+    def save(force: bool = False) -> None:
+        # saved periodically so that an interrupted run keeps its results
+        nonlocal last_save
+        now = time.monotonic()
+        if cache_file is not None and (force or now - last_save >= CACHE_SAVE_INTERVAL_S):
+            save_cache(cache_file, cache)
+            last_save = now
+
+    def emit(result: dict) -> None:
+        if args.format == "ndjson":
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+        else:
+            results.append(result)
+
+    try:
+        start = time.perf_counter()
+        all_ok = run(files, args.level, args.workers, cache, emit, save)
+        if args.format == "json":
+            results.sort(key=lambda r: r["path"])
+            json.dump(
+                {
+                    "level": args.level,
+                    "ok": all_ok,
+                    "n_files": len(results),
+                    "n_failed": sum(not r["ok"] for r in results),
+                    "duration_s": time.perf_counter() - start,
+                    "files": results,
+                },
+                out,
+                indent=2,
+            )
+            out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        save(force=True)
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,68 @@
-from dh5io.validation import validate_dh5_file, validate_cont_group
-from dh5io.errors import DH5Error, DH5Warning
-from dh5io.dh5file import DH5File
+"""Read, write and validate DAQ-HDF5 (*.dh5) files.
 
+Submodules and the names below are imported on first access (PEP 562), so that
+`import dh5io` stays cheap for command line tools that only need a part of the
+package.
+"""
 
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from dh5io.dh5file import DH5File
+    from dh5io.errors import DH5Error, DH5Warning
+    from dh5io.iostats import IOStats, measure_io
+    from dh5io.validation import (
+        ValidationLevel,
+        ValidationReport,
+        validate,
+        validate_cont_group,
+        validate_dh5_file,
+    )
+
+# public name -> module defining it
+_LAZY_NAMES = {
+    "validate_dh5_file": "dh5io.validation",
+    "validate_cont_group": "dh5io.validation",
+    "validate": "dh5io.validation",
+    "ValidationLevel": "dh5io.validation",
+    "ValidationReport": "dh5io.validation",
+    "DH5Error": "dh5io.errors",
+    "DH5Warning": "dh5io.errors",
+    "DH5File": "dh5io.dh5file",
+    "IOStats": "dh5io.iostats",
+    "measure_io": "dh5io.iostats",
+}
+
+# literal list, so that linters see the names imported under TYPE_CHECKING as exported
 __all__ = [
-    "validate_dh5_file",
-    "validate_cont_group",
     "DH5Error",
-    "DH5Warning",
     "DH5File",
+    "DH5Warning",
+    "IOStats",
+    "ValidationLevel",
+    "ValidationReport",
+    "measure_io",
+    "validate",
+    "validate_cont_group",
+    "validate_dh5_file",
 ]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_NAMES.get(name)
+    if module_name is not None:
+        value = getattr(importlib.import_module(module_name), name)
+    else:
+        try:
+            value = importlib.import_module(f"{__name__}.{name}")
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,164 @@
+"""Access profiles for tuning how HDF5 caches and reads a DH5 file.
+
+By default HDF5 uses a 1 MiB chunk cache per dataset. On chunked multi-channel CONT
+data this cache is often too small to hold even one row of chunks across all
+channels, so every read decompresses the same chunks again. An `AccessProfile`
+bundles the file access settings for a typical access pattern:
+
+- "sequential": scanning through whole datasets, e.g. filtering or validation.
+  Fully read chunks are evicted first and the cache holds a few rows of chunks.
+- "random": reading many short windows at random positions, e.g. epoching.
+  A large cache keeps recently used chunks around.
+- "metadata": reading headers, attributes and small datasets of many groups.
+  Uses the page buffer (for files created with paged file space) and a small chunk
+  cache.
+
+    dh5 = DH5File("session.dh5", profile="random")
+
+The chunk cache of CONT DATA datasets is sized from their chunk shape: it holds
+`cache_chunk_rows` rows of chunks across all channels, but at least `rdcc_nbytes`.
+Profiles are immutable; derive custom ones with `dataclasses.replace`.
+"""
+
+import logging
+import math
+import pathlib
+from dataclasses import dataclass
+import h5py
+from dh5io.errors import DH5Error
+
+logger = logging.getLogger(__name__)
+
+# modes in which h5py creates a new file
+_CREATE_MODES = ("w", "w-", "x")
+
+# upper bound of the chunk cache hash table, HDF5 allocates it for every open dataset
+MAX_CHUNK_CACHE_SLOTS = 1_000_000
+
+
+@dataclass(frozen=True)
+class AccessProfile:
+    name: str
+    # file-wide raw data chunk cache, see h5py.File
+    rdcc_nbytes: int | None = None
+    rdcc_nslots: int | None = None
+    rdcc_w0: float | None = None
+    # page buffer, only used for files created with the "page" file space strategy
+    page_buf_size: int | None = None
+    libver: str | tuple[str, str] | None = None
+    # HDF5 file driver, e.g. "sec2", "stdio" or "core"
+    driver: str | None = None
+    # rows of chunks (across all channels) that fit into the chunk cache of a dataset,
+    # None keeps the file-wide cache settings
+    cache_chunk_rows: int | None = None
+
+    def file_kwargs(self, mode: str = "r") -> dict:
+        """Keyword arguments for `h5py.File` to open a file in `mode`."""
+        kwargs = {
+            "rdcc_nbytes": self.rdcc_nbytes,
+            "rdcc_nslots": self.rdcc_nslots,
+            "rdcc_w0": self.rdcc_w0,
+            "libver": self.libver,
+            "driver": self.driver,
+        }
+        if mode not in _CREATE_MODES:
+            kwargs["page_buf_size"] = self.page_buf_size
+        return {key: value for key, value in kwargs.items() if value is not None}
+
+
+PROFILES: dict[str, AccessProfile] = {
+    "default": AccessProfile("default"),
+    "sequential": AccessProfile(
+        "sequential",
+        rdcc_nbytes=16 * 2**20,
+        rdcc_w0=1.0,
+        driver="sec2",
+        cache_chunk_rows=2,
+    ),
+    "random": AccessProfile(
+        "random",
+        rdcc_nbytes=256 * 2**20,
+        rdcc_w0=0.75,
+        driver="sec2",
+        cache_chunk_rows=64,
+    ),
+    "metadata": AccessProfile(
+        "metadata",
+        rdcc_nbytes=2**20,
+        page_buf_size=16 * 2**20,
+        driver="sec2",
+    ),
+}
+
+
+def get_profile(profile: str | AccessProfile | None) -> AccessProfile:
+    if profile is None:
+        return PROFILES["default"]
+    if isinstance(profile, AccessProfile):
+        return profile
+    if profile not in PROFILES:
+        raise DH5Error(f"Unknown access profile '{profile}', use one of {list(PROFILES)}")
+    return PROFILES[profile]
+
+
+def open_file(
+    filename: str | pathlib.Path, mode: str = "r", profile: str | AccessProfile | None = None
+) -> h5py.File:
+    """Open `filename` with h5py using the settings of `profile`."""
+    kwargs = get_profile(profile).file_kwargs(mode)
+    try:
+        return h5py.File(filename, mode, **kwargs)
+    except (OSError, ValueError):
+        if "page_buf_size" not in kwargs:
+            raise
+        # older HDF5 versions refuse the page buffer for files without paged file space
+        logger.debug(f"Opening {filename} without page buffer")
+        del kwargs["page_buf_size"]
+        return h5py.File(filename, mode, **kwargs)
+
+
+def _next_prime(n: int) -> int:
+    def is_prime(k: int) -> bool:
+        return k >= 2 and all(k % d for d in range(2, math.isqrt(k) + 1))
+
+    while not is_prime(n):
+        n += 1
+    return n
+
+
+def chunk_cache_settings(
+    dataset: h5py.Dataset, profile: AccessProfile
+) -> tuple[int, int, float] | None:
+    """Chunk cache (nslots, nbytes, w0) for `dataset`, or None to keep the defaults."""
+    if profile.cache_chunk_rows is None or dataset.chunks is None:
+        return None
+    chunk_nbytes = math.prod(dataset.chunks) * dataset.dtype.itemsize
+    chunks_per_row = math.prod(
+        math.ceil(n / c) for n, c in zip(dataset.shape[1:], dataset.chunks[1:])
+    )
+    n_chunks = chunks_per_row * profile.cache_chunk_rows
+    nbytes = max(n_chunks * chunk_nbytes, profile.rdcc_nbytes or 0)
+    # HDF5 recommends a prime number of slots, about 100 times the number of chunks
+    nslots = 100 * max(n_chunks, nbytes // chunk_nbytes)
+    nslots = _next_prime(min(nslots, MAX_CHUNK_CACHE_SLOTS))
+    w0 = profile.rdcc_w0 if profile.rdcc_w0 is not None else 0.75
+    return nslots, nbytes, w0
+
+
+def open_dataset(
+    file: h5py.File, path: str, profile: str | AccessProfile | None
+) -> h5py.Dataset | None:
+    """Open the dataset at `path` with a chunk cache sized for `profile`.
+
+    Returns None if there is no dataset at `path`.
+    """
+    dataset = file.get(path)
+    if not isinstance(dataset, h5py.Dataset):
+        return None
+    settings = chunk_cache_settings(dataset, get_profile(profile))
+    if settings is None:
+        return dataset
+    dapl = h5py.h5p.create(h5py.h5p.DATASET_ACCESS)
+    dapl.set_chunk_cache(*settings)
+    logger.debug(f"Opening {path} with chunk cache {settings}")
+    return h5py.Dataset(h5py.h5d.open(file.id, path.encode(), dapl))
@@ -0,0 +1,210 @@
+"""Run a per-session analysis over many DAQ-HDF5 files in worker processes.
+
+`map_sessions` opens every file as a `DH5File` inside a worker process, calls the
+given function with it and streams the results back as they complete:
+
+    def count_trials(dh5: DH5File) -> int:
+        return len(dh5.get_trialmap())
+
+    for result in map_sessions(count_trials, paths, workers=8):
+        if result.ok:
+            print(result.path, result.value)
+
+HDF5 handles must never be shared between processes, so workers are started with the
+"spawn" method by default and open their files themselves. The function and its
+return value must be picklable, i.e. the function has to be defined at module level
+(and scripts need an `if __name__ == "__main__":` guard).
+
+Exceptions raised by the function are caught in the worker and reported in the
+`SessionResult`. Sessions whose worker process died (e.g. killed by the OOM killer)
+are retried up to `retries` times. With a `memory_budget`, sessions are only started
+while the sum of their estimated memory use stays within the budget. `paths` is read
+and memory is estimated only when a worker is free, so results stream from the start.
+"""
+
+import concurrent.futures
+import concurrent.futures.process
+import logging
+import multiprocessing
+import os
+import pathlib
+import traceback
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any
+import h5py
+from dh5io.dh5file import DH5File
+from dhspec.cont import CONT_PREFIX, DATA_DATASET_NAME
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SessionResult:
+    path: str
+    value: Any = None
+    # formatted traceback if the function raised or the worker died
+    error: str | None = None
+    attempts: int = 1
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def estimate_memory(path: str | pathlib.Path, factor: float = 1.0) -> int:
+    """Estimate the memory needed to process a session from the size of its CONT data.
+
+    Returns `factor` times the total size of all CONT DATA datasets in bytes. Use a
+    factor above 1 for analyses that convert the int16 samples, e.g. 4 for float64.
+    """
+    nbytes = 0
+    with h5py.File(path, "r") as file:
+        for name in file.keys():
+            if name.startswith(CONT_PREFIX) and file.get(name, getclass=True) is h5py.Group:
+                data = file[name].get(DATA_DATASET_NAME)
+                if data is not None:
+                    nbytes += data.size * data.dtype.itemsize
+    return int(nbytes * factor)
+
+
+def _run_session(func: Callable[[DH5File], Any], path: str) -> tuple[Any, str | None]:
+    # runs in the worker process
+    try:
+        with DH5File(path, "r") as dh5file:
+            return func(dh5file), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+@dataclass
+class _Task:
+    path: str
+    memory: int | None = None
+    attempts: int = 0
+
+
+def map_sessions(
+    func: Callable[[DH5File], Any],
+    paths: Iterable[str | pathlib.Path],
+    workers: int | None = None,
+    retries: int = 1,
+    memory_budget: int | None = None,
+    memory_estimate: Callable[[str], int] | None = None,
+    mp_context: str = "spawn",
+    max_tasks_per_child: int | None = None,
+) -> Iterator[SessionResult]:
+    """Apply `func` to every session in `paths` and yield results as they complete.
+
+    Parameters
+    ----------
+    func : callable
+        Picklable function taking a `DH5File`.
+    paths : iterable of str or pathlib.Path
+        Files to process.
+    workers : int, optional
+        Number of worker processes (default: number of CPUs).
+    retries : int
+        How often a session is retried after its worker process died.
+    memory_budget : int, optional
+        Maximum sum in bytes of the estimated memory of concurrently running sessions.
+        A session exceeding the budget on its own runs alone.
+    memory_estimate : callable, optional
+        Function returning the estimated memory of a session in bytes. Defaults to
+        `estimate_memory`. Only used with a `memory_budget`.
+    mp_context : str
+        Start method of the worker processes.
+    max_tasks_per_child : int, optional
+        Restart workers after this many sessions, e.g. to release leaked memory.
+    """
+    if memory_budget is not None and memory_estimate is None:
+        memory_estimate = estimate_memory
+
+    n_workers = workers or os.cpu_count() or 1
+    # sessions to retry, followed by the sessions not read from `paths` yet
+    queue: deque[_Task] = deque()
+    remaining_paths = iter(paths)
+
+    def next_task() -> _Task | None:
+        if not queue:
+            path = next(remaining_paths, None)
+            if path is None:
+                return None
+            queue.append(_Task(str(path)))
+        return queue[0]
+
+    context = multiprocessing.get_context(mp_context)
+    while next_task() is not None:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=context, max_tasks_per_child=max_tasks_per_child
+        )
+        running: dict[concurrent.futures.Future, _Task] = {}
+        memory_in_use = 0
+        broken = False
+        try:
+            while running or next_task() is not None:
+                # start as many sessions as workers and memory budget allow
+                while len(running) < n_workers and (task := next_task()) is not None:
+                    if task.memory is None:
+                        try:
+                            task.memory = _estimate(task.path, memory_budget, memory_estimate)
+                        except Exception:
+                            queue.popleft()
+                            error = traceback.format_exc()
+                            yield SessionResult(task.path, error=error, attempts=0)
+                            continue
+                    if (
+                        memory_budget is not None
+                        and running
+                        and memory_in_use + task.memory > memory_budget
+                    ):
+                        break
+                    queue.popleft()
+                    task.attempts += 1
+                    running[executor.submit(_run_session, func, task.path)] = task
+                    memory_in_use += task.memory
+
+                done, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    task = running.pop(future)
+                    memory_in_use -= task.memory
+                    try:
+                        value, error = future.result()
+                    except concurrent.futures.process.BrokenProcessPool:
+                        broken = True
+                        failed = _retry_or_fail(task, retries, queue)
+                        if failed is not None:
+                            yield failed
+                        continue
+                    yield SessionResult(task.path, value, error, task.attempts)
+
+                if broken:
+                    # all sessions of a broken pool fail; retry them in a new pool
+                    for task in running.values():
+                        failed = _retry_or_fail(task, retries, queue)
+                        if failed is not None:
+                            yield failed
+                    running.clear()
+                    break
+        finally:
+            executor.shutdown(wait=not broken, cancel_futures=True)
+
+
+def _estimate(path: str, memory_budget: int | None, memory_estimate) -> int:
+    # called in the parent when the session is about to start
+    return 0 if memory_budget is None else memory_estimate(path)
+
+
+def _retry_or_fail(task: _Task, retries: int, queue: deque[_Task]) -> SessionResult | None:
+    if task.attempts <= retries:
+        logger.warning(f"Worker processing {task.path} died, retrying")
+        queue.appendleft(task)
+        return None
+    return SessionResult(
+        task.path,
+        error=f"Worker process died while processing {task.path}",
+        attempts=task.attempts,
+    )
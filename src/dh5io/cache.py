@@ -0,0 +1,92 @@
+"""In-process cache of handles, attributes and group listings of an open DH5 file.
+
+Looking up objects in an HDF5 file (`file[name]`, `file.keys()`, type checks) costs a
+metadata access every time. On files with hundreds of CONT and SPIKE groups these
+lookups dominate small reads. A `FileCache` remembers the results for one open file.
+The cache is filled lazily and is cleared by the write functions of `dh5io` through
+`invalidate_cache`.
+"""
+
+import logging
+import weakref
+from collections.abc import Callable
+from typing import Any
+import h5py
+
+logger = logging.getLogger(__name__)
+
+# caches of open files, keyed by the HDF5 file number of the underlying file
+_file_caches: dict[int, "weakref.WeakSet[FileCache]"] = {}
+
+
+def _forget_file(fileno: int) -> None:
+    # iterating skips caches that are already collected
+    caches = _file_caches.get(fileno)
+    if caches is not None and not list(caches):
+        del _file_caches[fileno]
+
+
+class FileCache:
+    """Cache of group/dataset handles, attributes and root enumerations of one file."""
+
+    def __init__(self, file: h5py.File):
+        self.file = file
+        self._root_types: dict[str, type] | None = None
+        self._handles: dict[str, h5py.Group | h5py.Dataset | None] = {}
+        self._attrs: dict[str, dict] = {}
+        self._derived: dict[str, Any] = {}
+        _file_caches.setdefault(file.id.fileno, weakref.WeakSet()).add(self)
+        weakref.finalize(self, _forget_file, file.id.fileno)
+
+    def clear(self) -> None:
+        self._root_types = None
+        self._handles.clear()
+        self._attrs.clear()
+        self._derived.clear()
+        logger.debug(f"Cleared metadata cache of file {self.file.filename}")
+
+    def root_types(self) -> dict[str, type]:
+        """Map the names of all objects in the root group to their h5py class."""
+        if self._root_types is None:
+            # getclass avoids opening every object just to check its type
+            self._root_types = {
+                name: self.file.get(name, getclass=True) for name in self.file.keys()
+            }
+        return self._root_types
+
+    def root_group_names(self, prefix: str) -> list[str]:
+        return [
+            name
+            for name, cls in self.root_types().items()
+            if name.startswith(prefix) and cls is h5py.Group
+        ]
+
+    def get(self, path: str) -> h5py.Group | h5py.Dataset | None:
+        """Return the group or dataset at `path`, or None if it does not exist."""
+        if path not in self._handles:
+            self._handles[path] = self.file.get(path)
+        return self._handles[path]
+
+    def attrs(self, path: str = "/") -> dict:
+        """Return all attributes of the object at `path` as a dictionary."""
+        if path not in self._attrs:
+            obj = self.get(path)
+            self._attrs[path] = {} if obj is None else dict(obj.attrs)
+        return self._attrs[path]
+
+    def memoize(self, key: str, factory: Callable[[], Any]) -> Any:
+        """Return the object cached under `key`, creating it with `factory` if needed."""
+        if key not in self._derived:
+            self._derived[key] = factory()
+        return self._derived[key]
+
+
+def invalidate_cache(file: h5py.File) -> None:
+    """Clear the cache of `file` after its structure or attributes were modified."""
+    caches = _file_caches.get(file.id.fileno)
+    if caches is None:
+        return
+    for cache in list(caches):
+        cache.clear()
+    if len(caches) == 0:
+        del _file_caches[file.id.fileno]
@@ -0,0 +1,413 @@
+"""SQLite catalog of many DAQ-HDF5 sessions for fast cross-file queries.
+
+The catalog stores the `FileHeader` (see `dh5io.header`) of every indexed file in
+a handful of SQLite tables:
+
+- `files`: path, modification time, size, file version, number of trials and events
+- `conts`: CONT blocks with signal type, geometry, sample period and duration
+- `channels`: Channels attribute and calibration of every CONT channel
+- `spikes`: SPIKE blocks with number of spikes, channels and clusters
+- `trials`: number of trials per (StimNo, Outcome) combination
+- `markers`: marker names and number of timestamps
+- `operations`: processing history
+
+Indexing is incremental: only files whose modification time or size changed are read
+again, and headers are collected in parallel worker processes. Queries only touch the
+database, e.g.
+
+    catalog = Catalog("sessions.sqlite")
+    catalog.update("/data/sessions")
+    catalog.find_sessions(stim_no=12, outcome=0, min_trials=200,
+                          signal_type="LFP", sample_rate_hz=1000)
+"""
+
+import concurrent.futures
+import itertools
+import logging
+import os
+import pathlib
+import sqlite3
+import time
+from dataclasses import dataclass
+from dh5io.header import FileHeader, load_header
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    version INTEGER,
+    n_trials INTEGER NOT NULL,
+    n_events INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conts (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    cont_id INTEGER NOT NULL,
+    name TEXT,
+    signal_type TEXT,
+    n_samples INTEGER NOT NULL,
+    n_channels INTEGER NOT NULL,
+    sample_period_ns INTEGER NOT NULL,
+    sample_rate_hz REAL NOT NULL,
+    n_regions INTEGER NOT NULL,
+    start_time_ns INTEGER,
+    end_time_ns INTEGER,
+    recorded_duration_ns INTEGER NOT NULL,
+    PRIMARY KEY (file_id, cont_id)
+);
+CREATE TABLE IF NOT EXISTS channels (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    cont_id INTEGER NOT NULL,
+    channel INTEGER NOT NULL,
+    global_chan_number INTEGER,
+    board_chan_no INTEGER,
+    adc_bit_width INTEGER,
+    max_voltage_range REAL,
+    min_voltage_range REAL,
+    amplif_chan0 REAL,
+    calibration REAL,
+    PRIMARY KEY (file_id, cont_id, channel)
+);
+CREATE TABLE IF NOT EXISTS spikes (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    spike_id INTEGER NOT NULL,
+    n_spikes INTEGER NOT NULL,
+    n_channels INTEGER NOT NULL,
+    sample_period_ns INTEGER,
+    spike_samples INTEGER,
+    n_clusters INTEGER,
+    PRIMARY KEY (file_id, spike_id)
+);
+CREATE TABLE IF NOT EXISTS trials (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    stim_no INTEGER NOT NULL,
+    outcome INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (file_id, stim_no, outcome)
+);
+CREATE TABLE IF NOT EXISTS markers (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (file_id, name)
+);
+CREATE TABLE IF NOT EXISTS operations (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    tool TEXT,
+    operator_name TEXT,
+    date TEXT,
+    original_filename TEXT,
+    PRIMARY KEY (file_id, position)
+);
+CREATE INDEX IF NOT EXISTS trials_by_condition ON trials (stim_no, outcome, count);
+CREATE INDEX IF NOT EXISTS conts_by_type ON conts (signal_type, sample_period_ns);
+CREATE INDEX IF NOT EXISTS markers_by_name ON markers (name);
+"""
+
+
+@dataclass
+class UpdateStats:
+    indexed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    failed: int = 0
+
+
+class Catalog:
+    """SQLite catalog of DAQ-HDF5 files."""
+
+    def __init__(self, database: str | pathlib.Path = ":memory:"):
+        self.database = database
+        self.connection = sqlite3.connect(database)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # indexing
+
+    def update(
+        self,
+        root: str | pathlib.Path,
+        pattern: str = "*.dh5",
+        workers: int | None = None,
+        remove_missing: bool = True,
+        sidecar_dir: str | pathlib.Path | None = None,
+    ) -> UpdateStats:
+        """Index all files matching `pattern` below `root`.
+
+        Files that are already in the catalog with the same modification time and size
+        are skipped. Headers of new or changed files are read by `workers` processes
+        (default: number of CPUs), using the sidecar cache of `dh5io.header` in
+        `sidecar_dir` if given. Files below `root` that disappeared are removed from
+        the catalog if `remove_missing` is True.
+        """
+        root = pathlib.Path(root).resolve()
+        stats = UpdateStats()
+        known = {
+            path: (mtime_ns, size)
+            for path, mtime_ns, size in self.connection.execute(
+                "SELECT path, mtime_ns, size FROM files"
+            )
+        }
+
+        found = set()
+        to_index: list[tuple[str, int, int]] = []
+        for path in sorted(root.rglob(pattern)):
+            if not path.is_file():
+                continue
+            stat = path.stat()
+            found.add(str(path))
+            if known.get(str(path)) == (stat.st_mtime_ns, stat.st_size):
+                stats.unchanged += 1
+            else:
+                to_index.append((str(path), stat.st_mtime_ns, stat.st_size))
+
+        if remove_missing:
+            prefix = str(root) + os.sep
+            missing = [p for p in known if p.startswith(prefix) and p not in found]
+            with self.connection:
+                self.connection.executemany(
+                    "DELETE FROM files WHERE path = ?", [(p,) for p in missing]
+                )
+            stats.removed = len(missing)
+
+        if len(to_index) == 0:
+            return stats
+
+        if workers == 1:
+            results = map(
+                _read_header_or_error, _paths(to_index), itertools.repeat(sidecar_dir)
+            )
+            self._store_results(to_index, results, stats)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(
+                    _read_header_or_error,
+                    _paths(to_index),
+                    itertools.repeat(sidecar_dir),
+                    chunksize=8,
+                )
+                self._store_results(to_index, results, stats)
+
+        logger.info(
+            f"Indexed {stats.indexed} files below {root} "
+            f"({stats.unchanged} unchanged, {stats.removed} removed, {stats.failed} failed)"
+        )
+        return stats
+
+    def _store_results(self, to_index, results, stats: UpdateStats) -> None:
+        with self.connection:
+            for (path, mtime_ns, size), (header, error) in zip(to_index, results):
+                if header is None:
+                    logger.warning(f"Could not index {path}: {error}")
+                    stats.failed += 1
+                    continue
+                self.add(path, header, mtime_ns=mtime_ns, size=size)
+                stats.indexed += 1
+
+    def add(
+        self,
+        path: str | pathlib.Path,
+        header: FileHeader,
+        mtime_ns: int | None = None,
+        size: int | None = None,
+    ) -> int:
+        """Insert or replace the entries of one file and return its id."""
+        path = str(pathlib.Path(path).resolve())
+        if mtime_ns is None or size is None:
+            stat = os.stat(path)
+            mtime_ns, size = stat.st_mtime_ns, stat.st_size
+
+        db = self.connection
+        db.execute("DELETE FROM files WHERE path = ?", (path,))
+        file_id = db.execute(
+            "INSERT INTO files (path, mtime_ns, size, version, n_trials, n_events, indexed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                mtime_ns,
+                size,
+                header.version,
+                header.n_trials,
+                header.n_events,
+                time.time(),
+            ),
+        ).lastrowid
+
+        for c in header.conts:
+            db.execute(
+                "INSERT INTO conts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    file_id,
+                    c.id,
+                    c.name,
+                    c.signal_type,
+                    c.n_samples,
+                    c.n_channels,
+                    c.sample_period_ns,
+                    c.sample_rate_hz,
+                    c.n_regions,
+                    c.start_time_ns,
+                    c.end_time_ns,
+                    c.recorded_duration_ns,
+                ),
+            )
+            for channel in range(c.n_channels):
+                info = c.channels[channel] if c.channels and channel < len(c.channels) else {}
+                calibration = (
+                    c.calibration[channel]
+                    if c.calibration and channel < len(c.calibration)
+                    else None
+                )
+                db.execute(
+                    "INSERT INTO channels VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        file_id,
+                        c.id,
+                        channel,
+                        info.get("GlobalChanNumber"),
+                        info.get("BoardChanNo"),
+                        info.get("ADCBitWidth"),
+                        info.get("MaxVoltageRange"),
+                        info.get("MinVoltageRange"),
+                        info.get("AmplifChan0"),
+                        calibration,
+                    ),
+                )
+
+        db.executemany(
+            "INSERT INTO spikes VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    file_id,
+                    s.id,
+                    s.n_spikes,
+                    s.n_channels,
+                    s.sample_period_ns,
+                    s.spike_samples,
+                    None if s.cluster_ids is None else len(s.cluster_ids),
+                )
+                for s in header.spikes
+            ],
+        )
+        db.executemany(
+            "INSERT INTO trials VALUES (?, ?, ?, ?)",
+            [(file_id, t.stim_no, t.outcome, t.count) for t in header.trial_counts],
+        )
+        db.executemany(
+            "INSERT INTO markers VALUES (?, ?, ?)",
+            [(file_id, name, count) for name, count in header.markers.items()],
+        )
+        db.executemany(
+            "INSERT INTO operations VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    file_id,
+                    position,
+                    op.name,
+                    op.tool,
+                    op.operator_name,
+                    op.date,
+                    op.original_filename,
+                )
+                for position, op in enumerate(header.operations)
+            ],
+        )
+        return file_id
+
+    # queries
+
+    def query(self, sql: str, parameters: tuple | dict = ()) -> list[tuple]:
+        """Run an arbitrary SQL query on the catalog."""
+        return self.connection.execute(sql, parameters).fetchall()
+
+    def paths(self) -> list[str]:
+        return [row[0] for row in self.query("SELECT path FROM files ORDER BY path")]
+
+    def find_sessions(
+        self,
+        stim_no: int | None = None,
+        outcome: int | None = None,
+        min_trials: int = 0,
+        signal_type: str | None = None,
+        sample_rate_hz: float | None = None,
+        min_channels: int = 0,
+        marker: str | None = None,
+    ) -> list[str]:
+        """Return paths of sessions matching all given criteria.
+
+        Trial criteria count trials with the given `stim_no` and/or `outcome`. CONT
+        criteria require at least one CONT block with the given signal type, sample rate
+        and number of channels. `marker` requires a marker with that name.
+        """
+        conditions = []
+        parameters: list = []
+
+        if stim_no is not None or outcome is not None or min_trials > 0:
+            trial_filter = []
+            if stim_no is not None:
+                trial_filter.append("stim_no = ?")
+                parameters.append(stim_no)
+            if outcome is not None:
+                trial_filter.append("outcome = ?")
+                parameters.append(outcome)
+            where = " AND ".join(trial_filter) if trial_filter else "1"
+            conditions.append(
+                f"id IN (SELECT file_id FROM trials WHERE {where}"
+                " GROUP BY file_id HAVING SUM(count) >= ?)"
+            )
+            parameters.append(max(min_trials, 1))
+
+        if signal_type is not None or sample_rate_hz is not None or min_channels > 0:
+            cont_filter = ["n_channels >= ?"]
+            parameters.append(min_channels)
+            if signal_type is not None:
+                cont_filter.append("signal_type = ?")
+                parameters.append(signal_type)
+            if sample_rate_hz is not None:
+                cont_filter.append("sample_period_ns = ?")
+                parameters.append(round(1e9 / sample_rate_hz))
+            conditions.append(
+                f"id IN (SELECT file_id FROM conts WHERE {' AND '.join(cont_filter)})"
+            )
+
+        if marker is not None:
+            conditions.append("id IN (SELECT file_id FROM markers WHERE name = ?)")
+            parameters.append(marker)
+
+        sql = "SELECT path FROM files"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY path"
+        return [row[0] for row in self.query(sql, tuple(parameters))]
+
+
+def _paths(to_index):
+    return (path for path, _, _ in to_index)
+
+
+def _read_header_or_error(
+    path: str, sidecar_dir: str | pathlib.Path | None
+) -> tuple[FileHeader | None, str | None]:
+    # runs in worker processes; errors are returned so one broken file does not stop
+    # the whole update
+    try:
+        if sidecar_dir is None:
+            return load_header(path, use_sidecar=False), None
+        return load_header(path, cache_dir=sidecar_dir), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
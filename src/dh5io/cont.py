@@ -128,6 +128,8 @@ region, and their respective time stamps.
 import logging
 import h5py
 import warnings
+import dh5io.iostats as iostats
+from dh5io.cache import invalidate_cache
 from dh5io.ensure_h5py_file import ensure_h5py_file
 from dh5io.errors import DH5Error, DH5Warning
 from dhspec.cont import (
@@ -183,6 +185,7 @@ def create_empty_cont_group_in_file(
         )
 
     cont_group = file.create_group(cont_name_from_id(cont_group_id))
+    invalidate_cache(file)
 
     cont_group.create_dataset(
         DATA_DATASET_NAME, shape=(nSamples, nChannels), dtype=np.int16
@@ -268,7 +271,7 @@ def enumerate_cont_groups(file: h5py.File) -> list[int]:
 
 @ensure_h5py_file
 def get_cont_data_by_id_from_file(file: h5py.File, cont_id: int) -> np.ndarray:
-    return np.array(get_cont_group_by_id_from_file(file, cont_id).get("DATA")[:])
+    return np.array(iostats.read(get_cont_group_by_id_from_file(file, cont_id)["DATA"]))
 
 
 @ensure_h5py_file
@@ -286,6 +289,83 @@ def get_calibrated_cont_data_by_id(file: h5py.File, cont_id: int) -> np.ndarray:
     return get_cont_data_by_id_from_file(file, cont_id) * calibration
 
 
+# recording regions
+REGION_DTYPE = np.dtype([("start", np.int64), ("stop", np.int64), ("time", np.int64)])
+
+
+def get_regions(index: np.ndarray, n_samples: int) -> np.ndarray:
+    """Return the recording regions described by a CONT INDEX array.
+
+    Each region has the sample range [start, stop) in DATA and the timestamp in
+    nanoseconds of its first sample.
+    """
+    regions = np.empty(len(index), dtype=REGION_DTYPE)
+    regions["start"] = index["offset"]
+    regions["stop"][:-1] = index["offset"][1:]
+    if len(index) > 0:
+        regions["stop"][-1] = n_samples
+    regions["time"] = index["time"]
+    return regions
+
+
+@ensure_h5py_file
+def get_cont_regions_by_id(file: h5py.File, cont_id: int) -> np.ndarray:
+    cont_group = get_cont_group_by_id_from_file(file, cont_id)
+    return get_regions(
+        iostats.read(cont_group[INDEX_DATASET_NAME]), cont_group[DATA_DATASET_NAME].shape[0]
+    )
+
+
+def _ceil_div(a: np.int64, b: int) -> int:
+    return int(-(-a // b))
+
+
+def time_range_to_samples(
+    regions: np.ndarray, sample_period_ns: int, t_start: int | None, t_stop: int | None
+) -> slice:
+    """Return the samples with timestamps in [t_start, t_stop) nanoseconds.
+
+    Regions are stored one after the other in DATA, so these samples are always a
+    contiguous range.
+    """
+    sample_period_ns = int(sample_period_ns)
+    if len(regions) == 0:
+        return slice(0, 0)
+    n_region_samples = regions["stop"] - regions["start"]
+
+    if t_start is None:
+        start = int(regions["start"][0])
+    else:
+        last_times = regions["time"] + (n_region_samples - 1) * sample_period_ns
+        r = int(np.searchsorted(last_times, t_start, "left"))
+        if r == len(regions):
+            start = int(regions["stop"][-1])
+        else:
+            offset = _ceil_div(t_start - regions["time"][r], sample_period_ns)
+            start = int(regions["start"][r]) + max(0, offset)
+
+    if t_stop is None:
+        stop = int(regions["stop"][-1])
+    else:
+        r = int(np.searchsorted(regions["time"], t_stop, "left")) - 1
+        if r < 0:
+            stop = int(regions["start"][0])
+        else:
+            n = _ceil_div(t_stop - regions["time"][r], sample_period_ns)
+            stop = int(regions["start"][r]) + min(int(n_region_samples[r]), n)
+
+    return slice(start, max(start, stop))
+
+
+def sample_times(
+    regions: np.ndarray, sample_period_ns: int, samples: np.ndarray
+) -> np.ndarray:
+    """Timestamps in nanoseconds of the samples at positions `samples` in DATA."""
+    samples = np.asarray(samples, dtype=np.int64)
+    r = np.searchsorted(regions["start"], samples, "right") - 1
+    return regions["time"][r] + (samples - regions["start"][r]) * np.int64(sample_period_ns)
+
+
 @ensure_h5py_file
 def get_cont_group_by_id_from_file(file: h5py.File, id: int) -> h5py.Group:
     contGroup = file.get(cont_name_from_id(id))
@@ -301,7 +381,8 @@ def get_cont_group_names_from_file(
     return [
         name
         for name in filename.keys()
-        if name.startswith(CONT_PREFIX) and isinstance(filename[name], h5py.Group)
+        if name.startswith(CONT_PREFIX)
+        and filename.get(name, getclass=True) is h5py.Group
     ]
 
 
@@ -413,3 +494,41 @@ def validate_cont_group(cont_group: h5py.Group) -> None:
             message=f"Channels attribute is missing from CONT group {cont_group.name}",
             category=DH5Warning,
         )
+
+
+def validate_cont_index(cont_group: h5py.Group) -> None:
+    """Check that the INDEX of a CONT group is consistent with its DATA.
+
+    Offsets must increase strictly and lie inside DATA, and the timestamps of the
+    regions must increase such that no region overlaps the next one given the
+    SamplePeriod.
+    """
+    index = cont_group[INDEX_DATASET_NAME][()]
+    n_samples = cont_group[DATA_DATASET_NAME].shape[0]
+    sample_period = cont_group.attrs["SamplePeriod"]
+    if len(index) == 0:
+        if n_samples > 0:
+            raise DH5Error(f"INDEX of {cont_group.name} is empty but DATA is not")
+        return
+
+    offsets = index["offset"]
+    times = index["time"]
+    if np.any(offsets < 0) or np.any(offsets >= max(n_samples, 1)):
+        raise DH5Error(
+            f"INDEX offsets of {cont_group.name} are outside of DATA with {n_samples} samples"
+        )
+    if np.any(np.diff(offsets) <= 0):
+        raise DH5Error(f"INDEX offsets of {cont_group.name} are not strictly increasing")
+    if offsets[0] != 0:
+        warnings.warn(
+            message=f"First INDEX offset of {cont_group.name} is {offsets[0]}, not 0",
+            category=DH5Warning,
+        )
+
+    region_durations = np.diff(offsets) * np.int64(sample_period)
+    overlapping = np.flatnonzero(times[1:] < times[:-1] + region_durations)
+    if len(overlapping) > 0:
+        raise DH5Error(
+            f"{len(overlapping)} regions of {cont_group.name} start before the previous "
+            f"region ends (first at region {overlapping[0] + 1})"
+        )
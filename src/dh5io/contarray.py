@@ -0,0 +1,234 @@
+"""Lazy array view of the signal data of a CONT block.
+
+`ContArray` behaves like a read-only 2D NumPy array of shape (nSamples, nChannels)
+without loading the DATA dataset. Indexing reads only the requested hyperslab:
+
+    lfp = dh5.cont[1]
+    lfp.shape, lfp.dtype
+    lfp[1000:2000, [0, 3]]           # samples 1000-1999 of channels 0 and 3
+    lfp.time[10.0:12.5, 0]           # seconds 10 to 12.5 of channel 0
+    lfp.time[10_000_000_000:None]    # from 10 s on (integers are nanoseconds)
+    lfp.calibrated[0:100]            # multiplied by the Calibration attribute
+    np.asarray(lfp)                  # everything
+
+Channel lists are read as one contiguous range of columns and selected in memory,
+which is much faster with HDF5 than point selections.
+"""
+
+import warnings
+from collections.abc import Iterator, Mapping
+from typing import Any
+import h5py
+import numpy as np
+import dh5io.iostats as iostats
+from dh5io.cont import get_regions, sample_times, time_range_to_samples
+from dh5io.errors import DH5Error, DH5Warning
+from dhspec.cont import DATA_DATASET_NAME, INDEX_DATASET_NAME
+
+
+class ContArray:
+    """Read-only lazy view of the DATA dataset of a CONT group."""
+
+    def __init__(self, cont_group: h5py.Group, calibrated: bool = False, data=None):
+        self._group = cont_group
+        self._data: h5py.Dataset = (
+            data if data is not None else cont_group[DATA_DATASET_NAME]
+        )
+        self._calibrated = calibrated
+        self._regions: np.ndarray | None = None
+        self.sample_period_ns = int(cont_group.attrs["SamplePeriod"])
+        self.calibration: np.ndarray | None = cont_group.attrs.get("Calibration")
+        self.channels: np.ndarray | None = cont_group.attrs.get("Channels")
+
+    def __repr__(self) -> str:
+        kind = "calibrated " if self._calibrated else ""
+        return f"<ContArray {self._group.name} {kind}shape={self.shape} dtype={self.dtype}>"
+
+    @property
+    def name(self) -> str:
+        return self._group.name
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self._data.shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(np.float64) if self._calibrated else self._data.dtype
+
+    @property
+    def ndim(self) -> int:
+        return 2
+
+    @property
+    def size(self) -> int:
+        return self._data.size
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.dtype.itemsize
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    @property
+    def sample_rate_hz(self) -> float:
+        return 1e9 / self.sample_period_ns
+
+    @property
+    def regions(self) -> np.ndarray:
+        """Recording regions, see `dh5io.cont.get_regions`."""
+        if self._regions is None:
+            index = iostats.read(self._group[INDEX_DATASET_NAME])
+            self._regions = get_regions(index, self.shape[0])
+        return self._regions
+
+    @property
+    def calibrated(self) -> "ContArray":
+        """View of the data multiplied by the Calibration attribute."""
+        if self._calibrated:
+            return self
+        return ContArray(self._group, calibrated=True, data=self._data)
+
+    @property
+    def time(self) -> "_TimeIndexer":
+        """Index samples by time: floats are seconds, integers nanoseconds."""
+        return _TimeIndexer(self)
+
+    def times(self, samples: slice | np.ndarray = slice(None)) -> np.ndarray:
+        """Timestamps in nanoseconds of the selected samples."""
+        if isinstance(samples, slice):
+            samples = np.arange(*samples.indices(self.shape[0]))
+        return sample_times(self.regions, self.sample_period_ns, samples)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        data = self[:]
+        return data if dtype is None else data.astype(dtype, copy=False)
+
+    def __getitem__(self, key: Any) -> np.ndarray:
+        rows, columns = _split_key(key)
+        squeeze_columns = isinstance(columns, (int, np.integer))
+        if squeeze_columns:
+            columns = slice(columns, columns + 1 if columns != -1 else None)
+
+        column_read, column_select = _column_selection(columns, self.shape[1])
+        data = self._read_rows(rows, column_read)
+        if column_select is not None:
+            data = data[..., column_select]
+        if self._calibrated:
+            data = data * self._calibration_for(column_read, column_select)
+        if squeeze_columns:
+            data = data[..., 0]
+        return data
+
+    def _read_rows(self, rows: Any, columns: slice) -> np.ndarray:
+        if isinstance(rows, (slice, int, np.integer)):
+            return iostats.read(self._data, (rows, columns))
+        # h5py needs sorted unique row indices
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        rows = np.where(rows < 0, rows + self.shape[0], rows)
+        unique, inverse = np.unique(rows, return_inverse=True)
+        return iostats.read(self._data, (unique, columns))[inverse]
+
+    def _calibration_for(self, column_read: slice, column_select: Any) -> np.ndarray:
+        calibration = self.calibration
+        if calibration is None:
+            warnings.warn(
+                f"Calibration attribute is missing from {self.name}", category=DH5Warning
+            )
+            calibration = np.ones(self.shape[1])
+        calibration = np.asarray(calibration, dtype=np.float64)[column_read]
+        if column_select is not None:
+            calibration = calibration[column_select]
+        return calibration
+
+
+def _split_key(key: Any) -> tuple[Any, Any]:
+    if not isinstance(key, tuple):
+        key = (key,)
+    if any(k is Ellipsis for k in key):
+        i = next(i for i, k in enumerate(key) if k is Ellipsis)
+        key = key[:i] + (slice(None),) * (3 - len(key)) + key[i + 1 :]
+    if len(key) > 2:
+        raise IndexError(f"Too many indices for ContArray: {len(key)}")
+    if len(key) == 1:
+        key = (key[0], slice(None))
+    return key[0], key[1]
+
+
+def _column_selection(columns: Any, n_channels: int) -> tuple[slice, Any]:
+    """Split a channel selection into a contiguous range of columns to read and the
+    selection within that range (None if the range is the selection)."""
+    if isinstance(columns, slice):
+        start, stop, step = columns.indices(n_channels)
+        if step == 1:
+            return slice(start, max(start, stop)), None
+        selected = np.arange(start, stop, step)
+    else:
+        selected = np.asarray(columns)
+        if selected.dtype == bool:
+            selected = np.flatnonzero(selected)
+        selected = np.where(selected < 0, selected + n_channels, selected)
+    if selected.size == 0:
+        return slice(0, 0), None
+    if selected.min() < 0 or selected.max() >= n_channels:
+        raise IndexError(f"Channel index out of range for {n_channels} channels")
+    first = int(selected.min())
+    return slice(first, int(selected.max()) + 1), selected - first
+
+
+class _TimeIndexer:
+    def __init__(self, array: ContArray):
+        self._array = array
+
+    def __getitem__(self, key: Any) -> np.ndarray:
+        if not isinstance(key, tuple):
+            key = (key,)
+        if not isinstance(key[0], slice) or key[0].step is not None:
+            raise IndexError("ContArray.time only supports slices without step")
+        rows = self.samples(key[0].start, key[0].stop)
+        return self._array[(rows,) + key[1:]]
+
+    def samples(self, t_start: float | int | None, t_stop: float | int | None) -> slice:
+        """Slice of the samples with timestamps in [t_start, t_stop)."""
+        return time_range_to_samples(
+            self._array.regions,
+            self._array.sample_period_ns,
+            _to_ns(t_start),
+            _to_ns(t_stop),
+        )
+
+
+def _to_ns(t: float | int | None) -> int | None:
+    if t is None:
+        return None
+    if isinstance(t, (float, np.floating)):
+        return int(round(t * 1e9))
+    return int(t)
+
+
+class ContArrays(Mapping[int, ContArray]):
+    """Mapping of CONT block id to `ContArray`, see `DH5File.cont`."""
+
+    def __init__(self, dh5file):
+        self._dh5file = dh5file
+        self._arrays: dict[int, ContArray] = {}
+
+    def __getitem__(self, cont_id: int) -> ContArray:
+        if cont_id not in self._arrays:
+            try:
+                cont_group = self._dh5file.get_cont_group_by_id(cont_id)
+            except DH5Error as e:
+                raise KeyError(cont_id) from e
+            self._arrays[cont_id] = ContArray(
+                cont_group, data=self._dh5file.get_cont_data_dataset_by_id(cont_id)
+            )
+        return self._arrays[cont_id]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._dh5file.get_cont_group_ids())
+
+    def __len__(self) -> int:
+        return len(self._dh5file.get_cont_group_ids())
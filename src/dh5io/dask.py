@@ -0,0 +1,143 @@
+"""Dask arrays over CONT blocks for out-of-core and distributed processing.
+
+    import dask.array as da
+    from dh5io.dask import cont_to_dask
+
+    data, times = cont_to_dask("session.dh5", 1, return_times=True)
+    power = (data**2).mean(axis=0).compute()
+
+h5py handles cannot be pickled, so the dask graph only holds the path of the file.
+Every task opens the file itself and closes it again, so the graph can be executed
+with the threaded, multiprocessing or distributed scheduler. No read-only handle stays
+open in the client or the workers that would keep the file from being written; the
+handle pool of `dh5io.pool` is not used for the same reason.
+
+Chunks span all channels and are aligned to the chunks of the DATA dataset.
+Calibration is applied lazily; timestamps are derived from INDEX per chunk.
+"""
+
+import functools
+import os
+import pathlib
+import dask.array as da
+from dask.base import tokenize
+import h5py
+import numpy as np
+from dh5io.cont import get_regions, sample_times
+from dh5io.errors import DH5Error
+from dhspec.cont import DATA_DATASET_NAME, INDEX_DATASET_NAME, cont_name_from_id
+
+# default size of a chunk of the dask array
+DEFAULT_CHUNK_BYTES = 64 * 2**20
+
+
+class ContDataSource:
+    """Picklable array-like reading `CONTn/DATA` of a file by path."""
+
+    def __init__(self, path: str | pathlib.Path, cont_id: int):
+        self.path = str(pathlib.Path(path).resolve())
+        self.cont_id = cont_id
+        with h5py.File(self.path, "r") as file:
+            dataset = _get_data(file, cont_id)
+            self.shape: tuple[int, int] = dataset.shape
+            self.dtype: np.dtype = dataset.dtype
+            self.dataset_chunks: tuple[int, int] | None = dataset.chunks
+            calibration = dataset.parent.attrs.get("Calibration")
+            self.calibration = None if calibration is None else np.asarray(calibration)
+        self.ndim = 2
+
+    def __getitem__(self, key) -> np.ndarray:
+        with h5py.File(self.path, "r") as file:
+            return _get_data(file, self.cont_id)[key]
+
+
+def _get_data(file: h5py.File, cont_id: int) -> h5py.Dataset:
+    dataset = file.get(f"{cont_name_from_id(cont_id)}/{DATA_DATASET_NAME}")
+    if dataset is None:
+        raise DH5Error(f"CONT{cont_id} does not exist in {file.filename}")
+    return dataset
+
+
+def default_chunks(
+    shape: tuple[int, int],
+    dtype: np.dtype,
+    dataset_chunks: tuple[int, int] | None,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> tuple[int, int]:
+    """Rows per chunk for about `chunk_bytes`, a multiple of the dataset chunk rows."""
+    n_samples, n_channels = shape
+    rows = max(1, chunk_bytes // max(1, n_channels * np.dtype(dtype).itemsize))
+    if dataset_chunks is not None:
+        rows = max(1, rows // dataset_chunks[0]) * dataset_chunks[0]
+    return (min(rows, max(n_samples, 1)), max(n_channels, 1))
+
+
+def _token(path: str, cont_id: int) -> str:
+    stat = os.stat(path)
+    return f"{path}-{stat.st_mtime_ns}-{stat.st_size}-{cont_id}"
+
+
+def cont_to_dask(
+    path: str | pathlib.Path,
+    cont_id: int,
+    calibrated: bool = True,
+    chunks: int | tuple[int, int] | None = None,
+    return_times: bool = False,
+) -> da.Array | tuple[da.Array, da.Array]:
+    """Return the signal of `CONTn` as a dask array of shape (nSamples, nChannels).
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        DH5 file.
+    cont_id : int
+        Id of the CONT block.
+    calibrated : bool
+        Multiply the samples by the Calibration attribute (float64 result).
+    chunks : int or tuple, optional
+        Rows per chunk, or dask chunks. Defaults to about 64 MiB per chunk aligned to
+        the chunks of the dataset.
+    return_times : bool
+        Also return the timestamps of the samples in nanoseconds as a dask array
+        with the same row chunks.
+    """
+    source = ContDataSource(path, cont_id)
+    if chunks is None:
+        chunks = default_chunks(source.shape, source.dtype, source.dataset_chunks)
+    elif isinstance(chunks, int):
+        chunks = (chunks, max(source.shape[1], 1))
+
+    name = f"dh5-cont-{tokenize(_token(source.path, cont_id))}"
+    data = da.from_array(
+        source, chunks=chunks, name=name, lock=False, asarray=True, fancy=False
+    )
+
+    if calibrated:
+        if source.calibration is not None:
+            data = data * source.calibration.astype(np.float64)
+        else:
+            data = data.astype(np.float64)
+
+    if not return_times:
+        return data
+    return data, cont_times_to_dask(path, cont_id, chunks=(data.chunks[0],))
+
+
+def cont_times_to_dask(
+    path: str | pathlib.Path, cont_id: int, chunks: int | tuple | None = None
+) -> da.Array:
+    """Timestamps in nanoseconds of all samples of `CONTn` as a lazy int64 array."""
+    path = str(pathlib.Path(path).resolve())
+    with h5py.File(path, "r") as file:
+        data = _get_data(file, cont_id)
+        n_samples = data.shape[0]
+        regions = get_regions(data.parent[INDEX_DATASET_NAME][()], n_samples)
+        sample_period_ns = int(data.parent.attrs["SamplePeriod"])
+    if chunks is None:
+        chunks = min(max(n_samples, 1), DEFAULT_CHUNK_BYTES // 8)
+    samples = da.arange(n_samples, chunks=chunks, dtype=np.int64)
+    return samples.map_blocks(
+        functools.partial(sample_times, regions, sample_period_ns),
+        dtype=np.int64,
+        name=f"dh5-times-{tokenize(_token(path, cont_id))}",
+    )
@@ -37,13 +37,36 @@ datatype in the `CONT` blocks description.
 
 """
 
+import logging
 import pathlib
+from typing import TYPE_CHECKING
 import numpy
 import h5py
 import dh5io.trialmap as trialmap
 import dh5io.event_triggers as event_triggers
-import dh5io.cont as cont
+import dh5io.markers as markers
+import dh5io.access as access
+import dh5io.header as header
+import dh5io.iostats as iostats
+import dh5io.pool as pool
+from dh5io.cache import FileCache
+from dh5io.errors import DH5Error
+from dhspec.cont import (
+    CONT_PREFIX,
+    DATA_DATASET_NAME,
+    INDEX_DATASET_NAME,
+    cont_id_from_name,
+    cont_name_from_id,
+)
 from dhspec.dh5file import BOARDS_ATTRIBUTE_NAME, FILEVERSION_ATTRIBUTE_NAME
+from dhspec.event_triggers import EV_DATASET_NAME
+from dhspec.spike import SPIKE_PREFIX
+from dhspec.trialmap import TRIALMAP_DATASET_NAME
+
+if TYPE_CHECKING:
+    from dh5io.contarray import ContArrays
+
+logger = logging.getLogger(__name__)
 
 
 def dh5file_from_h5file(file: h5py.File):
@@ -55,89 +78,208 @@ class DH5File:
 
     The file format ist based on HDF5. See https://github.com/cog-neurophys-lab/DAQ-HDF5 for
     the specification of the format.
+
+    Group and dataset handles, attributes and the lists of CONT and SPIKE groups are
+    cached per file (see `dh5io.cache`). The cache is cleared by the write functions
+    of `dh5io`; call `invalidate_cache` after modifying `file` directly with h5py.
+
+    With `instrument=True` all reads from the file by `dh5io` are recorded, see
+    `io_stats`. `profile` selects chunk cache, page buffer and driver settings for an
+    access pattern ("sequential", "random" or "metadata"), see `dh5io.access`.
     """
 
     file: h5py.File
-
-    def __init__(self, filename: str | pathlib.Path, mode="r"):
-        self.file = h5py.File(filename, mode)
+    profile: access.AccessProfile
+    _cache: FileCache
+    _io_stats: iostats.IOStats | None
+
+    def __init__(
+        self,
+        filename: str | pathlib.Path,
+        mode="r",
+        instrument: bool = False,
+        profile: str | access.AccessProfile | None = None,
+    ):
+        if mode != "r" and isinstance(filename, (str, pathlib.Path)):
+            # a pooled read-only handle would prevent opening the file for writing
+            pool.invalidate(filename)
+        self.profile = access.get_profile(profile)
+        self._attach(access.open_file(filename, mode, self.profile), instrument)
+
+    def _attach(self, file: h5py.File, instrument: bool) -> None:
+        self.file = file
+        self._cache = FileCache(self.file)
+        self._io_stats = None
+        if instrument:
+            self._io_stats = iostats.IOStats()
+            iostats.register_file(self.file, self._io_stats)
+
+    @classmethod
+    def load_into_memory(
+        cls,
+        source: str | pathlib.Path | bytes,
+        write_back: bool = False,
+        instrument: bool = False,
+    ) -> "DH5File":
+        """Read a whole file into memory and open it from there.
+
+        The file is read with one sequential read into an image of the HDF5 `core`
+        driver; afterwards no disk I/O happens. `source` can also be the content of a
+        file as bytes. With `write_back=True` the file is opened for writing and the
+        image is written back to `source` when the file is closed.
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            if write_back:
+                raise DH5Error("Only files loaded from a path can be written back")
+            file = h5py.File(h5py.h5f.open_file_image(bytes(source)))
+        else:
+            if write_back:
+                pool.invalidate(source)
+            file = h5py.File(
+                source, "r+" if write_back else "r", driver="core", backing_store=write_back
+            )
+        logger.debug(f"Loaded {file.filename} into memory")
+        dh5file = cls.__new__(cls)
+        dh5file.profile = access.get_profile(None)
+        dh5file._attach(file, instrument)
+        return dh5file
 
     def __del__(self):
-        self.file.close()
+        # __init__ may have failed before the file was opened
+        if hasattr(self, "file"):
+            self.close()
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        if self._io_stats is not None and self.file.id.valid:
+            iostats.unregister_file(self.file, self._io_stats)
+            logger.debug(f"I/O statistics of {self.file.filename}:\n{self._io_stats.summary()}")
         self.file.close()
 
+    def io_stats(self) -> iostats.IOStats:
+        """Statistics of all reads from the file since it was opened.
+
+        Only reads by the readers of `dh5io` (and `dh5io.iostats.read`) are recorded,
+        and only if the file was opened with `instrument=True`.
+        """
+        if self._io_stats is None:
+            raise DH5Error(f"{self.file.filename} was not opened with instrument=True")
+        return self._io_stats
+
     def __str__(self):
+        cont_names = self.get_cont_group_names()
+        spike_names = self.get_spike_group_names()
+        events = self.get_events_dataset()
+        n_events = 0 if events is None else len(events)
+        trialmap = self._cache.get(TRIALMAP_DATASET_NAME)
+        n_trials = 0 if trialmap is None else len(trialmap)
         return f"""
         DAQ-HDF5 File (version {self.version}) {self.file.filename:s} containing:
-            ├─── {len(self.get_cont_groups()):5d} CONT Groups: {self.get_cont_group_names()}
-            ├─── {len(self.get_spike_groups()):5d} SPIKE Groups: {self.get_spike_group_names()}
-            ├─── {len(self.get_events_dataset()):5d} Events
-            └─── {len(self.get_trialmap()):5d} Trials in TRIALMAP
+            ├─── {len(cont_names):5d} CONT Groups: {cont_names}
+            ├─── {len(spike_names):5d} SPIKE Groups: {spike_names}
+            ├─── {n_events:5d} Events
+            └─── {n_trials:5d} Trials in TRIALMAP
         """
 
+    def invalidate_cache(self) -> None:
+        self._cache.clear()
+
+    def get_header(self) -> header.FileHeader:
+        """Summary of all blocks, trials, markers and operations in the file."""
+        return self._cache.memoize("header", lambda: header.read_header(self.file))
+
     @property
     def version(self) -> int | None:
-        return self.file.attrs.get(FILEVERSION_ATTRIBUTE_NAME)
+        return self._cache.attrs().get(FILEVERSION_ATTRIBUTE_NAME)
 
     @property
     def boards(self) -> list[str] | None:
-        return self.file.attrs.get(BOARDS_ATTRIBUTE_NAME)
+        return self._cache.attrs().get(BOARDS_ATTRIBUTE_NAME)
 
     # cont groups
     def get_cont_groups(self) -> list[h5py.Group]:
-        return cont.get_cont_groups_from_file(self.file)
+        return [self._cache.get(name) for name in self.get_cont_group_names()]
 
     def get_cont_group_names(self) -> list[str]:
-        return cont.get_cont_group_names_from_file(self.file)
+        return self._cache.root_group_names(CONT_PREFIX)
 
     def get_cont_group_ids(self) -> list[int]:
-        return cont.enumerate_cont_groups(self.file)
+        return [cont_id_from_name(name) for name in self.get_cont_group_names()]
 
     def get_cont_group_by_id(self, id: int) -> h5py.Group:
-        return cont.get_cont_group_by_id_from_file(self.file, id)
+        cont_group = self._cache.get(cont_name_from_id(id))
+        if cont_group is None:
+            raise DH5Error(f"CONT{id} does not exist in {self.file.filename}")
+        return cont_group
+
+    def get_cont_attrs_by_id(self, cont_id: int) -> dict:
+        self.get_cont_group_by_id(cont_id)
+        return self._cache.attrs(cont_name_from_id(cont_id))
+
+    def get_cont_data_dataset_by_id(self, cont_id: int) -> h5py.Dataset:
+        self.get_cont_group_by_id(cont_id)
+        path = f"{cont_name_from_id(cont_id)}/{DATA_DATASET_NAME}"
+        if self.profile.cache_chunk_rows is None:
+            return self._cache.get(path)
+        # opened with a chunk cache sized for the chunk shape of the dataset
+        return self._cache.memoize(
+            f"tuned:{path}", lambda: access.open_dataset(self.file, path, self.profile)
+        )
+
+    @property
+    def cont(self) -> "ContArrays":
+        """Lazy arrays of the CONT blocks by id, e.g. `dh5.cont[1][0:1000, 2]`."""
+        # imported here because dh5io.cont imports this module
+        from dh5io.contarray import ContArrays
+
+        return self._cache.memoize("cont", lambda: ContArrays(self))
 
     def get_cont_data_by_id(self, cont_id: int) -> numpy.ndarray:
-        return cont.get_cont_data_by_id_from_file(self.file, cont_id)
+        return numpy.array(iostats.read(self.get_cont_data_dataset_by_id(cont_id)))
 
     def get_calibrated_cont_data_by_id(self, cont_id: int) -> numpy.ndarray:
-        return cont.get_calibrated_cont_data_by_id(self.file, cont_id)
+        # imported here because dh5io.cont imports this module
+        from dh5io.cont import get_calibrated_cont_data_by_id
+
+        return get_calibrated_cont_data_by_id(self.file, cont_id)
 
     def get_cont_size(self, cont_id) -> tuple[int, int]:
-        nSamples, nChannels = self.get_cont_data_by_id(cont_id).shape
+        nSamples, nChannels = self.get_cont_data_dataset_by_id(cont_id).shape
         return (nSamples, nChannels)
 
     # spike groups
     def get_spike_groups(self) -> list[h5py.Group]:
-        return [self.file[name] for name in self.get_spike_group_names()]
+        return [self._cache.get(name) for name in self.get_spike_group_names()]
 
     def get_spike_group_names(self) -> list[str]:
-        return [
-            name
-            for name in self.file.keys()
-            if name.startswith("SPIKE") and isinstance(self.file[name], h5py.Group)
-        ]
+        return self._cache.root_group_names(SPIKE_PREFIX)
 
     def get_spike_group_by_id(self, id: int) -> h5py.Group | None:
-        return self.file.get(f"SPIKE{id}")
+        return self._cache.get(f"{SPIKE_PREFIX}{id}")
 
     def get_cont_index_by_id(self, cont_id: int) -> h5py.Dataset:
-        return self.get_cont_group_by_id(cont_id).get("INDEX")
+        self.get_cont_group_by_id(cont_id)
+        return self._cache.get(f"{cont_name_from_id(cont_id)}/{INDEX_DATASET_NAME}")
 
     # trialmap
     def get_trialmap(self) -> numpy.ndarray | None:
         return trialmap.get_trialmap_from_file(self.file)
 
     def get_events_dataset(self) -> h5py.Dataset | None:
-        return event_triggers.get_event_triggers_dataset_from_file(self.file)
+        return self._cache.get(EV_DATASET_NAME)
 
     def get_events_array(self) -> numpy.ndarray | None:
         return event_triggers.get_event_triggers_from_file(self.file)
 
+    # markers
+    def get_markers(self) -> markers.Markers:
+        return self._cache.memoize("markers", lambda: markers.get_markers(self.file))
+
     @staticmethod
     def get_spike_id_from_name(name: str) -> int | None:
         return int(name.lstrip("/").lstrip("SPIKE"))
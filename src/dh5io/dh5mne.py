@@ -1,63 +1,388 @@
-import mne
+"""Read DAQ-HDF5 files into MNE objects.
+
+    from dh5io.dh5mne import events_from_dh5, read_epochs_dh5, read_raw_dh5
+
+    raw = read_raw_dh5("session.dh5", cont_ids=[1, 2])     # nothing is loaded yet
+    events, event_id = events_from_dh5(raw)                  # trials from TRIALMAP
+    epochs = mne.Epochs(raw, events, event_id, tmin=-0.2, tmax=0.5)
+    epochs = read_epochs_dh5("session.dh5", marker="stimulus", tmin=-0.2, tmax=0.5)
+
+`RawDH5` is a `mne.io.BaseRaw` that reads the requested samples of the CONT blocks
+only when they are needed (`preload=False`). The channels of all selected CONT
+blocks share one continuous time axis in steps of their common SamplePeriod: sample
+`n` of the raw is at `n * SamplePeriod` nanoseconds of the recording clock, so
+`raw.first_samp` is the first recorded sample. Samples in the gaps between recording
+regions are zero and covered by `BAD_ACQ_SKIP` annotations, which MNE excludes from
+epoching and most analyses by default. Samples are calibrated with the Calibration
+attribute of each CONT block (as MNE channel calibration).
+
+`read_epochs_dh5` reads only the windows around the events, batching neighboring
+windows into one read of DATA, and returns an in-memory `mne.EpochsArray`.
+
+See
+- https://mne.tools/stable/auto_tutorials/raw/20_event_arrays.html
+- https://mne.tools/stable/generated/mne.io.Raw.html
+- https://mne.tools/stable/generated/mne.EpochsArray.html
+"""
+
+import logging
 import pathlib
-import dh5file
+import warnings
+import mne
 import numpy as np
+import dh5io.pool as pool
+from dh5io.cont import enumerate_cont_groups
+from dh5io.contarray import ContArray
+from dh5io.errors import DH5Error, DH5Warning
+from dh5io.markers import Markers
+from dh5io.trialmap import get_trialmap_from_file
+from dhspec.cont import cont_name_from_id
+
+logger = logging.getLogger(__name__)
+
+GAP_DESCRIPTION = "BAD_ACQ_SKIP"
+
+# size of the reads of DATA when extracting epochs
+DEFAULT_BATCH_BYTES = 64 * 2**20
+
+
+def _read_layout(path: str, cont_ids: list[int] | None) -> dict:
+    """Channels, sample period and recording regions of the selected CONT blocks."""
+    with pool.pooled_file(path) as file:
+        if cont_ids is None:
+            cont_ids = sorted(enumerate_cont_groups(file))
+        if not cont_ids:
+            raise DH5Error(f"{path} has no CONT blocks")
 
-# See 
-# - https://mne.tools/stable/auto_tutorials/simulation/10_array_objs.html#tut-creating-data-structures
-# - https://mne.tools/stable/auto_tutorials/raw/20_event_arrays.html#sphx-glr-auto-tutorials-raw-20-event-arrays-py
-# - https://mne.tools/stable/generated/mne.io.RawArray.html
-# - https://mne.tools/stable/generated/mne.EpochsArray.html#mne.EpochsArray
-# - https://mne.tools/stable/generated/mne.EvokedArray.html#mne.EvokedArray
-# - https://mne.tools/stable/generated/mne.create_info.html
+        blocks = []
+        for cont_id in cont_ids:
+            name = cont_name_from_id(cont_id)
+            if name not in file:
+                raise DH5Error(f"{name} does not exist in {path}")
+            array = ContArray(file[name])
+            regions = array.regions
+            regions = regions[regions["stop"] > regions["start"]]
+            calibration = array.calibration
+            if calibration is None:
+                warnings.warn(
+                    f"Calibration attribute is missing from {name}", category=DH5Warning
+                )
+                calibration = np.ones(array.shape[1])
+            blocks.append(
+                {
+                    "name": name,
+                    "n_channels": array.shape[1],
+                    "sample_period_ns": array.sample_period_ns,
+                    "regions": regions,
+                    "calibration": np.asarray(calibration, dtype=np.float64),
+                }
+            )
 
-def read_cont_to_mne_raw(filename : str | pathlib.Path, contIds : list[int] | None=None) -> mne.io.Raw:
-    """Read a DAQ-HDF5 file into a MNE Raw object.
+    periods = {block["sample_period_ns"] for block in blocks}
+    if len(periods) != 1:
+        raise DH5Error(f"CONT blocks {cont_ids} have different sample periods {periods}")
+    sample_period_ns = periods.pop()
+    for block in blocks:
+        # first sample of each region on the common time axis
+        offsets = np.round(block["regions"]["time"] / sample_period_ns)
+        block["offsets"] = offsets.astype(np.int64)
+    return {"cont_ids": cont_ids, "sample_period_ns": sample_period_ns, "blocks": blocks}
+
+
+def _block_samples(block: dict) -> tuple[np.ndarray, np.ndarray]:
+    """First and last + 1 sample of every region of a block on the common time axis."""
+    regions = block["regions"]
+    return block["offsets"], block["offsets"] + regions["stop"] - regions["start"]
+
+
+def _gaps(blocks: list[dict], first: int, last: int) -> list[tuple[int, int]]:
+    """Sample ranges in [first, last) where at least one block has no data."""
+    gaps = []
+    for block in blocks:
+        starts, stops = _block_samples(block)
+        edges = np.concatenate([[first], stops])
+        gaps += [(int(a), int(b)) for a, b in zip(edges, np.append(starts, last)) if b > a]
+    merged: list[tuple[int, int]] = []
+    for start, stop in sorted(gaps):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+class RawDH5(mne.io.BaseRaw):
+    """Raw data of the CONT blocks of a DH5 file, see the module documentation.
 
     Parameters
     ----------
     filename : str | pathlib.Path
         The path to the DAQ-HDF5 file.
+    cont_ids : list of int, optional
+        CONT blocks to read, all by default. They must have the same SamplePeriod.
+    ch_types : str
+        MNE channel type of all channels.
     preload : bool
-        If True, all data are loaded at initialization. If False (default),
-        data are not read 
+        If True, all data are loaded at initialization. If False (default), data
+        are read from the file on demand.
+    """
+
+    def __init__(
+        self,
+        filename: str | pathlib.Path,
+        cont_ids: list[int] | None = None,
+        ch_types: str = "misc",
+        preload: bool = False,
+        verbose=None,
+    ):
+        path = str(pathlib.Path(filename).resolve())
+        layout = _read_layout(path, cont_ids)
+        blocks = layout["blocks"]
+        sample_period_ns = layout["sample_period_ns"]
+
+        ch_names = [
+            f"{block['name']}/{channel}"
+            for block in blocks
+            for channel in range(block["n_channels"])
+        ]
+        info = mne.create_info(ch_names, sfreq=1e9 / sample_period_ns, ch_types=ch_types)
+        calibration = np.concatenate([block["calibration"] for block in blocks])
+        for ch, cal in zip(info["chs"], calibration):
+            ch["cal"] = cal
+
+        bounds = [_block_samples(block) for block in blocks if len(block["regions"])]
+        if not bounds:
+            raise DH5Error(f"CONT blocks {layout['cont_ids']} of {path} have no samples")
+        first_samp = min(int(starts[0]) for starts, _ in bounds)
+        last_samp = max(int(stops[-1]) for _, stops in bounds) - 1
+
+        super().__init__(
+            info,
+            preload=preload,
+            first_samps=(first_samp,),
+            last_samps=(last_samp,),
+            filenames=(path,),
+            raw_extras=[layout],
+            orig_format="short",
+            verbose=verbose,
+        )
+
+        gaps = _gaps(blocks, first_samp, last_samp + 1)
+        if gaps:
+            gaps = np.array(gaps, dtype=np.float64)
+            self.set_annotations(
+                mne.Annotations(
+                    onset=(gaps[:, 0] - first_samp) / self.info["sfreq"],
+                    duration=(gaps[:, 1] - gaps[:, 0]) / self.info["sfreq"],
+                    description=GAP_DESCRIPTION,
+                )
+            )
 
-    Returns
-    -------
-    raw : mne.io.Raw
-        The MNE Raw object.
+    def _read_segment_file(self, data, idx, fi, start, stop, cals, mult):
+        """Read samples [start, stop) of the channels `idx` into `data`.
+
+        `start` and `stop` count from sample 0 of the recording clock, i.e. they
+        include `first_samp`.
+        """
+        layout = self._raw_extras[fi]
+        n_channels = sum(block["n_channels"] for block in layout["blocks"])
+        channels = np.arange(n_channels)[idx]
+        one = np.zeros((len(channels), stop - start), dtype=np.float64)
+
+        with pool.pooled_file(self.filenames[fi]) as file:
+            first_channel = 0
+            for block in layout["blocks"]:
+                in_block = (channels >= first_channel) & (
+                    channels < first_channel + block["n_channels"]
+                )
+                first_channel += block["n_channels"]
+                if not in_block.any():
+                    continue
+                columns = channels[in_block] - (first_channel - block["n_channels"])
+                array = ContArray(file[block["name"]])
+                region_starts, region_stops = _block_samples(block)
+                first = np.searchsorted(region_stops, start, "right")
+                last = np.searchsorted(region_starts, stop, "left")
+                for r in range(first, last):
+                    a = max(start, int(region_starts[r]))
+                    b = min(stop, int(region_stops[r]))
+                    row = int(block["regions"]["start"][r]) + a - int(region_starts[r])
+                    one[np.flatnonzero(in_block), a - start : b - start] = array[
+                        row : row + b - a, columns
+                    ].T
+
+        if mult is None:
+            data[:] = one * cals
+        else:
+            data[:] = mult @ one
+
+
+def read_raw_dh5(
+    filename: str | pathlib.Path,
+    cont_ids: list[int] | None = None,
+    ch_types: str = "misc",
+    preload: bool = False,
+    verbose=None,
+) -> RawDH5:
+    """Read the CONT blocks of a DAQ-HDF5 file as MNE Raw, see `RawDH5`."""
+    return RawDH5(filename, cont_ids, ch_types=ch_types, preload=preload, verbose=verbose)
+
+
+def _event_times(path: str, marker: str | None) -> tuple[np.ndarray, np.ndarray, dict]:
+    """Times in ns, event codes and event_id of trials (TRIALMAP) or of a marker."""
+    with pool.pooled_file(path) as file:
+        if marker is None:
+            trialmap = get_trialmap_from_file(file)
+            if trialmap is None:
+                raise DH5Error(f"{path} has no TRIALMAP")
+            times = np.asarray(trialmap["StartTime"], dtype=np.int64)
+            codes = np.asarray(trialmap["StimNo"], dtype=np.int64)
+            event_id = {f"stim/{code}": int(code) for code in np.unique(codes)}
+        else:
+            markers = Markers(file)
+            if marker not in markers:
+                raise DH5Error(f"Marker '{marker}' does not exist in {path}")
+            times = np.asarray(markers[marker], dtype=np.int64)
+            codes = np.ones(len(times), dtype=np.int64)
+            event_id = {marker: 1}
+    return times, codes, event_id
+
+
+def events_from_dh5(raw: RawDH5, marker: str | None = None) -> tuple[np.ndarray, dict]:
+    """MNE events of the trials in TRIALMAP (coded by StimNo) or of a marker.
+
+    The events refer to the samples of `raw`, so they can be used with `mne.Epochs`
+    to cut epochs lazily.
+    """
+    sample_period_ns = raw._raw_extras[0]["sample_period_ns"]
+    times, codes, event_id = _event_times(raw.filenames[0], marker)
+    events = np.zeros((len(times), 3), dtype=np.int64)
+    events[:, 0] = np.round(times / sample_period_ns)
+    events[:, 2] = codes
+    return events, event_id
+
+
+def _read_windows(
+    array: ContArray, rows: np.ndarray, n_times: int, batch_rows: int
+) -> np.ndarray:
+    """Read the windows [row, row + n_times) of DATA, shape (n_windows, n_times, n_ch).
+
+    Windows are read in order of their position in DATA. Neighboring windows are
+    read together with one hyperslab of at most `batch_rows` rows (or one window).
     """
+    out = np.empty((len(rows), n_times, array.shape[1]), dtype=array.dtype)
+    order = np.argsort(rows, kind="stable")
+    i = 0
+    while i < len(order):
+        batch_start = rows[order[i]]
+        j = i + 1
+        while j < len(order) and rows[order[j]] + n_times - batch_start <= batch_rows:
+            j += 1
+        batch = array[batch_start : rows[order[j - 1]] + n_times]
+        for k in order[i:j]:
+            out[k] = batch[rows[k] - batch_start : rows[k] - batch_start + n_times]
+        i = j
+    return out
+
 
-    dh5 = dh5file.DH5File(filename)
-    return cont_to_mne_raw(dh5, contIds=contIds)
+def read_epochs_dh5(
+    filename: str | pathlib.Path,
+    cont_ids: list[int] | None = None,
+    marker: str | None = None,
+    tmin: float = -0.2,
+    tmax: float = 0.5,
+    ch_types: str = "misc",
+    baseline: tuple | None = None,
+    batch_bytes: int = DEFAULT_BATCH_BYTES,
+    verbose=None,
+) -> mne.EpochsArray:
+    """Read epochs around the trials in TRIALMAP or around a marker.
 
-def cont_to_mne_raw(dh5 : dh5file.DH5File, contIds:list[int]=None) -> mne.io.Raw:
-    """Read a DAQ-HDF5 file into a MNE Raw object.
+    Only the windows [tmin, tmax] seconds around the events are read. Events whose
+    window does not lie within one recording region of every CONT block are dropped
+    with a warning; DH5Error is raised if no event is left.
 
     Parameters
     ----------
-    dh5 : dh5file.DH5File
-        The DAQ-HDF5 file.
-    preload : bool
-        If True, all data are loaded at initialization. If False (default),
-        data are not read 
-
-    Returns
-    -------
-    raw : mne.io.Raw
-        The MNE Raw object.
+    filename : str | pathlib.Path
+        The path to the DAQ-HDF5 file.
+    cont_ids : list of int, optional
+        CONT blocks to read, all by default. They must have the same SamplePeriod.
+    marker : str, optional
+        Name of a marker in the Markers group. By default epochs start at the
+        StartTime of the trials in TRIALMAP with the StimNo as event code.
+    tmin, tmax : float
+        Start and end of the epochs in seconds relative to the events.
+    batch_bytes : int
+        Maximum size of a single read of DATA for several neighboring windows.
     """
+    path = str(pathlib.Path(filename).resolve())
+    layout = _read_layout(path, cont_ids)
+    sample_period_ns = layout["sample_period_ns"]
+    times, codes, event_id = _event_times(path, marker)
+
+    sfreq = 1e9 / sample_period_ns
+    first_offset = int(np.round(tmin * sfreq))
+    n_times = int(np.round(tmax * sfreq)) - first_offset + 1
+    starts = np.round(times / sample_period_ns).astype(np.int64) + first_offset
+
+    # rows in DATA of the first sample of every window, -1 if not within one region
+    block_rows = []
+    for block in layout["blocks"]:
+        region_starts, region_stops = _block_samples(block)
+        r = np.searchsorted(region_starts, starts, "right") - 1
+        in_region = r >= 0
+        r = np.maximum(r, 0)
+        in_region &= starts + n_times <= region_stops[r]
+        rows = block["regions"]["start"][r] + starts - region_starts[r]
+        block_rows.append(np.where(in_region, rows, -1))
+    valid = np.all([rows >= 0 for rows in block_rows], axis=0)
+    if not valid.all():
+        warnings.warn(
+            f"Dropping {np.count_nonzero(~valid)} of {len(valid)} events whose window "
+            "is not within a recording region",
+            category=DH5Warning,
+        )
+    if not valid.any():
+        raise DH5Error(f"No event in {path} has its window within a recording region")
+
+    data = []
+    with pool.pooled_file(path) as file:
+        for block, rows in zip(layout["blocks"], block_rows):
+            array = ContArray(file[block["name"]], calibrated=True)
+            row_bytes = array.shape[1] * array.dtype.itemsize
+            batch_rows = max(n_times, batch_bytes // max(row_bytes, 1))
+            data.append(_read_windows(array, rows[valid], n_times, batch_rows))
+    data = np.concatenate(data, axis=2).transpose(0, 2, 1)
+
+    ch_names = [
+        f"{block['name']}/{channel}"
+        for block in layout["blocks"]
+        for channel in range(block["n_channels"])
+    ]
+    info = mne.create_info(ch_names, sfreq=sfreq, ch_types=ch_types)
+    events = np.zeros((np.count_nonzero(valid), 3), dtype=np.int64)
+    events[:, 0] = starts[valid] - first_offset
+    events[:, 2] = codes[valid]
+    event_id = {name: code for name, code in event_id.items() if code in events[:, 2]}
+    return mne.EpochsArray(
+        data,
+        info,
+        events=events,
+        tmin=first_offset / sfreq,
+        event_id=event_id,
+        baseline=baseline,
+        verbose=verbose,
+    )
+
 
-    if contIds is None:
-        contIds = dh5.get_cont_group_ids()
+def read_cont_to_mne_raw(
+    filename: str | pathlib.Path, contIds: list[int] | None = None
+) -> mne.io.BaseRaw:
+    """Read a DAQ-HDF5 file into a MNE Raw object, see `read_raw_dh5`."""
+    return read_raw_dh5(filename, cont_ids=contIds)
 
-    allCont = []
-    for id in contIds:
-        allCont.append(dh5.get_cont_group_by_id(id))
-    
 
-    nChannels = len(contIds)
-    nSamples = 1024
-    info = mne.create_info(ch_names=nChannels, sfreq=1000, ch_types='misc')
-    data = np.zeros(nChannels, nSamples)
-    return mne.io.RawArray(data=data, info=info)
\ No newline at end of file
+def cont_to_mne_raw(dh5, contIds: list[int] | None = None) -> mne.io.BaseRaw:
+    """Read the CONT blocks of an open `DH5File` into a MNE Raw object."""
+    return read_raw_dh5(dh5.file.filename, cont_ids=contIds)
@@ -1,11 +1,18 @@
 import h5py
 import pathlib
 from dh5io.dh5file import DH5File
+from dh5io.pool import get_pool
 
 
 def ensure_h5py_file(func, mode="r"):
     def wrapper(file, *args, **kwargs):
         if isinstance(file, (str, pathlib.Path)):
+            # read-only handles are taken from the pool of open files
+            if mode == "r" and get_pool().maxsize > 0:
+                return func(get_pool().get(file), *args, **kwargs)
+            if mode != "r":
+                # a pooled read-only handle would prevent opening the file for writing
+                get_pool().invalidate(file)
             with h5py.File(file, mode=mode) as f:
                 return func(f, *args, **kwargs)
         elif isinstance(file, h5py.File):
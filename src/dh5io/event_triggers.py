@@ -36,6 +36,8 @@ the event trigger encoding from other sources than the DAQ-HDF file.
 """
 
 import logging
+import dh5io.iostats as iostats
+from dh5io.cache import invalidate_cache
 from dh5io.errors import DH5Error
 from dhspec.event_triggers import EV_DATASET_DTYPE, EV_DATASET_NAME
 import h5py
@@ -53,7 +55,7 @@ def get_event_triggers_from_file(file: h5py.File) -> npt.NDArray | None:
     ev_dataset = file.get(EV_DATASET_NAME)
     if ev_dataset is None:
         return None
-    return np.array(ev_dataset, dtype=EV_DATASET_DTYPE)
+    return np.asarray(iostats.read(ev_dataset), dtype=EV_DATASET_DTYPE)
 
 
 def add_event_triggers_to_file(
@@ -81,6 +83,7 @@ def add_event_triggers_to_file(
         data=data,
         dtype=EV_DATASET_DTYPE,
     )
+    invalidate_cache(file)
 
 
 def validate_event_triggers_dataset(dataset: h5py.Dataset) -> None:
@@ -91,6 +94,12 @@ def validate_event_triggers_dataset(dataset: h5py.Dataset) -> None:
         )
 
 
+def validate_event_trigger_times(dataset: h5py.Dataset) -> None:
+    """Check that event triggers are ordered by time."""
+    if np.any(np.diff(dataset.fields("time")[()]) < 0):
+        raise DH5Error(f"Event triggers in {dataset.name} are not ordered by time")
+
+
 def validate_event_triggers(file: h5py.File) -> None:
     # check for EV02 group
     if EV_DATASET_NAME not in file:
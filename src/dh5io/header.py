@@ -0,0 +1,404 @@
+"""Summary of the contents of a DAQ-HDF5 file and its on-disk sidecar cache.
+
+A `FileHeader` captures everything needed to decide what a file contains without
+reading bulk data: the geometry, sample periods and calibration of all CONT and SPIKE
+blocks, a summary of their INDEX datasets, trial counts from the TRIALMAP, marker
+names and the processing history in `/Operations`.
+
+Collecting this information requires traversing the HDF5 file, which is slow on
+network file systems. `load_header` therefore stores the header as JSON in a sidecar
+file (`<file>.dh5meta` next to the file or in a cache directory) and returns the
+stored header as long as modification time and size of the file are unchanged.
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import pathlib
+from dataclasses import dataclass, field
+import h5py
+import numpy as np
+from dhspec.cont import CONT_PREFIX, DATA_DATASET_NAME, INDEX_DATASET_NAME, cont_id_from_name
+from dhspec.dh5file import BOARDS_ATTRIBUTE_NAME, FILEVERSION_ATTRIBUTE_NAME
+from dhspec.event_triggers import EV_DATASET_NAME
+from dhspec.markers import MARKERS_GROUP_NAME
+from dhspec.operations import (
+    OPERATIONS_DATE_NAME,
+    OPERATIONS_GROUP_NAME,
+    OPERATIONS_OPERATOR_NAME_NAME,
+    OPERATIONS_ORIGINAL_FILENAME_NAME,
+    OPERATIONS_TOOL_NAME,
+)
+from dhspec.spike import CLUSTER_INFO_DATASET_NAME, SPIKE_PREFIX, spike_id_from_name
+from dhspec.trialmap import TRIALMAP_DATASET_NAME
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_SUFFIX = ".dh5meta"
+SIDECAR_FORMAT_VERSION = 1
+
+
+@dataclass
+class ContHeader:
+    id: int
+    name: str | None
+    signal_type: str | None
+    n_samples: int
+    n_channels: int
+    sample_period_ns: int
+    calibration: list[float] | None
+    n_regions: int
+    # timestamp of the first sample and of the end of the last sample in ns
+    start_time_ns: int | None
+    end_time_ns: int | None
+    # total duration of all recording regions in ns (without gaps)
+    recorded_duration_ns: int
+    # content of the Channels attribute, one dictionary per channel
+    channels: list[dict] | None = None
+
+    @property
+    def sample_rate_hz(self) -> float:
+        return 1e9 / self.sample_period_ns
+
+
+@dataclass
+class SpikeHeader:
+    id: int
+    n_spikes: int
+    n_channels: int
+    sample_period_ns: int | None
+    spike_samples: int | None
+    pre_trig_samples: int | None
+    lockout_samples: int | None
+    calibration: list[float] | None
+    cluster_ids: list[int] | None
+    first_spike_time_ns: int | None
+    last_spike_time_ns: int | None
+
+
+@dataclass
+class TrialCount:
+    stim_no: int
+    outcome: int
+    count: int
+
+
+@dataclass
+class OperationInfo:
+    name: str
+    tool: str | None
+    operator_name: str | None
+    date: str | None
+    original_filename: str | None
+
+
+@dataclass
+class FileHeader:
+    filename: str
+    version: int | None
+    boards: list[str]
+    conts: list[ContHeader] = field(default_factory=list)
+    spikes: list[SpikeHeader] = field(default_factory=list)
+    n_trials: int = 0
+    trial_counts: list[TrialCount] = field(default_factory=list)
+    n_events: int = 0
+    markers: dict[str, int] = field(default_factory=dict)
+    operations: list[OperationInfo] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "FileHeader":
+        d = dict(d)
+        d["conts"] = [ContHeader(**c) for c in d.get("conts", [])]
+        d["spikes"] = [SpikeHeader(**s) for s in d.get("spikes", [])]
+        d["trial_counts"] = [TrialCount(**t) for t in d.get("trial_counts", [])]
+        d["operations"] = [OperationInfo(**o) for o in d.get("operations", [])]
+        return cls(**d)
+
+
+# read from HDF5
+
+
+def read_header(file: h5py.File) -> FileHeader:
+    """Collect the header of an open DAQ-HDF5 file."""
+    boards = file.attrs.get(BOARDS_ATTRIBUTE_NAME)
+    version = file.attrs.get(FILEVERSION_ATTRIBUTE_NAME)
+    header = FileHeader(
+        filename=str(file.filename),
+        version=None if version is None else int(version),
+        boards=[] if boards is None else [_to_str(b) for b in np.atleast_1d(boards)],
+    )
+
+    for name in file.keys():
+        if file.get(name, getclass=True) is not h5py.Group:
+            continue
+        if name.startswith(CONT_PREFIX):
+            header.conts.append(_read_cont_header(file[name]))
+        elif name.startswith(SPIKE_PREFIX):
+            header.spikes.append(_read_spike_header(file[name]))
+
+    trialmap = file.get(TRIALMAP_DATASET_NAME)
+    if trialmap is not None:
+        trials = trialmap.fields(["StimNo", "Outcome"])[()]
+        header.n_trials = len(trials)
+        header.trial_counts = _trial_counts(trials)
+
+    events = file.get(EV_DATASET_NAME)
+    if events is not None:
+        header.n_events = len(events)
+
+    markers = file.get(MARKERS_GROUP_NAME)
+    if markers is not None:
+        header.markers = {name: len(markers[name]) for name in markers.keys()}
+
+    operations = file.get(OPERATIONS_GROUP_NAME)
+    if operations is not None:
+        for name, operation in operations.items():
+            header.operations.append(_operation_info(name, operation.attrs))
+
+    return header
+
+
+# The following functions build the parts of the header from attributes and arrays,
+# so that they can be shared with other storage backends (see dh5io.reader).
+
+
+def _trial_counts(trials: np.ndarray) -> list[TrialCount]:
+    if len(trials) == 0:
+        return []
+    pairs, counts = np.unique(
+        np.stack([trials["StimNo"], trials["Outcome"]], axis=1),
+        axis=0,
+        return_counts=True,
+    )
+    return [
+        TrialCount(int(stim), int(outcome), int(count))
+        for (stim, outcome), count in zip(pairs, counts)
+    ]
+
+
+def _operation_info(name: str, attrs) -> OperationInfo:
+    return OperationInfo(
+        name=name,
+        tool=_optional_str(attrs.get(OPERATIONS_TOOL_NAME)),
+        operator_name=_optional_str(attrs.get(OPERATIONS_OPERATOR_NAME_NAME)),
+        date=_date_to_str(attrs.get(OPERATIONS_DATE_NAME)),
+        original_filename=_optional_str(attrs.get(OPERATIONS_ORIGINAL_FILENAME_NAME)),
+    )
+
+
+def _read_cont_header(cont_group: h5py.Group) -> ContHeader:
+    return _cont_header(
+        cont_group.name,
+        cont_group.attrs,
+        cont_group[DATA_DATASET_NAME].shape,
+        cont_group[INDEX_DATASET_NAME][()],
+    )
+
+
+def _cont_header(name: str, attrs, shape: tuple, index: np.ndarray) -> ContHeader:
+    n_samples, n_channels = shape
+    sample_period_ns = int(attrs["SamplePeriod"])
+    calibration = attrs.get("Calibration")
+    channels = attrs.get("Channels")
+
+    start_time = end_time = None
+    if len(index) > 0:
+        offsets = index["offset"]
+        region_samples = np.diff(np.append(offsets, n_samples))
+        start_time = int(index["time"][0])
+        end_time = int(index["time"][-1] + region_samples[-1] * sample_period_ns)
+
+    return ContHeader(
+        id=cont_id_from_name(name),
+        name=_optional_str(attrs.get("Name")),
+        signal_type=_optional_str(attrs.get("SignalType")),
+        n_samples=int(n_samples),
+        n_channels=int(n_channels),
+        sample_period_ns=sample_period_ns,
+        calibration=(
+            None if calibration is None else [float(c) for c in np.atleast_1d(calibration)]
+        ),
+        n_regions=len(index),
+        start_time_ns=start_time,
+        end_time_ns=end_time,
+        recorded_duration_ns=int(n_samples) * sample_period_ns,
+        channels=(
+            None if channels is None else [_record_to_dict(c) for c in np.atleast_1d(channels)]
+        ),
+    )
+
+
+def _read_spike_header(spike_group: h5py.Group) -> SpikeHeader:
+    index = spike_group.get(INDEX_DATASET_NAME)
+    data = spike_group.get(DATA_DATASET_NAME)
+    clusters = None
+    if CLUSTER_INFO_DATASET_NAME in spike_group:
+        clusters = spike_group[CLUSTER_INFO_DATASET_NAME][()]
+    n_spikes = 0 if index is None else len(index)
+    return _spike_header(
+        spike_group.name,
+        spike_group.attrs,
+        None if data is None else data.shape,
+        n_spikes,
+        (int(index[0]), int(index[-1])) if n_spikes > 0 else None,
+        clusters,
+    )
+
+
+def _spike_header(
+    name: str,
+    attrs,
+    data_shape: tuple | None,
+    n_spikes: int,
+    spike_time_range: tuple[int, int] | None,
+    clusters: np.ndarray | None,
+) -> SpikeHeader:
+    params = attrs.get("SpikeParams")
+    calibration = attrs.get("Calibration")
+    sample_period = attrs.get("SamplePeriod")
+    cluster_ids = None if clusters is None else [int(c) for c in np.unique(clusters)]
+
+    return SpikeHeader(
+        id=spike_id_from_name(name),
+        n_spikes=n_spikes,
+        n_channels=0 if data_shape is None or len(data_shape) < 2 else int(data_shape[1]),
+        sample_period_ns=None if sample_period is None else int(sample_period),
+        spike_samples=None if params is None else int(params["spikeSamples"]),
+        pre_trig_samples=None if params is None else int(params["preTrigSamples"]),
+        lockout_samples=None if params is None else int(params["lockOutSamples"]),
+        calibration=(
+            None if calibration is None else [float(c) for c in np.atleast_1d(calibration)]
+        ),
+        cluster_ids=cluster_ids,
+        first_spike_time_ns=None if spike_time_range is None else spike_time_range[0],
+        last_spike_time_ns=None if spike_time_range is None else spike_time_range[1],
+    )
+
+
+def _record_to_dict(record: np.void) -> dict:
+    return {name: record[name].item() for name in record.dtype.names}
+
+
+def _to_str(value) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return str(value)
+
+
+def _optional_str(value) -> str | None:
+    return None if value is None else _to_str(value)
+
+
+def _date_to_str(date) -> str | None:
+    if date is None:
+        return None
+    try:
+        return (
+            f"{int(date['Year']):04d}-{int(date['Month']):02d}-{int(date['Day']):02d}"
+            f"T{int(date['Hour']):02d}:{int(date['Minute']):02d}:{int(date['Second']):02d}"
+        )
+    except (ValueError, KeyError, IndexError, TypeError):
+        return _to_str(date)
+
+
+# sidecar cache
+
+
+def sidecar_path(
+    filename: str | pathlib.Path, cache_dir: str | pathlib.Path | None = None
+) -> pathlib.Path:
+    """Location of the sidecar file of `filename`.
+
+    Without `cache_dir` the sidecar is stored next to the file. In a cache directory
+    sidecars are named after a hash of the resolved path of the file.
+    """
+    path = pathlib.Path(filename).resolve()
+    if cache_dir is None:
+        return path.with_name(path.name + SIDECAR_SUFFIX)
+    digest = hashlib.sha1(str(path).encode("utf-8")).hexdigest()
+    return pathlib.Path(cache_dir) / (digest + SIDECAR_SUFFIX)
+
+
+def _file_signature(filename: str | pathlib.Path) -> dict:
+    stat = os.stat(filename)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def read_sidecar(
+    filename: str | pathlib.Path, cache_dir: str | pathlib.Path | None = None
+) -> FileHeader | None:
+    """Return the header stored in the sidecar of `filename` if it is up to date."""
+    path = sidecar_path(filename, cache_dir)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.debug(f"Ignoring unreadable sidecar {path}: {e}")
+        return None
+
+    if (
+        content.get("format_version") != SIDECAR_FORMAT_VERSION
+        or content.get("source") != _file_signature(filename)
+    ):
+        logger.debug(f"Sidecar {path} is stale")
+        return None
+    try:
+        return FileHeader.from_dict(content["header"])
+    except (KeyError, TypeError) as e:
+        logger.debug(f"Ignoring invalid sidecar {path}: {e}")
+        return None
+
+
+def write_sidecar(
+    filename: str | pathlib.Path,
+    header: FileHeader,
+    cache_dir: str | pathlib.Path | None = None,
+) -> pathlib.Path:
+    """Store `header` in the sidecar of `filename`, keyed by its mtime and size."""
+    path = sidecar_path(filename, cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = {
+        "format_version": SIDECAR_FORMAT_VERSION,
+        "source": _file_signature(filename),
+        "header": header.to_dict(),
+    }
+    # write to a temporary file first so that readers never see a partial sidecar
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(content, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_header(
+    filename: str | pathlib.Path,
+    cache_dir: str | pathlib.Path | None = None,
+    use_sidecar: bool = True,
+) -> FileHeader:
+    """Return the header of a DAQ-HDF5 file, using its sidecar if it is fresh.
+
+    If the sidecar is missing or stale, the header is read from the file and the
+    sidecar is (re)written. Failing to write the sidecar, e.g. on a read-only file
+    system, is not an error.
+    """
+    if use_sidecar:
+        header = read_sidecar(filename, cache_dir)
+        if header is not None:
+            return header
+
+    with h5py.File(filename, "r") as file:
+        header = read_header(file)
+
+    if use_sidecar:
+        try:
+            write_sidecar(filename, header, cache_dir)
+        except OSError as e:
+            logger.debug(f"Could not write sidecar for {filename}: {e}")
+    return header
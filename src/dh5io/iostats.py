@@ -0,0 +1,275 @@
+"""Opt-in instrumentation of dataset reads.
+
+Reads done by the readers of `dh5io` go through `read`, which records statistics for
+every active `IOStats`:
+
+- the number of read calls and the time spent per dataset,
+- the number of bytes requested (size of the selection in memory) and an estimate of
+  the bytes read from storage,
+- estimated chunk cache hits and misses,
+- the time spent reading filtered (e.g. compressed) datasets, which is an upper bound
+  of the decompression time.
+
+HDF5 does not report chunk cache hits, so they are estimated by replaying the chunks
+touched by each selection through an LRU model of the chunk cache of the dataset.
+The bytes read from storage are estimated from the missed chunks and the compression
+ratio of the dataset. Reads done directly on h5py datasets are not recorded; use
+`read` for them.
+
+Statistics are collected for a `DH5File` opened with `instrument=True` (see
+`DH5File.io_stats`) and within the `measure_io` context manager:
+
+    with measure_io() as stats:
+        data = get_cont_data_by_id_from_file("session.dh5", 1)
+    print(stats.summary())
+"""
+
+import contextlib
+import contextvars
+import itertools
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+from typing import Any
+import h5py
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DatasetStats:
+    read_calls: int = 0
+    bytes_requested: int = 0
+    # estimated bytes read from storage
+    bytes_read: int = 0
+    chunk_hits: int = 0
+    chunk_misses: int = 0
+    read_s: float = 0.0
+    # time spent reading filtered datasets, including decompression
+    filtered_read_s: float = 0.0
+
+
+class _ChunkCacheModel:
+    """LRU model of the chunk cache of one dataset."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._chunks: OrderedDict[tuple, None] = OrderedDict()
+
+    def access(self, chunk: tuple) -> bool:
+        """Record an access of `chunk`, return True if it was cached."""
+        if chunk in self._chunks:
+            self._chunks.move_to_end(chunk)
+            return True
+        if self.capacity > 0:
+            self._chunks[chunk] = None
+            if len(self._chunks) > self.capacity:
+                self._chunks.popitem(last=False)
+        return False
+
+
+@dataclass(eq=False)
+class IOStats:
+    """Read statistics per dataset, keyed by '<filename>:<dataset name>'."""
+
+    datasets: dict[str, DatasetStats] = field(default_factory=dict)
+    _cache_models: dict[str, _ChunkCacheModel] = field(default_factory=dict, repr=False)
+
+    def _total(self, name: str) -> Any:
+        return sum(getattr(stats, name) for stats in self.datasets.values())
+
+    @property
+    def read_calls(self) -> int:
+        return self._total("read_calls")
+
+    @property
+    def bytes_requested(self) -> int:
+        return self._total("bytes_requested")
+
+    @property
+    def bytes_read(self) -> int:
+        return self._total("bytes_read")
+
+    @property
+    def chunk_hits(self) -> int:
+        return self._total("chunk_hits")
+
+    @property
+    def chunk_misses(self) -> int:
+        return self._total("chunk_misses")
+
+    @property
+    def read_s(self) -> float:
+        return self._total("read_s")
+
+    @property
+    def filtered_read_s(self) -> float:
+        return self._total("filtered_read_s")
+
+    def reset(self) -> None:
+        self.datasets.clear()
+        self._cache_models.clear()
+
+    def to_dict(self) -> dict:
+        return {
+            "read_calls": self.read_calls,
+            "bytes_requested": self.bytes_requested,
+            "bytes_read": self.bytes_read,
+            "chunk_hits": self.chunk_hits,
+            "chunk_misses": self.chunk_misses,
+            "read_s": self.read_s,
+            "filtered_read_s": self.filtered_read_s,
+            "datasets": {key: asdict(stats) for key, stats in self.datasets.items()},
+        }
+
+    def summary(self) -> str:
+        lines = [
+            f"{self.read_calls} reads, {self.bytes_requested / 2**20:.1f} MiB requested, "
+            f"~{self.bytes_read / 2**20:.1f} MiB read, {self.chunk_hits} chunk hits, "
+            f"{self.chunk_misses} chunk misses, {self.read_s:.3f} s "
+            f"({self.filtered_read_s:.3f} s in filtered datasets)"
+        ]
+        for key, stats in sorted(self.datasets.items(), key=lambda item: -item[1].read_s):
+            lines.append(
+                f"  {key}: {stats.read_calls} reads, "
+                f"{stats.bytes_requested / 2**20:.1f} MiB, {stats.read_s:.3f} s"
+            )
+        return "\n".join(lines)
+
+    def record(
+        self, dataset: h5py.Dataset, selection: Any, nbytes: int, duration_s: float
+    ) -> None:
+        """Add a read of `selection` from `dataset` that returned `nbytes` bytes."""
+        key = f"{dataset.file.filename}:{dataset.name}"
+        stats = self.datasets.get(key)
+        if stats is None:
+            stats = self.datasets[key] = DatasetStats()
+        stats.read_calls += 1
+        stats.bytes_requested += nbytes
+        stats.read_s += duration_s
+
+        if dataset.chunks is None:
+            stats.bytes_read += nbytes
+            return
+
+        model = self._cache_models.get(key)
+        if model is None:
+            model = self._cache_models[key] = _ChunkCacheModel(_chunk_cache_capacity(dataset))
+        hits = misses = 0
+        for chunk in _touched_chunks(dataset.shape, dataset.chunks, selection):
+            if model.access(chunk):
+                hits += 1
+            else:
+                misses += 1
+        stats.chunk_hits += hits
+        stats.chunk_misses += misses
+
+        chunk_nbytes = int(np.prod(dataset.chunks)) * dataset.dtype.itemsize
+        if dataset.compression is not None or dataset.id.get_create_plist().get_nfilters():
+            stats.filtered_read_s += duration_s
+            logical = dataset.size * dataset.dtype.itemsize
+            ratio = dataset.id.get_storage_size() / logical if logical else 1.0
+            chunk_nbytes = int(chunk_nbytes * ratio)
+        stats.bytes_read += misses * chunk_nbytes
+
+
+def _chunk_cache_capacity(dataset: h5py.Dataset) -> int:
+    """Number of chunks of `dataset` that fit into its chunk cache."""
+    _, cache_nbytes, _ = dataset.id.get_access_plist().get_chunk_cache()
+    chunk_nbytes = int(np.prod(dataset.chunks)) * dataset.dtype.itemsize
+    # chunks larger than the cache are not cached at all
+    return cache_nbytes // chunk_nbytes
+
+
+def _normalize_selection(shape: tuple[int, ...], selection: Any) -> tuple:
+    if not isinstance(selection, tuple):
+        selection = (selection,)
+    # field names of compound datasets do not select elements
+    selection = tuple(s for s in selection if not isinstance(s, str))
+    if any(s is Ellipsis for s in selection):
+        i = next(i for i, s in enumerate(selection) if s is Ellipsis)
+        fill = (slice(None),) * (len(shape) - len(selection) + 1)
+        selection = selection[:i] + fill + selection[i + 1 :]
+    return selection + (slice(None),) * (len(shape) - len(selection))
+
+
+def _touched_chunks(
+    shape: tuple[int, ...], chunks: tuple[int, ...], selection: Any
+) -> Iterator[tuple[int, ...]]:
+    """Grid coordinates of all chunks touched by `selection`."""
+    chunk_indices = []
+    for n, size, s in zip(shape, chunks, _normalize_selection(shape, selection)):
+        if isinstance(s, slice):
+            start, stop, step = s.indices(n)
+            if stop <= start:
+                return iter(())
+            if step < size:
+                # every chunk in the range is touched
+                chunk_indices.append(range(start // size, (stop - 1) // size + 1))
+                continue
+            elements = np.arange(start, stop, step)
+        else:
+            elements = np.atleast_1d(np.asarray(s))
+            if elements.dtype == bool:
+                elements = np.flatnonzero(elements)
+            elements = elements % n if n else elements
+        chunk_indices.append(np.unique(elements // size).tolist())
+    return itertools.product(*chunk_indices)
+
+
+# stats of `measure_io` blocks active in the current context
+_active_stats: contextvars.ContextVar[tuple[IOStats, ...]] = contextvars.ContextVar(
+    "dh5io_active_io_stats", default=()
+)
+
+# stats of instrumented files, keyed by the HDF5 file number
+_file_stats: dict[tuple, "weakref.WeakSet[IOStats]"] = {}
+
+
+def register_file(file: h5py.File, stats: IOStats) -> None:
+    """Record all reads from `file` in `stats`."""
+    _file_stats.setdefault(file.id.fileno, weakref.WeakSet()).add(stats)
+
+
+def unregister_file(file: h5py.File, stats: IOStats) -> None:
+    fileno = file.id.fileno
+    stats_set = _file_stats.get(fileno)
+    if stats_set is not None:
+        stats_set.discard(stats)
+        if len(stats_set) == 0:
+            del _file_stats[fileno]
+
+
+@contextlib.contextmanager
+def measure_io(log_level: int | None = logging.INFO) -> Iterator[IOStats]:
+    """Collect statistics of all reads in the block, and log them at `log_level`."""
+    stats = IOStats()
+    token = _active_stats.set(_active_stats.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active_stats.reset(token)
+        if log_level is not None:
+            logger.log(log_level, stats.summary())
+
+
+def read(dataset: h5py.Dataset, selection: Any = ()) -> np.ndarray:
+    """Return `dataset[selection]`, recording the read in all active `IOStats`."""
+    targets = list(_active_stats.get())
+    if _file_stats:
+        targets.extend(_file_stats.get(dataset.id.fileno, ()))
+    if not targets:
+        return dataset[selection]
+
+    start = time.perf_counter()
+    data = dataset[selection]
+    duration_s = time.perf_counter() - start
+    nbytes = np.asarray(data).nbytes
+    for stats in targets:
+        stats.record(dataset, selection, nbytes, duration_s)
+    logger.debug(f"Read {nbytes} bytes from {dataset.name} in {duration_s * 1e3:.3f} ms")
+    return data
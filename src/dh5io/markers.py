@@ -2,9 +2,13 @@ from dhspec.markers import (
     MARKERS_GROUP_NAME,
     MARKERS_DATASET_DTYPE,
 )
+import bisect
+from collections.abc import Iterator, Mapping, Sequence
 import numpy as np
 import numpy.typing as npt
 import h5py
+import dh5io.iostats as iostats
+from dh5io.cache import invalidate_cache
 from dh5io.errors import DH5Error
 import logging
 
@@ -37,6 +41,7 @@ def add_marker_to_file(
     markers_group.create_dataset(
         marker_name, data=np.array(timestamps, dtype=MARKERS_DATASET_DTYPE)
     )
+    invalidate_cache(file)
 
 
 def get_all_markers(file: h5py.File) -> dict[str, np.ndarray]:
@@ -48,7 +53,7 @@ def get_all_markers(file: h5py.File) -> dict[str, np.ndarray]:
     markers_group = file[MARKERS_GROUP_NAME]
     markers = {}
     for marker_name, dataset in markers_group.items():
-        markers[marker_name] = np.array(dataset, dtype=np.int64)
+        markers[marker_name] = np.asarray(iostats.read(dataset), dtype=np.int64)
     return markers
 
 
@@ -62,7 +67,114 @@ def get_marker_from_file(file: h5py.File, marker_name: str) -> np.ndarray | None
     if marker_name not in markers_group:
         logger.warning(f"Marker '{marker_name}' not found in file {file.filename}")
         return None
-    return np.array(markers_group[marker_name], dtype=np.int64)
+    return np.asarray(iostats.read(markers_group[marker_name]), dtype=np.int64)
+
+
+class Markers(Mapping[str, np.ndarray]):
+    """Lazy, read-only mapping of marker name to timestamps in the '/Markers' group.
+
+    Marker datasets are opened on first access and their handles are kept. Full arrays
+    are read (and cached) only when a marker is accessed with `markers[name]`;
+    `window` reads just the requested time range from the file. Timestamps of each
+    marker are assumed to be sorted in ascending order.
+    """
+
+    def __init__(self, file: h5py.File):
+        self._file = file
+        group = file.get(MARKERS_GROUP_NAME)
+        self._names: tuple[str, ...] = tuple(group.keys()) if group is not None else ()
+        self._datasets: dict[str, h5py.Dataset] = {}
+        self._arrays: dict[str, np.ndarray] = {}
+
+    def __getitem__(self, marker_name: str) -> np.ndarray:
+        if marker_name not in self._arrays:
+            self._arrays[marker_name] = np.asarray(
+                iostats.read(self.dataset(marker_name)), dtype=MARKERS_DATASET_DTYPE
+            )
+        return self._arrays[marker_name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, marker_name: object) -> bool:
+        return marker_name in self._names
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        return self._names
+
+    def dataset(self, marker_name: str) -> h5py.Dataset:
+        """Return the (cached) dataset handle of a marker."""
+        dataset = self._datasets.get(marker_name)
+        if dataset is None:
+            if marker_name not in self._names:
+                raise KeyError(
+                    f"Marker '{marker_name}' not found in file {self._file.filename}"
+                )
+            dataset = self._file[MARKERS_GROUP_NAME][marker_name]
+            self._datasets[marker_name] = dataset
+        return dataset
+
+    def window(
+        self, marker_name: str, t_start: int | None = None, t_stop: int | None = None
+    ) -> np.ndarray:
+        """Return the timestamps of a marker within [t_start, t_stop) in nanoseconds.
+
+        If the marker was not read completely before, the bounds are found by binary
+        search on the dataset and only the matching slice is read from the file.
+        """
+        if marker_name in self._arrays:
+            times = self._arrays[marker_name]
+            lo = 0 if t_start is None else int(np.searchsorted(times, t_start, "left"))
+            hi = len(times) if t_stop is None else int(np.searchsorted(times, t_stop, "left"))
+            return times[lo:hi]
+
+        dataset = self.dataset(marker_name)
+        lo = 0 if t_start is None else _bisect_dataset(dataset, t_start)
+        hi = len(dataset) if t_stop is None else _bisect_dataset(dataset, t_stop)
+        if hi <= lo:
+            return np.empty(0, dtype=MARKERS_DATASET_DTYPE)
+        return np.asarray(iostats.read(dataset, slice(lo, hi)), dtype=MARKERS_DATASET_DTYPE)
+
+    def merged(
+        self,
+        marker_names: Sequence[str] | None = None,
+        t_start: int | None = None,
+        t_stop: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Merge several marker streams into one time-ordered stream.
+
+        Returns a tuple `(times, marker_ids)` where `marker_ids[i]` is the position of
+        the marker of `times[i]` in `marker_names` (all markers if None). Equal
+        timestamps keep the order of `marker_names`.
+        """
+        if marker_names is None:
+            marker_names = self._names
+        windows = [self.window(name, t_start, t_stop) for name in marker_names]
+        if len(windows) == 0:
+            return (
+                np.empty(0, dtype=MARKERS_DATASET_DTYPE),
+                np.empty(0, dtype=np.intp),
+            )
+        times = np.concatenate(windows)
+        marker_ids = np.repeat(
+            np.arange(len(windows), dtype=np.intp), [len(w) for w in windows]
+        )
+        # the stable sort merges the already sorted runs of each marker (k-way merge)
+        order = np.argsort(times, kind="stable")
+        return times[order], marker_ids[order]
+
+
+def _bisect_dataset(dataset: h5py.Dataset, value: int) -> int:
+    # each probe reads a single element, so only O(log n) elements are read
+    return bisect.bisect_left(dataset, value)
+
+
+def get_markers(file: h5py.File) -> Markers:
+    return Markers(file)
 
 
 def validate_markers(file: h5py.File) -> None:
@@ -76,6 +188,12 @@ def validate_markers(file: h5py.File) -> None:
         validate_marker_dataset(marker_name, dataset)
 
 
+def validate_marker_times(marker_name: str, dataset: h5py.Dataset) -> None:
+    """Check that the timestamps of a marker are sorted."""
+    if np.any(np.diff(dataset[()]) < 0):
+        raise DH5Error(f"Timestamps of marker '{marker_name}' are not sorted")
+
+
 def validate_marker_dataset(marker_name: str, dataset: h5py.Dataset) -> None:
     if not isinstance(dataset, h5py.Dataset) or dataset.dtype != np.int64:
         raise DH5Error(
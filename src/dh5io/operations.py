@@ -79,6 +79,7 @@ import logging
 import pathlib
 import h5py
 import h5py.h5t
+from dh5io.cache import invalidate_cache
 from dh5io.ensure_h5py_file import ensure_h5py_file
 from dh5io.errors import DH5Error, DH5Warning
 from dhspec.operations import (
@@ -135,6 +136,7 @@ def add_operation_to_file(
     new_operation_group.attrs["dh5io version"] = get_version()
 
     new_operation_group.attrs[OPERATIONS_DATE_NAME] = datetime_to_date_array(date)
+    invalidate_cache(file)
 
     logger.info(f"Added operation {new_operation_group_name} to file {file.filename}")
 
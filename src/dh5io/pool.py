@@ -0,0 +1,152 @@
+"""Pool of open read-only HDF5 file handles.
+
+Functions decorated with `ensure_h5py_file` accept a path instead of an open file.
+Opening an HDF5 file reads the superblock and root metadata, so calling several of
+these functions with the same path used to pay that cost every time. The pool keeps
+the most recently used read-only handles open instead.
+
+Pooling is off by default (`DEFAULT_POOL_SIZE` 0) and enabled with `set_pool_size`.
+An open read-only handle keeps HDF5 from opening the same file for writing, in this
+process ("file is already open for read-only") and, through HDF5 file locking, in
+other processes. Only enable the pool while the files are not written.
+
+Handles are keyed by the resolved path of the file. They are reopened when the
+modification time or size of the file changes. After a fork the child process starts
+with an empty pool, because HDF5 handles must not be shared between processes.
+Opening a file with write access through `DH5File` or `ensure_h5py_file` removes it
+from the pool; call `invalidate` before writing to a file with h5py directly.
+"""
+
+import collections
+import contextlib
+import logging
+import os
+import pathlib
+import threading
+from collections.abc import Iterator
+import h5py
+
+logger = logging.getLogger(__name__)
+
+# number of handles kept open, 0 disables pooling
+DEFAULT_POOL_SIZE = 0
+
+
+class FileHandlePool:
+    """LRU pool of open read-only `h5py.File` handles."""
+
+    def __init__(self, maxsize: int = DEFAULT_POOL_SIZE):
+        self.maxsize = maxsize
+        self._handles: collections.OrderedDict[str, tuple[tuple[int, int], h5py.File]] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+    def get(self, filename: str | pathlib.Path) -> h5py.File:
+        """Return an open read-only handle of `filename` from the pool.
+
+        If the pool is disabled (`maxsize` 0) a new handle is returned that the
+        caller has to close.
+        """
+        if self.maxsize <= 0:
+            return h5py.File(filename, "r")
+
+        path = str(pathlib.Path(filename).resolve())
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            self._check_pid()
+            entry = self._handles.get(path)
+            if entry is not None:
+                entry_signature, file = entry
+                if entry_signature == signature and file.id.valid:
+                    self._handles.move_to_end(path)
+                    return file
+                self._close(path)
+
+            file = h5py.File(path, "r")
+            self._handles[path] = (signature, file)
+            logger.debug(f"Opened {path} in file handle pool")
+            while len(self._handles) > self.maxsize:
+                self._close(next(iter(self._handles)))
+            return file
+
+    def invalidate(self, filename: str | pathlib.Path | None = None) -> None:
+        """Close the pooled handle of `filename`, or all handles if None."""
+        with self._lock:
+            self._check_pid()
+            if filename is None:
+                for path in list(self._handles):
+                    self._close(path)
+            else:
+                path = str(pathlib.Path(filename).resolve())
+                if path in self._handles:
+                    self._close(path)
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._handles) > max(maxsize, 0):
+                self._close(next(iter(self._handles)))
+
+    def _close(self, path: str) -> None:
+        _, file = self._handles.pop(path)
+        if file.id.valid:
+            file.close()
+        logger.debug(f"Closed {path} in file handle pool")
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+
+    def _reset_after_fork(self) -> None:
+        # handles inherited from the parent must not be used (or closed) in the child
+        self._handles = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+
+
+_pool = FileHandlePool()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: _pool._reset_after_fork())
+
+
+def get_pool() -> FileHandlePool:
+    return _pool
+
+
+def open_pooled(filename: str | pathlib.Path) -> h5py.File:
+    """Return a pooled read-only handle of `filename`. Do not close it."""
+    return _pool.get(filename)
+
+
+@contextlib.contextmanager
+def pooled_file(filename: str | pathlib.Path) -> Iterator[h5py.File]:
+    """Context manager for a pooled read-only handle of `filename`.
+
+    The handle stays open in the pool after the block, unless pooling is disabled.
+    """
+    # without pooling the caller owns the handle
+    owned = _pool.maxsize <= 0
+    file = _pool.get(filename)
+    try:
+        yield file
+    finally:
+        if owned:
+            file.close()
+
+
+def invalidate(filename: str | pathlib.Path | None = None) -> None:
+    """Close pooled handles of `filename` (or of all files)."""
+    _pool.invalidate(filename)
+
+
+def set_pool_size(maxsize: int) -> None:
+    """Set the number of handles kept open. 0 disables pooling."""
+    _pool.resize(maxsize)
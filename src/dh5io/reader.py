@@ -0,0 +1,411 @@
+"""Reading DAQ-HDF sessions independent of the storage backend.
+
+    from dh5io.reader import open_session
+
+    with open_session("session.dh5") as session:  # or a DAQ-HDF Zarr folder
+        lfp = session.read_cont(1, 10.0, 12.5, channels=[0, 3])
+        spikes = session.read_spikes(0, 10.0, 12.5)
+        trials = session.trialmap()
+
+`SessionReader` is the protocol analysis code should be written against. It covers
+the header, the timebase of the CONT blocks, time windows of CONT blocks, spikes,
+trials, event triggers and markers. `DH5Reader` reads DAQ-HDF5 files and
+`dhzio.reader.DHZReader` reads DAQ-HDF Zarr folders (as written by `dhzio.convert`);
+`open_session` picks the implementation from the path.
+
+Times are given like for `ContArray.time`: floats are seconds, integers are
+nanoseconds, and windows are half-open [t_start, t_stop). Returned timestamps are
+always integers in nanoseconds.
+"""
+
+import abc
+import pathlib
+from collections.abc import Mapping
+from typing import Any, NamedTuple, Protocol, runtime_checkable
+import h5py
+import numpy as np
+import dh5io.iostats as iostats
+from dh5io import header as header_module
+from dh5io.cont import get_regions, sample_times, time_range_to_samples
+from dh5io.contarray import _to_ns
+from dh5io.dh5file import DH5File
+from dh5io.errors import DH5Error
+from dh5io.header import FileHeader
+from dhspec.cont import (
+    CONT_PREFIX,
+    DATA_DATASET_NAME,
+    INDEX_DATASET_NAME,
+    cont_id_from_name,
+    cont_name_from_id,
+)
+from dhspec.dh5file import BOARDS_ATTRIBUTE_NAME, FILEVERSION_ATTRIBUTE_NAME
+from dhspec.event_triggers import EV_DATASET_DTYPE, EV_DATASET_NAME
+from dhspec.markers import MARKERS_GROUP_NAME
+from dhspec.operations import OPERATIONS_GROUP_NAME
+from dhspec.spike import (
+    CLUSTER_INFO_DATASET_NAME,
+    SPIKE_PREFIX,
+    spike_id_from_name,
+    spike_name_from_id,
+)
+from dhspec.trialmap import TRIALMAP_DATASET_NAME
+
+# suffixes of DAQ-HDF Zarr folders
+DHZ_SUFFIXES = (".dhz", ".zarr")
+
+
+class Spikes(NamedTuple):
+    """Spikes of a SPIKE block returned by `SessionReader.read_spikes`."""
+
+    times: np.ndarray  # nanoseconds
+    clusters: np.ndarray  # values of CLUSTER_INFO, 0 without CLUSTER_INFO
+    waveforms: np.ndarray | None  # (spikes, spikeSamples, channels) if requested
+
+
+@runtime_checkable
+class SessionReader(Protocol):
+    """Read access to a DAQ-HDF session, see the module documentation."""
+
+    path: str
+
+    def header(self) -> FileHeader: ...
+
+    def cont_ids(self) -> list[int]: ...
+
+    def spike_ids(self) -> list[int]: ...
+
+    def sample_period_ns(self, cont_id: int) -> int: ...
+
+    def regions(self, cont_id: int) -> np.ndarray: ...
+
+    def sample_times(self, cont_id: int, samples: slice | np.ndarray) -> np.ndarray: ...
+
+    def read_cont(
+        self,
+        cont_id: int,
+        t_start: float | int | None = None,
+        t_stop: float | int | None = None,
+        channels: Any = None,
+        calibrated: bool = False,
+    ) -> np.ndarray: ...
+
+    def read_spikes(
+        self,
+        spike_id: int,
+        t_start: float | int | None = None,
+        t_stop: float | int | None = None,
+        waveforms: bool = False,
+    ) -> Spikes: ...
+
+    def trialmap(self) -> np.ndarray | None: ...
+
+    def events(
+        self, t_start: float | int | None = None, t_stop: float | int | None = None
+    ) -> np.ndarray: ...
+
+    def marker_names(self) -> list[str]: ...
+
+    def marker(
+        self, name: str, t_start: float | int | None = None, t_stop: float | int | None = None
+    ) -> np.ndarray: ...
+
+    def close(self) -> None: ...
+
+    def __enter__(self) -> "SessionReader": ...
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None: ...
+
+
+def _window(times: np.ndarray, t_start, t_stop) -> slice:
+    t_start, t_stop = _to_ns(t_start), _to_ns(t_stop)
+    lo = 0 if t_start is None else int(np.searchsorted(times, t_start, "left"))
+    hi = len(times) if t_stop is None else int(np.searchsorted(times, t_stop, "left"))
+    return slice(lo, max(lo, hi))
+
+
+class BaseSessionReader(abc.ABC):
+    """`SessionReader` on top of a few storage primitives.
+
+    Implementations provide access to groups, attributes and arrays by path relative
+    to the root ("" is the root) and the reading of CONT samples; everything else is
+    derived from the DAQ-HDF layout shared by both backends.
+    """
+
+    path: str
+
+    def __init__(self, path: str | pathlib.Path):
+        self.path = str(path)
+        self._regions: dict[int, np.ndarray] = {}
+        self._spike_times: dict[int, np.ndarray] = {}
+        self._events: np.ndarray | None = None
+
+    # storage primitives
+    @abc.abstractmethod
+    def _group_names(self, path: str = "") -> list[str]:
+        """Sorted names of the groups in the group at `path`."""
+
+    @abc.abstractmethod
+    def _array_names(self, path: str) -> list[str]:
+        """Sorted names of the arrays in the group at `path`, empty if it is missing."""
+
+    @abc.abstractmethod
+    def _attrs(self, path: str) -> Mapping[str, Any]:
+        """Attributes of the group or array at `path`."""
+
+    @abc.abstractmethod
+    def _shape(self, path: str) -> tuple[int, ...] | None:
+        """Shape of the array at `path`, None if it does not exist."""
+
+    @abc.abstractmethod
+    def _read(self, path: str, selection: Any = slice(None)) -> np.ndarray:
+        """Read `selection` of the array at `path`."""
+
+    @abc.abstractmethod
+    def _read_cont_samples(
+        self, cont_id: int, samples: slice, channels: Any, calibrated: bool
+    ) -> np.ndarray:
+        """Read the rows `samples` of the DATA of `CONTn`, see `read_cont`."""
+
+    # header
+    def header(self) -> FileHeader:
+        attrs = self._attrs("")
+        boards = attrs.get(BOARDS_ATTRIBUTE_NAME)
+        version = attrs.get(FILEVERSION_ATTRIBUTE_NAME)
+        header = FileHeader(
+            filename=self.path,
+            version=None if version is None else int(version),
+            boards=[]
+            if boards is None
+            else [header_module._to_str(b) for b in np.atleast_1d(boards)],
+        )
+        for name in self._group_names():
+            if name.startswith(CONT_PREFIX):
+                header.conts.append(
+                    header_module._cont_header(
+                        name,
+                        self._attrs(name),
+                        self._shape(f"{name}/{DATA_DATASET_NAME}"),
+                        self._read(f"{name}/{INDEX_DATASET_NAME}"),
+                    )
+                )
+            elif name.startswith(SPIKE_PREFIX):
+                header.spikes.append(self._spike_header(name))
+
+        trialmap = self.trialmap()
+        if trialmap is not None:
+            header.n_trials = len(trialmap)
+            header.trial_counts = header_module._trial_counts(trialmap)
+        events_shape = self._shape(EV_DATASET_NAME)
+        header.n_events = 0 if events_shape is None else events_shape[0]
+        header.markers = {name: len(self.marker(name)) for name in self.marker_names()}
+        for name in self._group_names(OPERATIONS_GROUP_NAME):
+            attrs = self._attrs(f"{OPERATIONS_GROUP_NAME}/{name}")
+            header.operations.append(header_module._operation_info(name, attrs))
+        return header
+
+    def _spike_header(self, name: str):
+        times = self._spike_index(spike_id_from_name(name))
+        clusters_path = f"{name}/{CLUSTER_INFO_DATASET_NAME}"
+        clusters = None
+        if self._shape(clusters_path) is not None:
+            clusters = self._read(clusters_path)
+        return header_module._spike_header(
+            name,
+            self._attrs(name),
+            self._shape(f"{name}/{DATA_DATASET_NAME}"),
+            len(times),
+            (int(times[0]), int(times[-1])) if len(times) > 0 else None,
+            clusters,
+        )
+
+    # CONT blocks
+    def cont_ids(self) -> list[int]:
+        names = [name for name in self._group_names() if name.startswith(CONT_PREFIX)]
+        return sorted(cont_id_from_name(name) for name in names)
+
+    def sample_period_ns(self, cont_id: int) -> int:
+        return int(self._attrs(cont_name_from_id(cont_id))["SamplePeriod"])
+
+    def regions(self, cont_id: int) -> np.ndarray:
+        """Recording regions of a CONT block, see `dh5io.cont.get_regions`."""
+        if cont_id not in self._regions:
+            name = cont_name_from_id(cont_id)
+            shape = self._shape(f"{name}/{DATA_DATASET_NAME}")
+            if shape is None:
+                raise DH5Error(f"{name} does not exist in {self.path}")
+            index = self._read(f"{name}/{INDEX_DATASET_NAME}")
+            self._regions[cont_id] = get_regions(index, shape[0])
+        return self._regions[cont_id]
+
+    def sample_times(self, cont_id: int, samples: slice | np.ndarray) -> np.ndarray:
+        """Timestamps in nanoseconds of samples of a CONT block."""
+        regions = self.regions(cont_id)
+        if isinstance(samples, slice):
+            n_samples = int(regions["stop"][-1]) if len(regions) else 0
+            samples = np.arange(*samples.indices(n_samples))
+        return sample_times(regions, self.sample_period_ns(cont_id), samples)
+
+    def cont_samples(self, cont_id: int, t_start=None, t_stop=None) -> slice:
+        """Samples of a CONT block with timestamps in [t_start, t_stop)."""
+        regions, sample_period_ns = self.regions(cont_id), self.sample_period_ns(cont_id)
+        return time_range_to_samples(regions, sample_period_ns, _to_ns(t_start), _to_ns(t_stop))
+
+    def read_cont(
+        self,
+        cont_id: int,
+        t_start: float | int | None = None,
+        t_stop: float | int | None = None,
+        channels: Any = None,
+        calibrated: bool = False,
+    ) -> np.ndarray:
+        """Samples of a CONT block in [t_start, t_stop) with shape (samples, channels).
+
+        `channels` is a slice, an index or a list of indices, all channels if None.
+        """
+        samples = self.cont_samples(cont_id, t_start, t_stop)
+        return self._read_cont_samples(cont_id, samples, channels, calibrated)
+
+    # SPIKE blocks
+    def spike_ids(self) -> list[int]:
+        names = [name for name in self._group_names() if name.startswith(SPIKE_PREFIX)]
+        return sorted(spike_id_from_name(name) for name in names)
+
+    def _spike_index(self, spike_id: int) -> np.ndarray:
+        if spike_id not in self._spike_times:
+            path = f"{spike_name_from_id(spike_id)}/{INDEX_DATASET_NAME}"
+            if self._shape(path) is None:
+                raise DH5Error(f"{spike_name_from_id(spike_id)} does not exist in {self.path}")
+            self._spike_times[spike_id] = np.asarray(self._read(path), dtype=np.int64)
+        return self._spike_times[spike_id]
+
+    def read_spikes(
+        self,
+        spike_id: int,
+        t_start: float | int | None = None,
+        t_stop: float | int | None = None,
+        waveforms: bool = False,
+    ) -> Spikes:
+        """Timestamps, clusters and optionally waveforms of the spikes in a window."""
+        name = spike_name_from_id(spike_id)
+        times = self._spike_index(spike_id)
+        spikes = _window(times, t_start, t_stop)
+        clusters_path = f"{name}/{CLUSTER_INFO_DATASET_NAME}"
+        if self._shape(clusters_path) is None:
+            clusters = np.zeros(spikes.stop - spikes.start, dtype=np.uint8)
+        else:
+            clusters = self._read(clusters_path, spikes)
+        spike_waveforms = None
+        if waveforms:
+            n_samples = int(self._attrs(name)["SpikeParams"]["spikeSamples"])
+            rows = slice(spikes.start * n_samples, spikes.stop * n_samples)
+            data = self._read(f"{name}/{DATA_DATASET_NAME}", rows)
+            spike_waveforms = data.reshape(-1, n_samples, data.shape[1])
+        return Spikes(times[spikes], clusters, spike_waveforms)
+
+    # trials, events and markers
+    def trialmap(self) -> np.ndarray | None:
+        if self._shape(TRIALMAP_DATASET_NAME) is None:
+            return None
+        return self._read(TRIALMAP_DATASET_NAME)
+
+    def events(
+        self, t_start: float | int | None = None, t_stop: float | int | None = None
+    ) -> np.ndarray:
+        """Event triggers (EV02) in [t_start, t_stop), empty if there are none."""
+        if self._events is None:
+            if self._shape(EV_DATASET_NAME) is None:
+                self._events = np.empty(0, dtype=EV_DATASET_DTYPE)
+            else:
+                self._events = self._read(EV_DATASET_NAME)
+        return self._events[_window(self._events["time"], t_start, t_stop)]
+
+    def marker_names(self) -> list[str]:
+        return self._array_names(MARKERS_GROUP_NAME)
+
+    def marker(
+        self, name: str, t_start: float | int | None = None, t_stop: float | int | None = None
+    ) -> np.ndarray:
+        """Timestamps of a marker in [t_start, t_stop)."""
+        path = f"{MARKERS_GROUP_NAME}/{name}"
+        if self._shape(path) is None:
+            raise KeyError(f"Marker '{name}' not found in {self.path}")
+        times = self._read(path)
+        return times[_window(times, t_start, t_stop)]
+
+    # context manager
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class DH5Reader(BaseSessionReader):
+    """`SessionReader` of a DAQ-HDF5 file, opened read only with `DH5File`."""
+
+    def __init__(self, path: str | pathlib.Path, **kwargs):
+        super().__init__(path)
+        self.dh5 = DH5File(path, mode="r", **kwargs)
+        self._file = self.dh5.file
+
+    def _group(self, path: str) -> h5py.Group | None:
+        group = self._file.get(path) if path else self._file
+        return group if isinstance(group, h5py.Group) else None
+
+    def _group_names(self, path: str = "") -> list[str]:
+        group = self._group(path)
+        if group is None:
+            return []
+        return sorted(name for name, obj in group.items() if isinstance(obj, h5py.Group))
+
+    def _array_names(self, path: str) -> list[str]:
+        group = self._group(path)
+        if group is None:
+            return []
+        return sorted(name for name, obj in group.items() if isinstance(obj, h5py.Dataset))
+
+    def _attrs(self, path: str) -> Mapping[str, Any]:
+        return self._file[path].attrs if path else self._file.attrs
+
+    def _shape(self, path: str) -> tuple[int, ...] | None:
+        dataset = self._file.get(path)
+        return dataset.shape if isinstance(dataset, h5py.Dataset) else None
+
+    def _read(self, path: str, selection: Any = slice(None)) -> np.ndarray:
+        return iostats.read(self._file[path], selection)
+
+    def _read_cont_samples(self, cont_id, samples, channels, calibrated) -> np.ndarray:
+        array = self.dh5.cont[cont_id]
+        if calibrated:
+            array = array.calibrated
+        return array[samples, slice(None) if channels is None else channels]
+
+    def header(self) -> FileHeader:
+        # cached by DH5File
+        return self.dh5.get_header()
+
+    def marker(self, name, t_start=None, t_stop=None) -> np.ndarray:
+        # binary search in the dataset, reads only the window
+        return self.dh5.get_markers().window(name, _to_ns(t_start), _to_ns(t_stop))
+
+    def close(self) -> None:
+        self.dh5.close()
+
+
+def open_session(path: str | pathlib.Path, **kwargs) -> SessionReader:
+    """Open a DAQ-HDF5 file or a DAQ-HDF Zarr folder with the matching reader.
+
+    Keyword arguments are passed to the reader, e.g. `profile` to `DH5Reader`.
+    """
+    path = pathlib.Path(path)
+    if path.is_dir() or path.suffix.lower() in DHZ_SUFFIXES:
+        # imported here because zarr is an optional dependency
+        from dhzio.reader import DHZReader
+
+        return DHZReader(path, **kwargs)
+    if path.is_file() and not h5py.is_hdf5(path):
+        raise DH5Error(f"{path} is neither a DAQ-HDF5 file nor a DAQ-HDF Zarr folder")
+    return DH5Reader(path, **kwargs)
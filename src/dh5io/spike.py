@@ -1,7 +1,11 @@
+import logging
+import warnings
 from dataclasses import dataclass
 import h5py
 import numpy as np
+from dh5io.cache import invalidate_cache
 from dh5io.ensure_h5py_file import ensure_h5py_file
+from dh5io.errors import DH5Error, DH5Warning
 from dhspec.cont import CalibrationType
 from dhspec.spike import (
     SPIKE_PREFIX,
@@ -15,9 +19,9 @@ from dhspec.spike import (
     spike_id_from_name,
 )
 
+logger = logging.getLogger(__name__)
+
 # TODO:
-# %  DH.CREATESPIKE
-# %  DH.ENUMSPIKE
 # %  DH.READSPIKE
 # %  DH.WRITESPIKE
 # %  DH.READSPIKEINDEX
@@ -42,24 +46,111 @@ def create_empty_spike_group_in_file(
     nChannels: int,
     spikeParams: SpikeParams,
     sample_period_ns: np.int32,
-    n_index_items: int = 1,
     # numpy array with dtype=np.float64 of length nChannels describing calibration
     calibration: CalibrationType | None = None,
     # numpy array with dtype=CHANNELS_DTYPE of length nChannels describing channels
     channels: np.ndarray | None = None,
     name: str | None = None,
     comment: str | None = None,
+    with_cluster_info: bool = False,
 ) -> h5py.Group:
-    # TODO: implement this function
-    pass
+    existing_spike_ids = enumerate_spike_groups(file)
+
+    # check if opened with write access
+    if not file.mode == "r+" and not file.mode == "w" and not file.mode == "a":
+        raise DH5Error(f"File must be opened with write access but is open with {file.mode}")
+
+    # fail if SPIKE group already exists
+    if spike_group_id in existing_spike_ids:
+        raise DH5Error(f"SPIKE{spike_group_id} already exists in {file.filename}")
+
+    if spike_group_id is None:
+        spike_group_id = max(existing_spike_ids, default=-1) + 1
+        logger.debug(f"No SPIKE group id provided, creating new SPIKE group {spike_group_id}")
+
+    spike_group = file.create_group(spike_name_from_id(spike_group_id))
+    invalidate_cache(file)
 
+    spike_group.create_dataset(
+        DATA_DATASET_NAME,
+        shape=(nSpikes * int(spikeParams.spikeSamples), nChannels),
+        dtype=np.int16,
+    )
+    spike_group.create_dataset(INDEX_DATASET_NAME, shape=(nSpikes,), dtype=np.int64)
+    if with_cluster_info:
+        spike_group.create_dataset(CLUSTER_INFO_DATASET_NAME, shape=(nSpikes,), dtype=np.uint8)
 
-def create_spike_group_with_data():
-    pass
+    spike_group.attrs["SpikeParams"] = np.array(
+        (spikeParams.spikeSamples, spikeParams.preTrigSamples, spikeParams.lockOutSamples),
+        dtype=SPIKE_PARAMS_DTYPE,
+    )
+    spike_group.attrs["SamplePeriod"] = np.int32(sample_period_ns)
+    if channels is None:
+        channels = np.zeros(nChannels, dtype=SPIKE_CHANNELS_DTYPE)
+    spike_group.attrs["Channels"] = channels
 
+    # optional attributes
+    if calibration is not None:
+        spike_group.attrs["Calibration"] = calibration
 
+    spike_group.attrs["Name"] = name if name is not None else f"SPIKE{spike_group_id}"
+    spike_group.attrs["Comment"] = comment if comment is not None else ""
+
+    return spike_group
+
+
+@ensure_h5py_file
+def create_spike_group_with_data(
+    file: h5py.File,
+    spike_group_id: int | None,
+    data: np.ndarray,
+    index: np.ndarray,
+    spikeParams: SpikeParams,
+    sample_period_ns: np.int32,
+    cluster_info: np.ndarray | None = None,
+    calibration: CalibrationType | None = None,
+    channels: np.ndarray | None = None,
+    name: str | None = None,
+    comment: str | None = None,
+) -> h5py.Group:
+    """Create a SPIKE group from waveforms `data` (nSpikes x spikeSamples rows,
+    nChannels columns) and spike timestamps `index` in nanoseconds."""
+    if data.ndim != 2 or data.shape[0] != index.shape[0] * int(spikeParams.spikeSamples):
+        raise DH5Error(
+            f"DATA must have spikeSamples x nSpikes = {spikeParams.spikeSamples} x "
+            f"{index.shape[0]} rows, but has shape {data.shape}"
+        )
+    if cluster_info is not None and cluster_info.shape != index.shape:
+        raise DH5Error("CLUSTER_INFO must have one entry per spike")
+
+    spike_group = create_empty_spike_group_in_file(
+        file,
+        spike_group_id,
+        nSpikes=index.shape[0],
+        nChannels=data.shape[1],
+        spikeParams=spikeParams,
+        sample_period_ns=sample_period_ns,
+        calibration=calibration,
+        channels=channels,
+        name=name,
+        comment=comment,
+        with_cluster_info=cluster_info is not None,
+    )
+    if not data.dtype == np.int16:
+        warnings.warn(
+            f"Data was converted from {data.dtype} to numpy.int16", category=DH5Warning
+        )
+        data = data.astype(np.int16)
+    spike_group[DATA_DATASET_NAME][:] = data
+    spike_group[INDEX_DATASET_NAME][:] = index
+    if cluster_info is not None:
+        spike_group[CLUSTER_INFO_DATASET_NAME][:] = cluster_info
+    return spike_group
+
+
+@ensure_h5py_file
 def enumerate_spike_groups(file: h5py.File) -> list[int]:
-    return []
+    return [spike_id_from_name(name) for name in get_spike_group_names_from_file(file)]
 
 
 @ensure_h5py_file
@@ -69,7 +160,8 @@ def get_spike_group_names_from_file(
     return [
         name
         for name in filename.keys()
-        if name.startswith(SPIKE_PREFIX) and isinstance(filename[name], h5py.Group)
+        if name.startswith(SPIKE_PREFIX)
+        and filename.get(name, getclass=True) is h5py.Group
     ]
 
 
@@ -85,3 +177,54 @@ def get_spike_group_by_id_from_file(file: h5py.File, id: int) -> h5py.Group | No
     if name in file:
         return file[name]
     return None
+
+
+# validate
+
+
+def validate_spike_group(spike_group: h5py.Group) -> None:
+    """Validate attributes and dataset shapes of a SPIKE group."""
+    if not isinstance(spike_group, h5py.Group):
+        raise DH5Error("Not a valid HDF5 group")
+
+    params = spike_group.attrs.get("SpikeParams")
+    if params is None:
+        raise DH5Error(f"SpikeParams attribute is missing from SPIKE group {spike_group.name}")
+    if spike_group.attrs.get("SamplePeriod") is None:
+        raise DH5Error(
+            f"SamplePeriod attribute is missing from SPIKE group {spike_group.name}"
+        )
+
+    for name in (DATA_DATASET_NAME, INDEX_DATASET_NAME):
+        if not isinstance(spike_group.get(name), h5py.Dataset):
+            raise DH5Error(f"{name} dataset is missing from SPIKE group {spike_group.name}")
+
+    data = spike_group[DATA_DATASET_NAME]
+    index = spike_group[INDEX_DATASET_NAME]
+    if data.ndim != 2 or data.dtype != np.int16:
+        raise DH5Error(
+            f"DATA dataset in {spike_group.name} must be a 2D int16 array, "
+            f"but has shape {data.shape} and dtype {data.dtype}"
+        )
+    if index.ndim != 1 or index.dtype != np.int64:
+        raise DH5Error(f"INDEX dataset in {spike_group.name} must be a 1D int64 array")
+
+    spike_samples = int(params["spikeSamples"])
+    if data.shape[0] != spike_samples * index.shape[0]:
+        raise DH5Error(
+            f"DATA dataset in {spike_group.name} has {data.shape[0]} samples, expected "
+            f"spikeSamples x nSpikes = {spike_samples} x {index.shape[0]}"
+        )
+
+    cluster_info = spike_group.get(CLUSTER_INFO_DATASET_NAME)
+    if cluster_info is not None and cluster_info.shape != index.shape:
+        raise DH5Error(
+            f"CLUSTER_INFO dataset in {spike_group.name} has {cluster_info.shape[0]} "
+            f"entries but there are {index.shape[0]} spikes"
+        )
+
+
+def validate_spike_index(spike_group: h5py.Group) -> None:
+    """Check that spike timestamps are sorted."""
+    if np.any(np.diff(spike_group[INDEX_DATASET_NAME][()]) < 0):
+        raise DH5Error(f"Spike timestamps in {spike_group.name} are not sorted")
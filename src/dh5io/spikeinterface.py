@@ -0,0 +1,186 @@
+"""SpikeInterface extractors reading CONT and SPIKE blocks of DH5 files directly.
+
+    from dh5io.spikeinterface import read_dh5_recording, read_dh5_sorting
+
+    recording = read_dh5_recording("session.dh5", cont_id=1)
+    sorting = read_dh5_sorting("session.dh5", spike_id=0, cont_id=1)
+
+Every recording region of the INDEX of `CONTn` becomes a segment of the recording, so
+the gaps between regions are never interpolated over. Traces are read from
+`CONTn/DATA` on demand as one hyperslab of contiguous columns, channel subsets are
+selected in memory. The gains convert the samples to microvolts using the
+Calibration attribute (in volts).
+
+The sorting maps the spike timestamps in the INDEX of `SPIKEn` to sample frames and
+the values of CLUSTER_INFO to unit ids (all spikes belong to unit 0 without
+CLUSTER_INFO). With `cont_id` the frames and segments refer to that CONT block and
+spikes in the gaps between its regions are dropped; otherwise there is a single
+segment starting at time zero sampled with the SamplePeriod of the SPIKE block.
+
+Both extractors only keep the path of the file and open it through the handle pool
+of `dh5io.pool`, so they can be pickled and used by the multiprocessing job engine
+of SpikeInterface without a binary copy of the data.
+"""
+
+import pathlib
+import numpy as np
+from spikeinterface.core import (
+    BaseRecording,
+    BaseRecordingSegment,
+    BaseSorting,
+    BaseSortingSegment,
+)
+from spikeinterface.core.core_tools import define_function_from_class
+import dh5io.iostats as iostats
+import dh5io.pool as pool
+from dh5io.cont import get_regions
+from dh5io.contarray import ContArray
+from dh5io.errors import DH5Error
+from dhspec.cont import DATA_DATASET_NAME, INDEX_DATASET_NAME, cont_name_from_id
+from dhspec.spike import CLUSTER_INFO_DATASET_NAME, spike_name_from_id
+
+
+def _get_group(file, name: str):
+    group = file.get(name)
+    if group is None:
+        raise DH5Error(f"{name} does not exist in {file.filename}")
+    return group
+
+
+def _cont_regions(cont_group) -> tuple[np.ndarray, int]:
+    """Non-empty recording regions and the sample period in nanoseconds."""
+    n_samples = cont_group[DATA_DATASET_NAME].shape[0]
+    regions = get_regions(iostats.read(cont_group[INDEX_DATASET_NAME]), n_samples)
+    return regions[regions["stop"] > regions["start"]], int(cont_group.attrs["SamplePeriod"])
+
+
+class DH5RecordingExtractor(BaseRecording):
+    """Recording of the signal of `CONTn`, one segment per recording region."""
+
+    def __init__(self, file_path: str | pathlib.Path, cont_id: int):
+        file_path = str(pathlib.Path(file_path).resolve())
+        name = cont_name_from_id(cont_id)
+        with pool.pooled_file(file_path) as file:
+            cont_group = _get_group(file, name)
+            data = cont_group[DATA_DATASET_NAME]
+            dtype, n_channels = data.dtype, data.shape[1]
+            regions, sample_period_ns = _cont_regions(cont_group)
+            calibration = cont_group.attrs.get("Calibration")
+            channels = cont_group.attrs.get("Channels")
+        if len(regions) == 0:
+            raise DH5Error(f"{name} in {file_path} has no recorded samples")
+
+        channel_ids = np.arange(n_channels)
+        if channels is not None and len(np.unique(channels["GlobalChanNumber"])) == n_channels:
+            channel_ids = np.asarray(channels["GlobalChanNumber"], dtype=np.int64)
+        sampling_frequency = 1e9 / sample_period_ns
+        BaseRecording.__init__(self, sampling_frequency, list(channel_ids), dtype)
+
+        if calibration is not None:
+            self.set_channel_gains(np.asarray(calibration, dtype=np.float64) * 1e6)
+            self.set_channel_offsets(0.0)
+        if channels is not None:
+            self.set_property("board_channel", np.asarray(channels["BoardChanNo"]))
+
+        for region in regions:
+            self.add_recording_segment(
+                DH5RecordingSegment(
+                    file_path,
+                    name,
+                    int(region["start"]),
+                    int(region["stop"]),
+                    sampling_frequency,
+                    t_start=region["time"] * 1e-9,
+                )
+            )
+
+        self.extra_requirements.append("h5py")
+        self._kwargs = {"file_path": file_path, "cont_id": cont_id}
+
+
+class DH5RecordingSegment(BaseRecordingSegment):
+    def __init__(self, file_path, cont_name, start, stop, sampling_frequency, t_start):
+        BaseRecordingSegment.__init__(self, sampling_frequency, t_start=t_start)
+        self.file_path = file_path
+        self.cont_name = cont_name
+        self.start = start
+        self.stop = stop
+
+    def get_num_samples(self) -> int:
+        return self.stop - self.start
+
+    def get_traces(self, start_frame=None, end_frame=None, channel_indices=None) -> np.ndarray:
+        start_frame = 0 if start_frame is None else start_frame
+        end_frame = self.get_num_samples() if end_frame is None else end_frame
+        rows = slice(self.start + start_frame, self.start + end_frame)
+        columns = slice(None) if channel_indices is None else channel_indices
+        with pool.pooled_file(self.file_path) as file:
+            return ContArray(file[self.cont_name])[rows, columns]
+
+
+class DH5SortingExtractor(BaseSorting):
+    """Sorting of the spikes of `SPIKEn` with the clusters of CLUSTER_INFO as units."""
+
+    def __init__(
+        self, file_path: str | pathlib.Path, spike_id: int, cont_id: int | None = None
+    ):
+        file_path = str(pathlib.Path(file_path).resolve())
+        with pool.pooled_file(file_path) as file:
+            spike_group = _get_group(file, spike_name_from_id(spike_id))
+            times = iostats.read(spike_group[INDEX_DATASET_NAME]).astype(np.int64)
+            if CLUSTER_INFO_DATASET_NAME in spike_group:
+                clusters = iostats.read(spike_group[CLUSTER_INFO_DATASET_NAME])
+            else:
+                clusters = np.zeros(len(times), dtype=np.uint8)
+            if cont_id is None:
+                sample_period_ns = int(spike_group.attrs["SamplePeriod"])
+                regions = None
+            else:
+                regions, sample_period_ns = _cont_regions(
+                    _get_group(file, cont_name_from_id(cont_id))
+                )
+
+        clusters = clusters.astype(np.int64)
+        BaseSorting.__init__(self, 1e9 / sample_period_ns, list(np.unique(clusters)))
+
+        order = np.argsort(times, kind="stable")
+        times, clusters = times[order], clusters[order]
+        if regions is None:
+            frames = times // sample_period_ns
+            self.add_sorting_segment(DH5SortingSegment(frames, clusters))
+        else:
+            ends = regions["time"] + (regions["stop"] - regions["start"]) * sample_period_ns
+            for region, end in zip(regions, ends):
+                first, last = np.searchsorted(times, [region["time"], end])
+                frames = (times[first:last] - region["time"]) // sample_period_ns
+                segment = DH5SortingSegment(
+                    frames, clusters[first:last], t_start=region["time"] * 1e-9
+                )
+                self.add_sorting_segment(segment)
+
+        self.extra_requirements.append("h5py")
+        self._kwargs = {"file_path": file_path, "spike_id": spike_id, "cont_id": cont_id}
+
+
+class DH5SortingSegment(BaseSortingSegment):
+    def __init__(self, frames: np.ndarray, clusters: np.ndarray, t_start: float | None = None):
+        BaseSortingSegment.__init__(self, t_start=t_start)
+        self._frames = frames
+        self._clusters = clusters
+        self._unit_frames: dict = {}
+
+    def get_unit_spike_train(self, unit_id, start_frame, end_frame) -> np.ndarray:
+        if unit_id not in self._unit_frames:
+            self._unit_frames[unit_id] = self._frames[self._clusters == unit_id]
+        frames = self._unit_frames[unit_id]
+        first = 0 if start_frame is None else np.searchsorted(frames, start_frame, "left")
+        last = len(frames) if end_frame is None else np.searchsorted(frames, end_frame, "left")
+        return frames[first:last]
+
+
+read_dh5_recording = define_function_from_class(
+    source_class=DH5RecordingExtractor, name="read_dh5_recording"
+)
+read_dh5_sorting = define_function_from_class(
+    source_class=DH5SortingExtractor, name="read_dh5_sorting"
+)
@@ -0,0 +1,228 @@
+"""Generate synthetic DAQ-HDF5 files for testing and benchmarking.
+
+The generated sessions resemble real recordings: every CONT block has several
+recording regions separated by gaps, each region is one trial in the TRIALMAP with
+event triggers in EV02 and markers at fixed points in the trial, and every SPIKE block
+holds spikes from a few clusters with Poisson-distributed timestamps.
+
+CONT data is written in blocks of `block_samples` rows and SPIKE data in blocks of
+`spike_block_spikes` spikes whose waveforms take the same memory (`block_nbytes`), so
+files much larger than the available memory can be generated:
+
+    config = SyntheticConfig.for_size(10 * 2**30)  # ~10 GiB of CONT data
+    generate_session("large.dh5", config)
+"""
+
+import dataclasses
+import logging
+import pathlib
+from dataclasses import dataclass
+import numpy as np
+from dh5io.cont import create_empty_cont_group_in_file
+from dh5io.create import create_dh_file
+from dh5io.event_triggers import add_event_triggers_to_file
+from dh5io.markers import add_marker_to_file
+from dh5io.spike import create_empty_spike_group_in_file
+from dh5io.trialmap import add_trialmap_to_file
+from dhspec.cont import create_channel_info, create_empty_index_array
+from dhspec.spike import SpikeParams
+from dhspec.trialmap import TRIALMAP_DATASET_DTYPE
+
+logger = logging.getLogger(__name__)
+
+TRIAL_START_EVENT = 1
+TRIAL_END_EVENT = 2
+
+
+@dataclass
+class SyntheticConfig:
+    n_cont: int = 2
+    n_channels: int = 4
+    sample_period_ns: int = 1_000_000
+    n_regions: int = 10
+    region_duration_s: float = 10.0
+    gap_duration_s: float = 1.0
+    n_spike_groups: int = 1
+    spike_rate_hz: float = 20.0
+    n_clusters: int = 3
+    spike_samples: int = 32
+    n_stimuli: int = 4
+    # markers at these fractions of every trial
+    markers: dict[str, float] = dataclasses.field(
+        default_factory=lambda: {"fixation": 0.1, "stimulus": 0.3, "response": 0.8}
+    )
+    block_samples: int = 1 << 20
+    seed: int = 0
+
+    @property
+    def region_samples(self) -> int:
+        return int(self.region_duration_s * 1e9 / self.sample_period_ns)
+
+    @property
+    def block_nbytes(self) -> int:
+        """Size in bytes of the float64 buffer of one block of CONT rows."""
+        return self.block_samples * self.n_channels * 8
+
+    @property
+    def spike_block_spikes(self) -> int:
+        """Number of spikes whose float64 waveforms fit in `block_nbytes`."""
+        return max(1, self.block_nbytes // (self.spike_samples * self.n_channels * 8))
+
+    @property
+    def cont_nbytes(self) -> int:
+        """Total size of all CONT DATA datasets in bytes."""
+        return self.n_cont * self.n_regions * self.region_samples * self.n_channels * 2
+
+    @classmethod
+    def for_size(cls, cont_nbytes: int, **kwargs) -> "SyntheticConfig":
+        """Return a config whose CONT data has about `cont_nbytes` bytes by adjusting
+        the duration of the regions."""
+        config = cls(**kwargs)
+        bytes_per_second = (
+            config.n_cont * config.n_regions * config.n_channels * 2 * 1e9
+        ) / config.sample_period_ns
+        config.region_duration_s = cont_nbytes / bytes_per_second
+        return config
+
+
+def _region_starts_ns(config: SyntheticConfig) -> np.ndarray:
+    region_ns = config.region_samples * config.sample_period_ns
+    period_ns = region_ns + int(config.gap_duration_s * 1e9)
+    return np.arange(config.n_regions, dtype=np.int64) * period_ns
+
+
+def _write_cont(file, cont_id: int, config: SyntheticConfig, rng: np.random.Generator):
+    n_samples = config.n_regions * config.region_samples
+    channels = np.array(
+        [
+            create_channel_info(cont_id * 100 + i, i, 16, 5.0, -5.0, 1000.0)
+            for i in range(config.n_channels)
+        ]
+    )
+    cont_group = create_empty_cont_group_in_file(
+        file,
+        cont_id,
+        nSamples=n_samples,
+        nChannels=config.n_channels,
+        sample_period_ns=np.int32(config.sample_period_ns),
+        n_index_items=config.n_regions,
+        calibration=np.full(config.n_channels, 1e-6),
+        channels=channels,
+    )
+
+    index = create_empty_index_array(config.n_regions)
+    index["time"] = _region_starts_ns(config)
+    index["offset"] = np.arange(config.n_regions, dtype=np.int64) * config.region_samples
+    cont_group["INDEX"][:] = index
+
+    # oscillation plus noise, one frequency per channel
+    frequencies = 5.0 + 3.0 * np.arange(config.n_channels)
+    sample_period_s = config.sample_period_ns * 1e-9
+    data = cont_group["DATA"]
+    for start in range(0, n_samples, config.block_samples):
+        stop = min(start + config.block_samples, n_samples)
+        t = np.arange(start, stop)[:, np.newaxis] * sample_period_s
+        block = 2000 * np.sin(2 * np.pi * frequencies * t)
+        block += rng.normal(0, 300, block.shape)
+        data[start:stop] = block.astype(np.int16)
+
+
+def _write_spikes(file, spike_id: int, config: SyntheticConfig, rng: np.random.Generator):
+    region_starts = _region_starts_ns(config)
+    region_ns = config.region_samples * config.sample_period_ns
+    n_spikes_per_region = rng.poisson(
+        config.spike_rate_hz * config.region_duration_s, config.n_regions
+    )
+    n_spikes = int(n_spikes_per_region.sum())
+
+    spike_params = SpikeParams(
+        np.int16(config.spike_samples), np.int16(config.spike_samples // 4), np.int16(10)
+    )
+    spike_group = create_empty_spike_group_in_file(
+        file,
+        spike_id,
+        nSpikes=n_spikes,
+        nChannels=config.n_channels,
+        spikeParams=spike_params,
+        sample_period_ns=np.int32(config.sample_period_ns),
+        calibration=np.full(config.n_channels, 1e-6),
+        with_cluster_info=True,
+    )
+
+    # one waveform template per cluster
+    t = np.linspace(0, 1, config.spike_samples)
+    templates = np.stack(
+        [
+            -(1000 + 500 * c) * np.exp(-(((t - 0.25) / 0.05) ** 2))
+            for c in range(config.n_clusters)
+        ]
+    )
+
+    spike = 0
+    for region_start, n_region_spikes in zip(region_starts, n_spikes_per_region):
+        # split long regions into consecutive time windows written one at a time
+        n_blocks = max(1, -(-int(n_region_spikes) // config.spike_block_spikes))
+        edges = region_start + np.linspace(0, region_ns, n_blocks + 1).astype(np.int64)
+        # equal counts, so no block exceeds spike_block_spikes
+        counts = np.diff(np.linspace(0, n_region_spikes, n_blocks + 1).astype(np.int64))
+        for t_start, t_stop, n in zip(edges[:-1], edges[1:], counts):
+            times = np.sort(rng.integers(t_start, t_stop, n))
+            clusters = rng.integers(0, config.n_clusters, n).astype(np.uint8)
+            waveforms = templates[clusters][:, :, np.newaxis] + rng.normal(
+                0, 100, (n, config.spike_samples, config.n_channels)
+            )
+            spike_group["INDEX"][spike : spike + n] = times
+            spike_group["CLUSTER_INFO"][spike : spike + n] = clusters
+            spike_group["DATA"][
+                spike * config.spike_samples : (spike + n) * config.spike_samples
+            ] = waveforms.reshape(-1, config.n_channels).astype(np.int16)
+            spike += n
+
+
+def generate_session(
+    filename: str | pathlib.Path, config: SyntheticConfig | None = None, **kwargs
+) -> pathlib.Path:
+    """Write a synthetic session to `filename`, overwriting an existing file.
+
+    Fields of `SyntheticConfig` can be passed as keyword arguments instead of `config`.
+    """
+    if config is None:
+        config = SyntheticConfig(**kwargs)
+    elif kwargs:
+        config = dataclasses.replace(config, **kwargs)
+    rng = np.random.default_rng(config.seed)
+    logger.info(f"Generating {filename} with {config.cont_nbytes / 2**20:.1f} MiB CONT data")
+
+    with create_dh_file(filename, overwrite=True, boards=["synthetic"]) as dh5file:
+        file = dh5file.file
+        for cont_id in range(1, config.n_cont + 1):
+            _write_cont(file, cont_id, config, rng)
+        for spike_id in range(config.n_spike_groups):
+            _write_spikes(file, spike_id, config, rng)
+
+        starts = _region_starts_ns(config)
+        ends = starts + config.region_samples * config.sample_period_ns
+        trialmap = np.rec.array(np.zeros(config.n_regions, dtype=TRIALMAP_DATASET_DTYPE))
+        trialmap.TrialNo = np.arange(1, config.n_regions + 1)
+        trialmap.StimNo = rng.integers(1, config.n_stimuli + 1, config.n_regions)
+        trialmap.Outcome = rng.integers(0, 2, config.n_regions)
+        trialmap.StartTime = starts
+        trialmap.EndTime = ends
+        add_trialmap_to_file(file, trialmap)
+
+        times = [starts, ends]
+        codes = [
+            np.full(config.n_regions, TRIAL_START_EVENT),
+            np.full(config.n_regions, TRIAL_END_EVENT),
+        ]
+        for i, (name, fraction) in enumerate(config.markers.items()):
+            marker_times = starts + ((ends - starts) * fraction).astype(np.int64)
+            add_marker_to_file(file, name, marker_times)
+            times.append(marker_times)
+            codes.append(np.full(config.n_regions, TRIAL_END_EVENT + 1 + i))
+        times = np.concatenate(times)
+        order = np.argsort(times, kind="stable")
+        add_event_triggers_to_file(
+            file, times[order], np.concatenate(codes)[order].astype(np.int32)
+        )
+    return pathlib.Path(filename)
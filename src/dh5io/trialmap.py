@@ -59,6 +59,8 @@ corresponding piece of signal within `CONT` or `SPIKE` blocks.
 
 import logging
 import h5py
+import dh5io.iostats as iostats
+from dh5io.cache import invalidate_cache
 from dh5io.errors import DH5Error
 import numpy
 from dhspec.trialmap import TRIALMAP_DATASET_DTYPE, TRIALMAP_DATASET_NAME
@@ -79,6 +81,7 @@ def add_trialmap_to_file(
         del file[TRIALMAP_DATASET_NAME]
         logger.debug(f"Replacing existing TRIALMAP dataset in file {file.filename}")
     file.create_dataset(TRIALMAP_DATASET_NAME, data=trialmap)
+    invalidate_cache(file)
 
 
 def get_trialmap_from_file(file: h5py.File) -> numpy.recarray | None:
@@ -87,7 +90,7 @@ def get_trialmap_from_file(file: h5py.File) -> numpy.recarray | None:
         return None
     else:
         return numpy.rec.array(
-            numpy.array(trialmap_dataset, dtype=TRIALMAP_DATASET_DTYPE)
+            numpy.asarray(iostats.read(trialmap_dataset), dtype=TRIALMAP_DATASET_DTYPE)
         )
 
 
@@ -99,6 +102,16 @@ def validate_trialmap(file: h5py.File):
     validate_trialmap_dataset(file[TRIALMAP_DATASET_NAME])
 
 
+def validate_trialmap_times(trialmap: h5py.Dataset) -> None:
+    """Check that trials end after they start and are ordered by StartTime."""
+    times = trialmap.fields(["StartTime", "EndTime"])[()]
+    n_reversed = numpy.count_nonzero(times["EndTime"] < times["StartTime"])
+    if n_reversed > 0:
+        raise DH5Error(f"{n_reversed} trials in TRIALMAP end before they start")
+    if numpy.any(numpy.diff(times["StartTime"]) < 0):
+        raise DH5Error("Trials in TRIALMAP are not ordered by StartTime")
+
+
 def validate_trialmap_dataset(trialmap: h5py.Dataset) -> None:
     # trialmap must be a compound dataset with fields 'TrialNo', 'StimNo', 'Outcome', 'StartTime', 'EndTime'
     if (
@@ -1,17 +1,51 @@
+"""Validation of DAQ-HDF5 files.
+
+`validate_dh5_file` checks the structure of a file and raises a `DH5Error` for the first
+problem found. `validate` runs a configurable set of checks and returns a structured
+`ValidationReport` with the result and duration of every check:
+
+- `ValidationLevel.QUICK` checks attributes, datatypes and dataset shapes only.
+- `ValidationLevel.STANDARD` additionally runs vectorized consistency checks on the
+  small datasets: CONT INDEX offsets and region times, SPIKE timestamps, TRIALMAP,
+  EV02 and Markers ordering.
+- `ValidationLevel.DEEP` additionally streams all CONT and SPIKE DATA in large blocks to
+  find saturated samples, long all-zero stretches and chunks failing their checksum.
+"""
+
+import dataclasses
+import enum
 import pathlib
+import time
+import warnings
+from dataclasses import dataclass, field
 from warnings import warn
 import h5py
+import numpy as np
+from dhspec.cont import CONT_PREFIX, DATA_DATASET_NAME
 from dhspec.dh5file import BOARDS_ATTRIBUTE_NAME, FILEVERSION_ATTRIBUTE_NAME
+from dhspec.event_triggers import EV_DATASET_NAME
+from dhspec.markers import MARKERS_GROUP_NAME
+from dhspec.spike import SPIKE_PREFIX
+from dhspec.trialmap import TRIALMAP_DATASET_NAME
 from dh5io.errors import DH5Error, DH5Warning
 from dh5io.cont import get_cont_groups_from_file
 from dh5io.operations import validate_operations
-from dh5io.cont import validate_cont_group, validate_cont_dtype
-from dh5io.trialmap import validate_trialmap
-from dh5io.event_triggers import validate_event_triggers
+from dh5io.cont import validate_cont_group, validate_cont_dtype, validate_cont_index
+from dh5io.trialmap import validate_trialmap, validate_trialmap_dataset, validate_trialmap_times
+from dh5io.event_triggers import (
+    validate_event_triggers,
+    validate_event_triggers_dataset,
+    validate_event_trigger_times,
+)
+from dh5io.markers import validate_marker_dataset, validate_marker_times
+from dh5io.spike import validate_spike_group, validate_spike_index
 import logging
 
 logger = logging.getLogger(__name__)
 
+# size of the blocks of DATA read at once by the deep scan
+DEEP_SCAN_BLOCK_BYTES = 64 * 1024 * 1024
+
 
 def validate_dh5_file(file: str | pathlib.Path | h5py.File, throw=True) -> None | str:
     """Validate if the given file is a valid DAQ-HDF5 file.
@@ -19,9 +53,11 @@ def validate_dh5_file(file: str | pathlib.Path | h5py.File, throw=True) -> None
     This function checks if the file has the required attributes and groups.
     """
 
+    opened_here = False
     try:
         if isinstance(file, (str, pathlib.Path)):
             file = h5py.File(file, "r")
+            opened_here = True
 
         if not isinstance(file, (str, pathlib.Path, h5py.File)):
             raise TypeError("filename must be a str, pathlib.Path or h5py.File")
@@ -55,3 +91,281 @@ def validate_dh5_file(file: str | pathlib.Path | h5py.File, throw=True) -> None
             raise e
         else:
             return str(e)
+    finally:
+        # do not leak the handle of a file opened from a path
+        if opened_here:
+            file.close()
+
+
+# tiered validation with structured report
+
+
+class ValidationLevel(enum.Enum):
+    QUICK = "quick"
+    STANDARD = "standard"
+    DEEP = "deep"
+
+
+@dataclass
+class ValidationIssue:
+    severity: str  # "error" or "warning"
+    message: str
+
+
+@dataclass
+class CheckResult:
+    check: str
+    location: str
+    duration_s: float
+    issues: list[ValidationIssue] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not any(issue.severity == "error" for issue in self.issues)
+
+
+@dataclass
+class ValidationReport:
+    filename: str
+    level: ValidationLevel
+    checks: list[CheckResult] = field(default_factory=list)
+    duration_s: float = 0.0
+
+    @property
+    def errors(self) -> list[ValidationIssue]:
+        return [i for c in self.checks for i in c.issues if i.severity == "error"]
+
+    @property
+    def warnings(self) -> list[ValidationIssue]:
+        return [i for c in self.checks for i in c.issues if i.severity == "warning"]
+
+    @property
+    def ok(self) -> bool:
+        return len(self.errors) == 0
+
+    def to_dict(self) -> dict:
+        d = dataclasses.asdict(self)
+        d["level"] = self.level.value
+        d["ok"] = self.ok
+        return d
+
+
+def validate(
+    file: str | pathlib.Path | h5py.File,
+    level: ValidationLevel | str = ValidationLevel.STANDARD,
+    zero_run_s: float = 1.0,
+) -> ValidationReport:
+    """Validate a DAQ-HDF5 file and return a report instead of raising.
+
+    `zero_run_s` is the minimal duration of an all-zero stretch in CONT DATA that is
+    reported by the deep scan.
+    """
+    level = ValidationLevel(level)
+    if isinstance(file, (str, pathlib.Path)):
+        with h5py.File(file, "r") as h5file:
+            return validate(h5file, level, zero_run_s)
+
+    start = time.perf_counter()
+    report = ValidationReport(filename=str(file.filename), level=level)
+    standard = level in (ValidationLevel.STANDARD, ValidationLevel.DEEP)
+    deep = level == ValidationLevel.DEEP
+
+    _run_check(report, "file_attributes", "/", _validate_file_attributes, file)
+    _run_check(report, "operations", "/", validate_operations, file)
+
+    cont_names = []
+    spike_names = []
+    for name in file.keys():
+        if file.get(name, getclass=True) is not h5py.Group:
+            continue
+        if name.startswith(CONT_PREFIX):
+            cont_names.append(name)
+        elif name.startswith(SPIKE_PREFIX):
+            spike_names.append(name)
+
+    if cont_names:
+        _run_check(report, "cont_dtype", "/", validate_cont_dtype, file)
+
+    for name in cont_names:
+        group = file[name]
+        if not _run_check(report, "cont_group", group.name, validate_cont_group, group):
+            continue
+        if standard and not _run_check(
+            report, "cont_index", group.name, validate_cont_index, group
+        ):
+            continue
+        if deep:
+            sample_period = int(group.attrs["SamplePeriod"])
+            zero_run_samples = max(1, int(zero_run_s * 1e9 / sample_period))
+            _run_check(
+                report,
+                "cont_data_scan",
+                group[DATA_DATASET_NAME].name,
+                scan_data,
+                group[DATA_DATASET_NAME],
+                zero_run_samples,
+            )
+
+    for name in spike_names:
+        group = file[name]
+        if not _run_check(report, "spike_group", group.name, validate_spike_group, group):
+            continue
+        if standard and not _run_check(
+            report, "spike_index", group.name, validate_spike_index, group
+        ):
+            continue
+        if deep:
+            _run_check(
+                report,
+                "spike_data_scan",
+                group[DATA_DATASET_NAME].name,
+                scan_data,
+                group[DATA_DATASET_NAME],
+                None,
+            )
+
+    trialmap = file.get(TRIALMAP_DATASET_NAME)
+    if trialmap is not None:
+        location = trialmap.name
+        if _run_check(report, "trialmap", location, validate_trialmap_dataset, trialmap):
+            if standard:
+                _run_check(report, "trialmap_times", location, validate_trialmap_times, trialmap)
+
+    events = file.get(EV_DATASET_NAME)
+    if events is not None:
+        location = events.name
+        if _run_check(report, "events", location, validate_event_triggers_dataset, events):
+            if standard:
+                _run_check(
+                    report, "event_times", location, validate_event_trigger_times, events
+                )
+
+    markers = file.get(MARKERS_GROUP_NAME)
+    if markers is not None:
+        for marker_name, dataset in markers.items():
+            location = f"{markers.name}/{marker_name}"
+            if _run_check(
+                report, "marker", location, validate_marker_dataset, marker_name, dataset
+            ):
+                if standard:
+                    _run_check(
+                        report,
+                        "marker_times",
+                        location,
+                        validate_marker_times,
+                        marker_name,
+                        dataset,
+                    )
+
+    report.duration_s = time.perf_counter() - start
+    return report
+
+
+def _validate_file_attributes(file: h5py.File) -> None:
+    if file.attrs.get(FILEVERSION_ATTRIBUTE_NAME) is None:
+        raise DH5Error(f"{FILEVERSION_ATTRIBUTE_NAME} attribute is missing")
+    if file.attrs.get(BOARDS_ATTRIBUTE_NAME) is None:
+        warn(f"{BOARDS_ATTRIBUTE_NAME} attribute is missing", category=DH5Warning)
+
+
+def _run_check(report: ValidationReport, check: str, location: str, func, *args) -> bool:
+    """Run one check, record errors and DH5Warnings in `report` and return success."""
+    result = CheckResult(check=check, location=location, duration_s=0.0)
+    start = time.perf_counter()
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", DH5Warning)
+        try:
+            func(*args)
+        except DH5Error as e:
+            result.issues.append(ValidationIssue("error", str(e)))
+        except Exception as e:
+            result.issues.append(ValidationIssue("error", f"{type(e).__name__}: {e}"))
+    result.duration_s = time.perf_counter() - start
+
+    for w in caught:
+        if issubclass(w.category, DH5Warning):
+            result.issues.append(ValidationIssue("warning", str(w.message)))
+        else:
+            warnings.warn_explicit(w.message, w.category, w.filename, w.lineno)
+    report.checks.append(result)
+    return result.ok
+
+
+def scan_data(dataset: h5py.Dataset, zero_run_samples: int | None = None) -> None:
+    """Stream through a 2D int16 DATA dataset in large blocks.
+
+    Issues a `DH5Warning` for saturated samples (-32768 or 32767) and, if
+    `zero_run_samples` is given, for stretches of at least that many samples in which
+    all channels are zero. Raises a `DH5Error` if blocks could not be read, e.g.
+    because a chunk failed its checksum. The rest of the dataset is scanned anyway.
+    """
+    n_rows = dataset.shape[0]
+    row_bytes = max(1, int(np.prod(dataset.shape[1:])) * dataset.dtype.itemsize)
+    block_rows = max(1, DEEP_SCAN_BLOCK_BYTES // row_bytes)
+    if dataset.chunks is not None:
+        # read whole chunks so that every chunk is decompressed only once
+        block_rows = max(dataset.chunks[0], block_rows - block_rows % dataset.chunks[0])
+    buffer = np.empty((min(block_rows, n_rows),) + dataset.shape[1:], dtype=dataset.dtype)
+
+    info = np.iinfo(dataset.dtype)
+    n_saturated = 0
+    zero_runs: list[tuple[int, int]] = []
+    run_start = None
+    failed_blocks: list[tuple[int, int, str]] = []
+
+    for start in range(0, n_rows, block_rows):
+        stop = min(start + block_rows, n_rows)
+        block = buffer[: stop - start]
+        try:
+            dataset.read_direct(block, source_sel=np.s_[start:stop])
+        except OSError as e:
+            failed_blocks.append((start, stop, str(e)))
+            if run_start is not None and start - run_start >= (zero_run_samples or 0):
+                zero_runs.append((int(run_start), start))
+            run_start = None
+            continue
+
+        if block.max() == info.max or block.min() == info.min:
+            n_saturated += int(np.count_nonzero((block == info.max) | (block == info.min)))
+
+        if zero_run_samples is None:
+            continue
+        zero_rows = ~np.any(block.reshape(len(block), -1), axis=1)
+        edges = np.diff(zero_rows.astype(np.int8), prepend=0, append=0)
+        starts = np.flatnonzero(edges == 1) + start
+        stops = np.flatnonzero(edges == -1) + start
+        carried, run_start = run_start, None
+        if carried is not None and (len(starts) == 0 or starts[0] != start):
+            # the run from the previous block ended at the block boundary
+            if start - carried >= zero_run_samples:
+                zero_runs.append((int(carried), start))
+            carried = None
+        for run_begin, run_end in zip(starts, stops):
+            if carried is not None:
+                # continuation of a run from the previous block
+                run_begin, carried = carried, None
+            if run_end == stop:
+                run_start = run_begin
+            elif run_end - run_begin >= zero_run_samples:
+                zero_runs.append((int(run_begin), int(run_end)))
+    if run_start is not None and n_rows - run_start >= zero_run_samples:
+        zero_runs.append((int(run_start), n_rows))
+
+    if n_saturated > 0:
+        warn(
+            f"{n_saturated} saturated samples in {dataset.name}",
+            category=DH5Warning,
+        )
+    if zero_runs:
+        longest = max(end - begin for begin, end in zero_runs)
+        warn(
+            f"{len(zero_runs)} all-zero stretches of at least {zero_run_samples} samples in "
+            f"{dataset.name} (longest {longest} samples, first at sample {zero_runs[0][0]})",
+            category=DH5Warning,
+        )
+    if failed_blocks:
+        start, stop, message = failed_blocks[0]
+        raise DH5Error(
+            f"{len(failed_blocks)} blocks of {dataset.name} could not be read, e.g. "
+            f"samples {start}:{stop}: {message}"
+        )
@@ -1,5 +1,5 @@
-import importlib.metadata
-
-
 def get_version():
+    # importlib.metadata is slow to import and only needed when writing operations
+    import importlib.metadata
+
     return importlib.metadata.version("dh-format")
@@ -0,0 +1,397 @@
+"""xarray backend for DAQ-HDF5 files.
+
+    import xarray as xr
+
+    ds = xr.open_dataset("session.dh5", engine="dh5")
+    ds["CONT1"].sel(CONT1_time=slice(10.0, 12.5))
+
+Every `CONTn` block becomes a lazily loaded variable `CONTn` with the dimensions
+`CONTn_time` (seconds, from INDEX and SamplePeriod) and `CONTn_channel`. The fields
+of the Channels attribute are non-index channel coordinates. Indexing the variable
+reads only the selected hyperslab from the file; the samples are calibrated unless
+`calibrated=False` is passed.
+
+The time coordinate is indexed by a `ContTimeIndex`, which computes the timestamps
+from the recording regions when they are accessed instead of holding one float64 per
+sample. Label-based selection with `sel` is supported for slices (both ends included)
+and for exact or `method="nearest"` labels.
+
+Auxiliary variables are loaded eagerly:
+
+- `trial_*` from TRIALMAP with the dimension `trial`,
+- `SPIKEn_times` and `SPIKEn_cluster` per spike, and `SPIKEn_counts` with the number
+  of spikes per trial and cluster,
+- `marker_<name>` with the timestamps of each marker in seconds.
+"""
+
+import os
+import pathlib
+from collections.abc import Hashable, Iterable, Mapping
+from typing import Any
+import h5py
+import numpy as np
+import pandas as pd
+import xarray as xr
+from xarray.backends import BackendArray, BackendEntrypoint
+from xarray.core import indexing
+from xarray.core.indexing import IndexSelResult
+from xarray.indexes import CoordinateTransform, CoordinateTransformIndex, Index, PandasIndex
+import dh5io.pool as pool
+from dh5io.cont import get_regions, sample_times, time_range_to_samples
+from dh5io.contarray import ContArray
+from dhspec.cont import (
+    CONT_PREFIX,
+    DATA_DATASET_NAME,
+    INDEX_DATASET_NAME,
+    cont_id_from_name,
+    cont_name_from_id,
+)
+from dhspec.markers import MARKERS_GROUP_NAME
+from dhspec.spike import CLUSTER_INFO_DATASET_NAME, SPIKE_PREFIX
+from dhspec.spike import INDEX_DATASET_NAME as SPIKE_INDEX_DATASET_NAME
+from dhspec.trialmap import TRIALMAP_DATASET_NAME
+
+DH5_SUFFIXES = (".dh5",)
+
+
+class ContBackendArray(BackendArray):
+    """Lazy array of the DATA of a CONT block, read by path through the handle pool."""
+
+    def __init__(self, path: str, cont_id: int, shape: tuple[int, int], dtype, calibrated):
+        self.path = path
+        self.cont_id = cont_id
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.calibrated = calibrated
+
+    def __getitem__(self, key: indexing.ExplicitIndexer) -> np.ndarray:
+        return indexing.explicit_indexing_adapter(
+            key, self.shape, indexing.IndexingSupport.OUTER, self._getitem
+        )
+
+    def _getitem(self, key: tuple) -> np.ndarray:
+        with pool.pooled_file(self.path) as file:
+            array = ContArray(file[cont_name_from_id(self.cont_id)])
+            if self.calibrated:
+                array = array.calibrated
+            return array[key]
+
+
+def _seconds(times_ns: np.ndarray) -> np.ndarray:
+    return np.asarray(times_ns, dtype=np.float64) * 1e-9
+
+
+def _nanoseconds(times_s) -> np.ndarray:
+    return np.round(np.asarray(times_s, dtype=np.float64) * 1e9).astype(np.int64)
+
+
+class ContTimeTransform(CoordinateTransform):
+    """Timestamps in seconds of the samples [offset, offset + size) of a CONT block."""
+
+    def __init__(
+        self,
+        regions: np.ndarray,
+        sample_period_ns: int,
+        coord_name: Hashable,
+        dim: str,
+        offset: int = 0,
+        size: int | None = None,
+    ):
+        if size is None:
+            size = int(regions["stop"][-1]) if len(regions) else 0
+        super().__init__([coord_name], {dim: size}, dtype=np.dtype(np.float64))
+        self.regions = regions
+        self.sample_period_ns = int(sample_period_ns)
+        self.offset = offset
+
+    @property
+    def coord_name(self) -> Hashable:
+        return self.coord_names[0]
+
+    @property
+    def dim(self) -> str:
+        return self.dims[0]
+
+    @property
+    def size(self) -> int:
+        return self.dim_size[self.dim]
+
+    def times_ns(self, positions) -> np.ndarray:
+        samples = np.asarray(positions, dtype=np.int64) + self.offset
+        return sample_times(self.regions, self.sample_period_ns, samples)
+
+    def forward(self, dim_positions: dict[str, Any]) -> dict[Hashable, Any]:
+        return {self.coord_name: _seconds(self.times_ns(dim_positions[self.dim]))}
+
+    def reverse(self, coord_labels: dict[Hashable, Any]) -> dict[str, Any]:
+        """Positions of the samples nearest to the labels."""
+        t = _nanoseconds(coord_labels[self.coord_name])
+        regions = self.regions
+        r = np.clip(np.searchsorted(regions["time"], t, "right") - 1, 0, len(regions) - 1)
+        first, last = regions["start"][r], regions["stop"][r] - 1
+        offset = np.round((t - regions["time"][r]) / self.sample_period_ns).astype(np.int64)
+        samples = np.clip(first + offset, first, last)
+        # in a gap the first sample of the next region may be nearer
+        after = np.minimum(r + 1, len(regions) - 1)
+        nearer = (r + 1 < len(regions)) & (
+            regions["time"][after] - t
+            < np.abs(t - sample_times(regions, self.sample_period_ns, samples))
+        )
+        samples = np.where(nearer, regions["start"][after], samples)
+        positions = np.clip(samples - self.offset, 0, max(self.size - 1, 0))
+        return {self.dim: positions}
+
+    def equals(self, other: CoordinateTransform, **kwargs) -> bool:
+        return (
+            isinstance(other, ContTimeTransform)
+            and self.sample_period_ns == other.sample_period_ns
+            and self.offset == other.offset
+            and self.size == other.size
+            and np.array_equal(self.regions, other.regions)
+        )
+
+    def slice(self, start: int, stop: int) -> "ContTimeTransform":
+        return ContTimeTransform(
+            self.regions,
+            self.sample_period_ns,
+            self.coord_name,
+            self.dim,
+            offset=self.offset + start,
+            size=max(0, stop - start),
+        )
+
+
+class ContTimeIndex(CoordinateTransformIndex):
+    """Index of the time coordinate of a CONT block that does not store the timestamps.
+
+    The timestamps are computed from the recording regions in INDEX only for the
+    samples that are accessed or selected.
+    """
+
+    transform: ContTimeTransform
+
+    def __init__(self, transform: ContTimeTransform):
+        super().__init__(transform)
+
+    @classmethod
+    def from_regions(
+        cls, regions: np.ndarray, sample_period_ns: int, dim: str
+    ) -> "ContTimeIndex":
+        return cls(ContTimeTransform(regions, sample_period_ns, dim, dim))
+
+    @classmethod
+    def from_variables(cls, variables, *, options):
+        raise NotImplementedError(
+            "ContTimeIndex can only be created from the regions of a CONT block"
+        )
+
+    def create_variables(self, variables=None):
+        new_variables = super().create_variables(variables)
+        for variable in new_variables.values():
+            variable.attrs.setdefault("units", "s")
+        return new_variables
+
+    def isel(self, indexers: Mapping[Any, Any]) -> Index | None:
+        transform = self.transform
+        indexer = indexers[transform.dim]
+        if isinstance(indexer, slice):
+            rows = range(transform.size)[indexer]
+            if rows.step == 1:
+                return type(self)(transform.slice(rows.start, rows.stop))
+            indexer = np.arange(rows.start, rows.stop, rows.step)
+        if isinstance(indexer, xr.Variable):
+            if indexer.ndim != 1:
+                return None
+            dim, indexer = indexer.dims[0], indexer.values
+        else:
+            dim = transform.dim
+        if np.ndim(indexer) != 1:
+            return None
+        values = transform.forward({transform.dim: indexer})[transform.coord_name]
+        return PandasIndex(pd.Index(values, name=transform.coord_name), dim)
+
+    def sel(self, labels: dict[Any, Any], method=None, tolerance=None) -> IndexSelResult:
+        transform = self.transform
+        label = labels[transform.coord_name]
+        if tolerance is not None or method not in (None, "nearest"):
+            raise ValueError("ContTimeIndex only supports exact and nearest selection")
+
+        if isinstance(label, slice):
+            if label.step is not None:
+                raise ValueError("ContTimeIndex does not support slices with a step")
+            # both ends are included, like for pandas indexes
+            t_start = None if label.start is None else int(_nanoseconds(label.start))
+            t_stop = None if label.stop is None else int(_nanoseconds(label.stop)) + 1
+            samples = time_range_to_samples(
+                transform.regions, transform.sample_period_ns, t_start, t_stop
+            )
+            start = min(max(samples.start - transform.offset, 0), transform.size)
+            stop = min(max(samples.stop - transform.offset, start), transform.size)
+            return IndexSelResult({transform.dim: slice(start, stop)})
+
+        dims = None
+        if isinstance(label, (xr.DataArray, xr.Variable)):
+            dims, label = label.dims, label.values
+        positions = transform.reverse({transform.coord_name: label})[transform.dim]
+        if method is None:
+            missing = transform.times_ns(positions) != _nanoseconds(label)
+            if np.any(missing):
+                raise KeyError(f"{np.asarray(label)[missing]} not found in {transform.dim}")
+        if dims is not None:
+            positions = xr.Variable(dims, positions)
+        elif np.ndim(positions) == 0:
+            positions = int(positions)
+        return IndexSelResult({transform.dim: positions})
+
+    def to_pandas_index(self) -> pd.Index:
+        values = self.transform.generate_coords()[self.transform.coord_name]
+        return pd.Index(values, name=self.transform.coord_name)
+
+    def _repr_inline_(self, max_width) -> str:
+        transform = self.transform
+        return (
+            f"{type(self).__name__} (size={transform.size}, "
+            f"regions={len(transform.regions)}, sample_period_ns={transform.sample_period_ns})"
+        )
+
+
+def _cont_variable(path: str, cont_group: h5py.Group, calibrated: bool) -> xr.Dataset:
+    name = cont_group.name.lstrip("/")
+    cont_id = cont_id_from_name(name)
+    data = cont_group[DATA_DATASET_NAME]
+    calibration = cont_group.attrs.get("Calibration")
+    calibrated = calibrated and calibration is not None
+    dtype = np.float64 if calibrated else data.dtype
+
+    time_dim, channel_dim = f"{name}_time", f"{name}_channel"
+    regions = get_regions(cont_group[INDEX_DATASET_NAME][()], data.shape[0])
+    sample_period_ns = int(cont_group.attrs["SamplePeriod"])
+    time_index = ContTimeIndex.from_regions(regions, sample_period_ns, time_dim)
+    coords = {channel_dim: np.arange(data.shape[1])}
+    channels = cont_group.attrs.get("Channels")
+    if channels is not None and channels.dtype.names is not None:
+        for field in channels.dtype.names:
+            coords[f"{name}_{field}"] = (channel_dim, channels[field])
+
+    attrs = {"SamplePeriod": sample_period_ns, "calibrated": int(calibrated)}
+    for attr in ("Name", "Comment", "SignalType"):
+        if attr in cont_group.attrs:
+            attrs[attr] = cont_group.attrs[attr]
+    if calibration is not None:
+        attrs["Calibration"] = np.asarray(calibration)
+
+    backend_array = ContBackendArray(path, cont_id, data.shape, dtype, calibrated)
+    variable = xr.Variable(
+        (time_dim, channel_dim), indexing.LazilyIndexedArray(backend_array), attrs=attrs
+    )
+    dataset = xr.Dataset({name: variable}, coords=xr.Coordinates.from_xindex(time_index))
+    return dataset.assign_coords(coords)
+
+
+def _trialmap_variables(file: h5py.File) -> dict:
+    trialmap = file.get(TRIALMAP_DATASET_NAME)
+    if trialmap is None:
+        return {}
+    trialmap = trialmap[()]
+    return {
+        "trial": ("trial", trialmap["TrialNo"]),
+        "trial_stim_no": ("trial", trialmap["StimNo"]),
+        "trial_outcome": ("trial", trialmap["Outcome"]),
+        "trial_start": ("trial", _seconds(trialmap["StartTime"]), {"units": "s"}),
+        "trial_end": ("trial", _seconds(trialmap["EndTime"]), {"units": "s"}),
+    }
+
+
+def _spike_variables(file: h5py.File, name: str) -> dict:
+    group = file[name]
+    times = group[SPIKE_INDEX_DATASET_NAME][()]
+    if CLUSTER_INFO_DATASET_NAME in group:
+        clusters = group[CLUSTER_INFO_DATASET_NAME][()].astype(np.int64)
+    else:
+        clusters = np.zeros(len(times), dtype=np.int64)
+    spike_dim = f"{name}_spike"
+    variables = {
+        f"{name}_times": (spike_dim, _seconds(times), {"units": "s"}),
+        f"{name}_cluster": (spike_dim, clusters),
+    }
+
+    trialmap = file.get(TRIALMAP_DATASET_NAME)
+    if trialmap is not None:
+        trialmap = trialmap[()]
+        n_clusters = int(clusters.max()) + 1 if len(clusters) else 0
+        first = np.searchsorted(times, trialmap["StartTime"], "left")
+        last = np.searchsorted(times, trialmap["EndTime"], "left")
+        counts = np.zeros((len(trialmap), n_clusters), dtype=np.int64)
+        for trial, (a, b) in enumerate(zip(first, last)):
+            counts[trial] = np.bincount(clusters[a:b], minlength=n_clusters)
+        cluster_dim = f"{name}_cluster_id"
+        variables[f"{name}_counts"] = (("trial", cluster_dim), counts)
+        variables[cluster_dim] = (cluster_dim, np.arange(n_clusters))
+    return variables
+
+
+def _marker_variables(file: h5py.File) -> dict:
+    markers = file.get(MARKERS_GROUP_NAME)
+    if markers is None:
+        return {}
+    return {
+        f"marker_{name}": (f"marker_{name}", _seconds(dataset[()]), {"units": "s"})
+        for name, dataset in markers.items()
+    }
+
+
+def open_dh5_dataset(
+    path: str | os.PathLike,
+    calibrated: bool = True,
+    drop_variables: Iterable[str] | None = None,
+) -> xr.Dataset:
+    """Open a DH5 file as an xarray Dataset, see the module documentation."""
+    path = str(pathlib.Path(path).resolve())
+    drop = set() if drop_variables is None else set(drop_variables)
+    with pool.pooled_file(path) as file:
+        # dropped CONT blocks are not opened at all
+        parts = [
+            _cont_variable(path, file[name], calibrated)
+            for name in file.keys()
+            if name.startswith(CONT_PREFIX)
+            and name not in drop
+            and file.get(name, getclass=True) is h5py.Group
+        ]
+        aux = _trialmap_variables(file)
+        for name in file.keys():
+            if name.startswith(SPIKE_PREFIX) and file.get(name, getclass=True) is h5py.Group:
+                aux.update(_spike_variables(file, name))
+        aux.update(_marker_variables(file))
+        attrs = {
+            key: file.attrs[key] for key in ("FILEVERSION", "BOARDS") if key in file.attrs
+        }
+
+    aux = {name: variable for name, variable in aux.items() if name not in drop}
+    dataset = xr.merge([*parts, xr.Dataset(aux)], combine_attrs="drop_conflicts")
+    dataset.attrs.update(attrs)
+    if drop:
+        dataset = dataset.drop_vars(list(drop), errors="ignore")
+    return dataset
+
+
+class DH5BackendEntrypoint(BackendEntrypoint):
+    """Open DAQ-HDF5 files with `xr.open_dataset(path, engine="dh5")`."""
+
+    description = "Open DAQ-HDF5 (.dh5) files with lazily loaded CONT blocks"
+    url = "https://github.com/cog-neurophys-lab/DAQ-HDF5"
+    open_dataset_parameters = ("filename_or_obj", "drop_variables", "calibrated")
+
+    def open_dataset(
+        self,
+        filename_or_obj,
+        *,
+        drop_variables: Iterable[str] | None = None,
+        calibrated: bool = True,
+    ) -> xr.Dataset:
+        return open_dh5_dataset(filename_or_obj, calibrated, drop_variables)
+
+    def guess_can_open(self, filename_or_obj) -> bool:
+        try:
+            return pathlib.Path(filename_or_obj).suffix.lower() in DH5_SUFFIXES
+        except TypeError:
+            return False
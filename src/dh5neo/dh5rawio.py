@@ -1,22 +1,34 @@
 import typing
 import pathlib
+import warnings
 import numpy
+import dh5io.iostats as iostats
+from dh5io.cont import REGION_DTYPE, sample_times, time_range_to_samples
 from dh5io.dh5file import DH5File
+from dh5io.errors import DH5Warning
+from dhspec.event_triggers import EV_DATASET_NAME
+from dhspec.spike import CLUSTER_INFO_DATASET_NAME, DATA_DATASET_NAME, INDEX_DATASET_NAME
+from dhspec.trialmap import TRIALMAP_DATASET_NAME
 import h5py
 from dataclasses import dataclass
 from neo.rawio.baserawio import (
     BaseRawIO,
+    _signal_buffer_dtype,
     _signal_channel_dtype,
     _signal_stream_dtype,
     _spike_channel_dtype,
     _event_channel_dtype,
 )
 
+# maximum size of a single read of spike waveforms from DATA
+WAVEFORM_BATCH_BYTES = 64 * 2**20
+
 
 @dataclass
 class RawIOHeader:
     nb_block: int
     nb_segment: list[int] | None
+    signal_buffers: numpy.ndarray[typing.Any, numpy.dtype[_signal_buffer_dtype]]
     signal_streams: numpy.ndarray[typing.Any, numpy.dtype[_signal_stream_dtype]]
     signal_channels: numpy.ndarray[typing.Any, numpy.dtype[_signal_channel_dtype]]
     event_channels: numpy.ndarray[typing.Any, numpy.dtype[_event_channel_dtype]]
@@ -32,10 +44,12 @@ class DH5RawIO(BaseRawIO):
 
     signal_stream : CONTn HDF5 group
     signal_channel : one column of CONTn/DATA array
-    segment : trials in TRIALMAP
+    segment : trials in TRIALMAP, or the whole recording without TRIALMAP
     block : dh5 file
 
-
+    The samples of a segment are those of each CONT block with timestamps between
+    StartTime and EndTime of the trial. Trials are expected to lie within one
+    recording region of the INDEX, otherwise the gap is not visible in the signal.
     """
 
     rawmode: str = "one-file"
@@ -43,6 +57,11 @@ class DH5RawIO(BaseRawIO):
     _file: DH5File
     _trialmap: numpy.ndarray | h5py.Dataset | None
     header: RawIOHeader | None
+    # per segment (rows) and stream (columns): samples [start, stop) in DATA and the
+    # time of the first sample in ns, see dh5io.cont.REGION_DTYPE
+    _segment_samples: numpy.ndarray
+    # per segment: start and end time in ns
+    _segment_times: numpy.ndarray
 
     def __init__(self, filename: str | pathlib.Path):
         BaseRawIO.__init__(self)
@@ -50,6 +69,13 @@ class DH5RawIO(BaseRawIO):
         self._file = DH5File(filename)
         self._trialmap = self._file.get_trialmap()
         self.header = None
+        # caches of spike and event timestamps and of their ranges per
+        # (segment, channel), filled on first access
+        self._spike_group_cache: dict[str, tuple] = {}
+        self._spike_unit_cache: dict[int, tuple] = {}
+        self._spike_segments: dict[tuple[int, int], slice] = {}
+        self._event_cache: dict[int, tuple] = {}
+        self._event_segments: dict[tuple[int, int], slice] = {}
 
     def __del__(self):
         del self._file
@@ -62,11 +88,9 @@ class DH5RawIO(BaseRawIO):
         signal_channels = []
         for cont in self._file.get_cont_groups():
             data: h5py.Dataset = cont["DATA"]
-            index: h5py.Dataset = cont["INDEX"]
 
             sampling_rate = 1.0 / (cont.attrs["SamplePeriod"] / 1e9)
             all_calibrations = cont.attrs.get("Calibration")
-            channels = cont.attrs.get("Channels")
             dtype = data.dtype
             units = "V"
             offset = 0.0
@@ -88,26 +112,35 @@ class DH5RawIO(BaseRawIO):
                         units,
                         gain,
                         offset,
-                        cont_name.removeprefix("/"),
+                        cont_name,
+                        "",  # no buffer API
                     )
                 )
 
         return numpy.array(signal_channels, dtype=_signal_channel_dtype)
 
     def _parse_spike_channels(self) -> numpy.ndarray:
-        """Read info about spike channels from DH5 file. Called by `_parse_header`"""
+        """Read info about spike channels from DH5 file. Called by `_parse_header`
+
+        Every cluster in CLUSTER_INFO of a SPIKE group is one spike channel (unit). All
+        spikes of a group without CLUSTER_INFO belong to cluster 0.
+        """
         spike_channels = []
         waveform_units = "V"
         waveform_offset = 0.0
+        self._spike_units = []
 
         for spike_group in self._file.get_spike_groups():
-            unit_name = f"{spike_group.name}/0"  # "unit{}".format(c)
-            # TODO: loop over units in CLUSTER_INFO if present
-            unit_id = f"#{DH5File.get_spike_id_from_name(spike_group.name)}/0"
+            spike_name = spike_group.name.removeprefix("/")
+            spike_id = DH5File.get_spike_id_from_name(spike_group.name)
+            if CLUSTER_INFO_DATASET_NAME in spike_group:
+                clusters = numpy.unique(iostats.read(spike_group[CLUSTER_INFO_DATASET_NAME]))
+            else:
+                clusters = numpy.zeros(1, dtype=numpy.uint8)
 
-            waveform_gain = spike_group.attrs.get("Calibration")
-            if waveform_gain is None:
-                waveform_gain = 1.0
+            # neo has one gain per spike channel, use the one of the first channel
+            calibration = spike_group.attrs.get("Calibration")
+            waveform_gain = 1.0 if calibration is None else float(numpy.ravel(calibration)[0])
 
             waveform_left_samples = spike_group.attrs.get("SpikeParams")[
                 "preTrigSamples"
@@ -115,26 +148,27 @@ class DH5RawIO(BaseRawIO):
 
             # sample period in DH5 is in nano seconds
             waveform_sampling_rate = 1 / (spike_group.attrs.get("SamplePeriod") / 1e9)
-            spike_channels.append(
-                (
-                    unit_name,
-                    unit_id,
-                    waveform_units,
-                    waveform_gain,
-                    waveform_offset,
-                    waveform_left_samples,
-                    waveform_sampling_rate,
+            for cluster in clusters:
+                self._spike_units.append((spike_name, int(cluster)))
+                spike_channels.append(
+                    (
+                        f"{spike_name}/{cluster}",
+                        f"#{spike_id}/{cluster}",
+                        waveform_units,
+                        waveform_gain,
+                        waveform_offset,
+                        waveform_left_samples,
+                        waveform_sampling_rate,
+                    )
                 )
-            )
         return numpy.array(spike_channels, dtype=_spike_channel_dtype)
 
     def _parse_header(self):
-        _trialmap = self._file.get_trialmap()
-        nb_segment = [1] if _trialmap is None else [int(_trialmap.size)]
-
+        self._parse_segments()
         self.header = RawIOHeader(
             nb_block=1,
-            nb_segment=nb_segment,
+            nb_segment=[len(self._segment_times)],
+            signal_buffers=numpy.array([], dtype=_signal_buffer_dtype),
             signal_streams=self._parse_signal_streams(),
             signal_channels=self._parse_signal_channels(),
             event_channels=self._parse_event_channels(),
@@ -143,14 +177,69 @@ class DH5RawIO(BaseRawIO):
 
         self._generate_minimal_annotations()
 
+    def _parse_segments(self) -> None:
+        """Precompute the sample ranges of all segments and streams. Called by
+        `_parse_header`"""
+        cont_ids = self._file.get_cont_group_ids()
+        self._cont_ids = cont_ids
+        regions = {cont_id: self._file.cont[cont_id].regions for cont_id in cont_ids}
+        periods = {cont_id: self._file.cont[cont_id].sample_period_ns for cont_id in cont_ids}
+
+        n_segments = 1 if self._trialmap is None else len(self._trialmap)
+        self._segment_samples = numpy.zeros((n_segments, len(cont_ids)), dtype=REGION_DTYPE)
+
+        if self._trialmap is None:
+            # the whole recording of every stream is one segment
+            t_start, t_stop = [], []
+            for stream_index, cont_id in enumerate(cont_ids):
+                cont_regions, period = regions[cont_id], periods[cont_id]
+                if len(cont_regions) == 0:
+                    continue
+                start, stop = cont_regions["start"][0], cont_regions["stop"][-1]
+                self._segment_samples[0, stream_index] = (start, stop, cont_regions["time"][0])
+                t_start.append(cont_regions["time"][0])
+                t_stop.append(sample_times(cont_regions, period, [stop - 1])[0] + period)
+            self._segment_times = numpy.array(
+                [[min(t_start, default=0), max(t_stop, default=0)]], dtype=numpy.int64
+            )
+            return
+
+        self._segment_times = numpy.stack(
+            [self._trialmap["StartTime"], self._trialmap["EndTime"]], axis=1
+        ).astype(numpy.int64)
+        for stream_index, cont_id in enumerate(cont_ids):
+            cont_regions, period = regions[cont_id], periods[cont_id]
+            for seg_index, (t_start, t_stop) in enumerate(self._segment_times):
+                samples = time_range_to_samples(cont_regions, period, t_start, t_stop)
+                if samples.stop > samples.start:
+                    time = sample_times(cont_regions, period, [samples.start])[0]
+                    last = sample_times(cont_regions, period, [samples.stop - 1])[0]
+                    if last - time != (samples.stop - samples.start - 1) * period:
+                        warnings.warn(
+                            f"Trial {seg_index} spans a gap in CONT{cont_id}",
+                            category=DH5Warning,
+                        )
+                else:
+                    time = t_start
+                self._segment_samples[seg_index, stream_index] = (
+                    samples.start,
+                    samples.stop,
+                    time,
+                )
+
+    def _segment_sizes(self, seg_index: int) -> numpy.ndarray:
+        samples = self._segment_samples[seg_index]
+        return samples["stop"] - samples["start"]
+
     def _parse_event_channels(
         self,
     ) -> numpy.ndarray[typing.Any, numpy.dtype[_event_channel_dtype]]:
-        event_channels = numpy.array(
-            [("trials", "TRIALMAP", "epoch"), ("events", "EV02", "event")],
-            dtype=_event_channel_dtype,
-        )
-        return event_channels
+        event_channels = []
+        if self._trialmap is not None:
+            event_channels.append(("trials", TRIALMAP_DATASET_NAME, "epoch"))
+        if EV_DATASET_NAME in self._file.file:
+            event_channels.append(("events", EV_DATASET_NAME, "event"))
+        return numpy.array(event_channels, dtype=_event_channel_dtype)
 
     def _parse_signal_streams(
         self,
@@ -163,32 +252,14 @@ class DH5RawIO(BaseRawIO):
 
         signal_streams = []
         for cont_name in self._file.get_cont_group_names():
-            signal_streams.append((cont_name, cont_name))
+            signal_streams.append((cont_name, cont_name, ""))
         return numpy.array(signal_streams, dtype=_signal_stream_dtype)
 
-    def _segment_t_start(self, block_index: int, seg_index: int):
-        if self.header is None:
-            raise ValueError("Header not yet parsed")
-
-        if self.header.nb_segment == 1:
-            raise NotImplementedError("Data without trials is not yet supported")
-
-        if self._trialmap is None:
-            raise ValueError("Trialmap not yet parsed")
-
-        return self._trialmap[seg_index]["StartTime"]
-
-    def _segment_t_stop(self, block_index: int, seg_index: int):
-        if self.header is None:
-            raise ValueError("Header not yet parsed")
-
-        if self.header.nb_segment == 1:
-            raise NotImplementedError("Data without trials is not yet supported")
-
-        if self._trialmap is None:
-            raise ValueError("Trialmap not yet parsed")
+    def _segment_t_start(self, block_index: int, seg_index: int) -> float:
+        return self._segment_times[seg_index, 0] / 1e9
 
-        return self._trialmap[seg_index]["EndTime"]
+    def _segment_t_stop(self, block_index: int, seg_index: int) -> float:
+        return self._segment_times[seg_index, 1] / 1e9
 
     # signal and channel zone
     def _get_signal_size(
@@ -199,30 +270,7 @@ class DH5RawIO(BaseRawIO):
 
         All channels indexed must have the same size and t_start.
         """
-        if self.header is None:
-            raise ValueError("Header not yet parsed")
-
-        if self._trialmap is None:
-            raise ValueError("Trialmap not yet parsed")
-
-        contId: str = self.header.signal_streams[stream_index]["id"]
-        data: h5py.Dataset = self._file.file[contId]["DATA"]
-        index: h5py.Dataset = self._file.file[contId]["INDEX"]
-
-        # FIXME: clarify how a neo segment maps to a trial / an area within a CONT block
-        # Segments are the trials in the trialmap. We need to find the indices in the data array
-        # that correspond to the start and end of the trial.
-        # index contains the start time and the offset in the data array, i.e. we can
-        # construct the time axis based on this information.
-
-        iStart: int = index[seg_index]["offset"]
-
-        if seg_index == len(self._trialmap):
-            iEnd: int = data.shape[0]
-        else:
-            iEnd = index[seg_index + 1]["offset"]
-
-        return iEnd - iStart
+        return int(self._segment_sizes(seg_index)[stream_index])
 
     def _get_signal_t_start(
         self, block_index: int, seg_index: int, stream_index: int
@@ -232,88 +280,198 @@ class DH5RawIO(BaseRawIO):
 
         All channels indexed must have the same size and t_start.
         """
-        if self.header is None:
-            raise ValueError("Header not yet parsed")
-
-        contId: str = self.header.signal_streams[stream_index]["id"]
-        index: h5py.Dataset = self._file.file[contId]["INDEX"]
-        return index[seg_index]["time"] / 1e9
+        return self._segment_samples[seg_index, stream_index]["time"] / 1e9
 
     def _get_analogsignal_chunk(
         self,
         block_index: int,
         seg_index: int,
-        i_start: int,
-        i_stop: int,
+        i_start: int | None,
+        i_stop: int | None,
         stream_index: int,
-        channel_indexes: None | list[int] | numpy.ndarray,
+        channel_indexes: None | slice | list[int] | numpy.ndarray,
     ) -> numpy.ndarray:
         """
         Return the samples from a set of AnalogSignals indexed
         by stream_index and channel_indexes (local index inner stream).
 
+        The samples are read as one contiguous hyperslab of DATA from the dataset
+        cached by `DH5File.cont`, channels are selected in memory.
+
         RETURNS
         -------
             array of samples, with each requested channel in a column
         """
-        if self.header is None:
-            raise ValueError("Header not yet parsed")
-
-        contId: str = self.header.signal_streams[stream_index]["id"]
-
+        segment = self._segment_samples[seg_index, stream_index]
+        start, stop = int(segment["start"]), int(segment["stop"])
+        i_start = 0 if i_start is None else i_start
+        i_stop = stop - start if i_stop is None else i_stop
+        if not 0 <= i_start <= i_stop <= stop - start:
+            raise IndexError(
+                f"Samples [{i_start}, {i_stop}) out of range for segment {seg_index} "
+                f"with {stop - start} samples"
+            )
         if channel_indexes is None:
-            channel_indexes = numpy.arange(self._file.file[contId]["DATA"].shape[1])
+            channel_indexes = slice(None)
 
-        return numpy.array(self._file.file[contId][i_start:i_stop, channel_indexes])
+        array = self._file.cont[self._cont_ids[stream_index]]
+        return array[start + i_start : start + i_stop, channel_indexes]
 
     # spiketrain and unit zone
+    def _segment_range(
+        self,
+        cache: dict,
+        key: tuple[int, int],
+        times: numpy.ndarray,
+        t_start: float | None,
+        t_stop: float | None,
+    ) -> slice:
+        """Range of the sorted `times` (ns) within segment and channel `key` and the
+        optional limits in seconds. The segment ranges are cached in `cache`."""
+        seg_index = key[0]
+        if key not in cache:
+            if self._trialmap is None:
+                cache[key] = slice(0, len(times))
+            else:
+                first, last = numpy.searchsorted(times, self._segment_times[seg_index], "left")
+                cache[key] = slice(int(first), int(last))
+        segment = cache[key]
+        start, stop = segment.start, segment.stop
+        if t_start is not None:
+            start = max(start, int(numpy.searchsorted(times, round(t_start * 1e9), "left")))
+        if t_stop is not None:
+            stop = min(stop, int(numpy.searchsorted(times, round(t_stop * 1e9), "right")))
+        return slice(start, max(start, stop))
+
+    def _spike_unit(self, spike_channel_index: int) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """Timestamps (ns) of the spikes of a spike channel and their positions in the
+        INDEX of the SPIKE group."""
+        if spike_channel_index not in self._spike_unit_cache:
+            spike_name, cluster = self._spike_units[spike_channel_index]
+            spike_group = self._file.file[spike_name]
+            if spike_name not in self._spike_group_cache:
+                times = iostats.read(spike_group[INDEX_DATASET_NAME])
+                clusters = None
+                if CLUSTER_INFO_DATASET_NAME in spike_group:
+                    clusters = iostats.read(spike_group[CLUSTER_INFO_DATASET_NAME])
+                self._spike_group_cache[spike_name] = (times, clusters)
+            times, clusters = self._spike_group_cache[spike_name]
+            if clusters is None:
+                positions = numpy.arange(len(times))
+            else:
+                positions = numpy.flatnonzero(clusters == cluster)
+            self._spike_unit_cache[spike_channel_index] = (times[positions], positions)
+        return self._spike_unit_cache[spike_channel_index]
+
     def _spike_count(
-        self, block_index: int, seg_index: int, spike_channel_index
+        self, block_index: int, seg_index: int, spike_channel_index: int
     ) -> int:
-        raise (NotImplementedError)
+        times, _ = self._spike_unit(spike_channel_index)
+        key = (seg_index, spike_channel_index)
+        segment = self._segment_range(self._spike_segments, key, times, None, None)
+        return segment.stop - segment.start
 
     def _get_spike_timestamps(
         self,
         block_index: int,
         seg_index: int,
-        spike_channel_index,
+        spike_channel_index: int,
         t_start: float | None,
         t_stop: float | None,
-    ):
-        raise (NotImplementedError)
+    ) -> numpy.ndarray:
+        times, _ = self._spike_unit(spike_channel_index)
+        key = (seg_index, spike_channel_index)
+        return times[self._segment_range(self._spike_segments, key, times, t_start, t_stop)]
 
     def _rescale_spike_timestamp(
         self, spike_timestamps: numpy.ndarray, dtype: numpy.dtype
     ) -> numpy.ndarray:
-        raise (NotImplementedError)
+        # timestamps are in nanoseconds
+        return spike_timestamps.astype(dtype) / 1e9
 
     def _get_spike_raw_waveforms(
         self,
         block_index: int,
         seg_index: int,
-        spike_channel_index,
+        spike_channel_index: int,
         t_start: float | None,
         t_stop: float | None,
     ) -> numpy.ndarray:
-        # this must return a 3D numpy array (nb_spike, nb_channel, nb_sample)
-
-        raise (NotImplementedError)
+        """Waveforms of the selected spikes with shape (nb_spike, nb_channel, nb_sample).
 
-    def _event_count(self, block_index: int, seg_index: int, event_channel_index):
-        raise (NotImplementedError)
+        Runs of consecutive spikes of the unit are read as hyperslabs of DATA of at most
+        `WAVEFORM_BATCH_BYTES`, so waveforms of other units are not read.
+        """
+        times, positions = self._spike_unit(spike_channel_index)
+        key = (seg_index, spike_channel_index)
+        positions = positions[
+            self._segment_range(self._spike_segments, key, times, t_start, t_stop)
+        ]
+
+        spike_group = self._file.file[self._spike_units[spike_channel_index][0]]
+        data: h5py.Dataset = spike_group[DATA_DATASET_NAME]
+        n_samples = int(spike_group.attrs["SpikeParams"]["spikeSamples"])
+        n_channels = data.shape[1]
+        if len(positions) == 0:
+            return numpy.zeros((0, n_channels, n_samples), dtype=data.dtype)
+
+        waveforms = numpy.empty((len(positions), n_samples, n_channels), dtype=data.dtype)
+        batch = max(1, WAVEFORM_BATCH_BYTES // (n_samples * n_channels * data.dtype.itemsize))
+        breaks = numpy.flatnonzero(numpy.diff(positions) != 1) + 1
+        for start, stop in zip([0, *breaks], [*breaks, len(positions)]):
+            for i in range(start, stop, batch):
+                j = min(i + batch, stop)
+                first = int(positions[i])
+                rows = iostats.read(
+                    data, numpy.s_[first * n_samples : (first + j - i) * n_samples]
+                )
+                waveforms[i:j] = rows.reshape(j - i, n_samples, n_channels)
+        return waveforms.transpose(0, 2, 1)
+
+    # event and epoch zone
+    def _event_channel(
+        self, event_channel_index: int
+    ) -> tuple[numpy.ndarray, numpy.ndarray | None, numpy.ndarray]:
+        """Timestamps (ns), durations (ns, epochs only) and labels of an event channel."""
+        if event_channel_index not in self._event_cache:
+            source = self.header.event_channels[event_channel_index]["id"]
+            if source == TRIALMAP_DATASET_NAME:
+                start = numpy.asarray(self._trialmap["StartTime"], dtype=numpy.int64)
+                end = numpy.asarray(self._trialmap["EndTime"], dtype=numpy.int64)
+                events = (start, end - start, self._trialmap["TrialNo"].astype(str))
+            else:
+                ev = self._file.get_events_array()
+                events = (ev["time"], None, ev["event"].astype(str))
+            self._event_cache[event_channel_index] = events
+        return self._event_cache[event_channel_index]
+
+    def _event_count(self, block_index: int, seg_index: int, event_channel_index: int) -> int:
+        times, _, _ = self._event_channel(event_channel_index)
+        key = (seg_index, event_channel_index)
+        segment = self._segment_range(self._event_segments, key, times, None, None)
+        return segment.stop - segment.start
 
     def _get_event_timestamps(
         self,
         block_index: int,
         seg_index: int,
-        event_channel_index,
+        event_channel_index: int,
         t_start: float | None,
         t_stop: float | None,
-    ):
-        raise (NotImplementedError)
-
-    def _rescale_event_timestamp(self, event_timestamps, dtype):
-        raise (NotImplementedError)
+    ) -> tuple[numpy.ndarray, numpy.ndarray | None, numpy.ndarray]:
+        times, durations, labels = self._event_channel(event_channel_index)
+        key = (seg_index, event_channel_index)
+        selection = self._segment_range(self._event_segments, key, times, t_start, t_stop)
+        if durations is not None:
+            durations = durations[selection]
+        return times[selection], durations, labels[selection]
+
+    def _rescale_event_timestamp(
+        self, event_timestamps: numpy.ndarray, dtype: numpy.dtype, event_channel_index: int
+    ) -> numpy.ndarray:
+        return event_timestamps.astype(dtype) / 1e9
 
-    def _rescale_epoch_duration(self, raw_duration, dtype):
-        raise (NotImplementedError)
+    def _rescale_epoch_duration(
+        self, raw_duration: numpy.ndarray, dtype: numpy.dtype, event_channel_index: int
+    ) -> numpy.ndarray:
+        return raw_duration.astype(dtype) / 1e9
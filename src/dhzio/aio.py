@@ -0,0 +1,170 @@
+"""Asynchronous reading of CONT blocks of DAQ-HDF Zarr folders.
+
+    folder = DHZFolder("session.dhz")
+    lfp = await folder.read_cont(1, 10.0, 12.5, channels=[0, 3])
+    async for block in folder.iter_cont(1, t_start=10.0):
+        update_plot(block.times, block.data)
+
+Times are given like for `ContArray.time` of dh5io: floats are seconds, integers are
+nanoseconds, and a window [t_start, t_stop) never spans more samples than recorded.
+
+Zarr v3 is asynchronous underneath. The samples of a window are split at the shard
+(or chunk) boundaries of DATA and up to `max_concurrency` pieces are fetched at the
+same time through the Zarr store, so that the latency of network file systems
+overlaps instead of adding up. `iter_cont` prefetches up to `max_concurrency` blocks
+ahead of the consumer and yields them in order, which bounds its memory use.
+"""
+
+import asyncio
+import collections
+import dataclasses
+from collections.abc import AsyncIterator
+from typing import Any, NamedTuple
+import numpy as np
+import zarr
+import zarr.api.asynchronous
+from dh5io.cont import get_regions, sample_times, time_range_to_samples
+from dh5io.contarray import _to_ns
+from dhspec.cont import DATA_DATASET_NAME, INDEX_DATASET_NAME, INDEX_DTYPE, cont_name_from_id
+from dhzio.attributes import decode_attribute
+from dhzio.cont import (
+    _column_range,
+    _ignore_structured_dtype_warning,
+    _pieces,
+    _select_and_calibrate,
+)
+from dhzio.errors import DHZError
+
+# default number of pieces of DATA fetched at the same time
+DEFAULT_MAX_CONCURRENCY = 16
+
+
+class ContBlock(NamedTuple):
+    """Samples of a CONT block yielded by `iter_cont`."""
+
+    samples: slice  # rows of DATA
+    times: np.ndarray  # timestamps of the samples in nanoseconds
+    data: np.ndarray
+
+
+@dataclasses.dataclass
+class _AsyncCont:
+    cont_id: int
+    data: zarr.AsyncArray
+    regions: np.ndarray
+    sample_period_ns: int
+    calibration: np.ndarray | None
+
+
+async def open_root(store: Any) -> zarr.AsyncGroup:
+    """Open the root group of a DAQ-HDF Zarr folder for asynchronous reading."""
+    with _ignore_structured_dtype_warning():
+        return await zarr.api.asynchronous.open_group(store=store, mode="r")
+
+
+async def _open_cont(root: zarr.AsyncGroup, cont_id: int) -> _AsyncCont:
+    name = cont_name_from_id(cont_id)
+    try:
+        group = await root.getitem(name)
+    except KeyError:
+        raise DHZError(f"{name} does not exist in {root.store_path}") from None
+    with _ignore_structured_dtype_warning():
+        data, index = await asyncio.gather(
+            group.getitem(DATA_DATASET_NAME), group.getitem(INDEX_DATASET_NAME)
+        )
+        index = np.asarray(await index.getitem(slice(None)), dtype=INDEX_DTYPE)
+    return _AsyncCont(
+        cont_id=cont_id,
+        data=data,
+        regions=get_regions(index, data.shape[0]),
+        sample_period_ns=int(group.attrs["SamplePeriod"]),
+        calibration=decode_attribute("Calibration", group.attrs.get("Calibration")),
+    )
+
+
+async def _read_samples(
+    cont: _AsyncCont,
+    start: int,
+    stop: int,
+    channels: Any,
+    calibrated: bool,
+    semaphore: asyncio.Semaphore,
+) -> np.ndarray:
+    data = cont.data
+    columns, selection = _column_range(channels, data.shape[1])
+    out = np.empty((stop - start, columns.stop - columns.start), dtype=data.dtype)
+
+    async def read(a: int, b: int) -> None:
+        async with semaphore:
+            out[a - start : b - start] = await data.getitem((slice(a, b), columns))
+
+    pieces = _pieces(start, stop, (data.shards or data.chunks)[0])
+    await asyncio.gather(*(read(a, b) for a, b in pieces))
+    return _select_and_calibrate(
+        out, cont.cont_id, channels, columns, selection, calibrated, cont.calibration
+    )
+
+
+def _samples(cont: _AsyncCont, t_start, t_stop) -> slice:
+    return time_range_to_samples(
+        cont.regions, cont.sample_period_ns, _to_ns(t_start), _to_ns(t_stop)
+    )
+
+
+async def read_cont(
+    root: zarr.AsyncGroup,
+    cont_id: int,
+    t_start: float | int | None = None,
+    t_stop: float | int | None = None,
+    channels: Any = None,
+    calibrated: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> np.ndarray:
+    """Read the samples of `CONTn` with timestamps in [t_start, t_stop).
+
+    Channels are selected like in `dhzio.cont.read_cont_data`.
+    """
+    cont = await _open_cont(root, cont_id)
+    samples = _samples(cont, t_start, t_stop)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    return await _read_samples(
+        cont, samples.start, samples.stop, channels, calibrated, semaphore
+    )
+
+
+async def iter_cont(
+    root: zarr.AsyncGroup,
+    cont_id: int,
+    t_start: float | int | None = None,
+    t_stop: float | int | None = None,
+    channels: Any = None,
+    calibrated: bool = False,
+    block_samples: int | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> AsyncIterator[ContBlock]:
+    """Yield the samples of `CONTn` in [t_start, t_stop) as consecutive `ContBlock`s.
+
+    Blocks end at multiples of `block_samples`, by default the samples per shard (or
+    chunk) of DATA.
+    """
+    cont = await _open_cont(root, cont_id)
+    samples = _samples(cont, t_start, t_stop)
+    block_samples = block_samples or (cont.data.shards or cont.data.chunks)[0]
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def block(a: int, b: int, task: asyncio.Future) -> ContBlock:
+        times = sample_times(cont.regions, cont.sample_period_ns, np.arange(a, b))
+        return ContBlock(slice(a, b), times, await task)
+
+    pending: collections.deque = collections.deque()
+    try:
+        for a, b in _pieces(samples.start, samples.stop, block_samples):
+            read = _read_samples(cont, a, b, channels, calibrated, semaphore)
+            pending.append((a, b, asyncio.ensure_future(read)))
+            if len(pending) >= max_concurrency:
+                yield await block(*pending.popleft())
+        while pending:
+            yield await block(*pending.popleft())
+    finally:
+        for _, _, task in pending:
+            task.cancel()
@@ -0,0 +1,124 @@
+"""Encoding of DAQ-HDF attributes as Zarr (JSON) attributes.
+
+HDF5 attributes of DAQ-HDF files are NumPy scalars and arrays, partly with compound
+data types. Zarr stores attributes as JSON, so they are encoded as follows:
+
+- NumPy scalars become Python numbers,
+- plain arrays (e.g. Calibration) become lists,
+- compound arrays (e.g. Channels) become lists of objects with one key per field.
+
+`decode_attribute` restores the NumPy representation of the known attributes of the
+specification, other attributes are returned as stored.
+
+`encode_attributes` additionally records the data type of every attribute under the
+key `DTYPES_ATTRIBUTE`, so that `decode_attributes` restores them exactly. This is
+used by `dhzio.convert` to copy files between both formats without loss.
+"""
+
+from collections.abc import Mapping
+from typing import Any
+import numpy as np
+from dhspec.cont import CHANNELS_DTYPE
+
+# data types of array attributes of the specification
+ATTRIBUTE_DTYPES: dict[str, np.dtype] = {
+    "Calibration": np.dtype(np.float64),
+    "Channels": CHANNELS_DTYPE,
+}
+
+
+def encode_attribute(value: Any) -> Any:
+    """Return `value` in a form that can be stored as JSON."""
+    if isinstance(value, np.void) and value.dtype.names is not None:
+        return {name: encode_attribute(value[name]) for name in value.dtype.names}
+    if isinstance(value, np.ndarray):
+        if value.dtype.names is not None and value.ndim == 0:
+            return encode_attribute(value[()])
+        if value.dtype.names is not None:
+            return [
+                {name: record[name].item() for name in value.dtype.names}
+                for record in value.ravel()
+            ]
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
+
+
+def decode_attribute(name: str, value: Any) -> Any:
+    """Return the NumPy representation of the attribute `name` stored as `value`."""
+    dtype = ATTRIBUTE_DTYPES.get(name)
+    if dtype is None or value is None:
+        return value
+    if dtype.names is not None:
+        return np.array([tuple(item[field] for field in dtype.names) for item in value], dtype)
+    return np.asarray(value, dtype=dtype)
+
+
+# key of the attribute holding the data types of the other attributes
+DTYPES_ATTRIBUTE = "_dh5_dtypes"
+
+# data type marker of (variable length) strings
+STRING_DTYPE = "str"
+
+
+def dtype_to_json(dtype: np.dtype) -> Any:
+    """JSON description of a NumPy data type, see `dtype_from_json`."""
+    dtype = np.dtype(dtype)
+    if dtype.names is not None:
+        return [[name, dtype_to_json(dtype.fields[name][0])] for name in dtype.names]
+    if dtype.kind in "OUS":
+        return STRING_DTYPE
+    return dtype.str
+
+
+def dtype_from_json(description: Any) -> np.dtype | str:
+    """NumPy data type described by `description`, or `STRING_DTYPE` for strings."""
+    if description == STRING_DTYPE:
+        return STRING_DTYPE
+    if isinstance(description, list):
+        return np.dtype([(name, dtype_from_json(field)) for name, field in description])
+    return np.dtype(description)
+
+
+def encode_attributes(attrs: Mapping[str, Any]) -> dict[str, Any]:
+    """Encode all `attrs` and record their data types under `DTYPES_ATTRIBUTE`."""
+    encoded = {name: encode_attribute(value) for name, value in attrs.items()}
+    encoded[DTYPES_ATTRIBUTE] = {
+        name: dtype_to_json(np.asarray(value).dtype)
+        for name, value in attrs.items()
+        if not isinstance(value, (str, bytes))
+    }
+    return encoded
+
+
+def _decode_value(value: Any, dtype: np.dtype) -> Any:
+    if dtype.names is None:
+        return np.asarray(value, dtype=dtype)
+    if isinstance(value, dict):
+        return np.array(tuple(value[name] for name in dtype.names), dtype)
+    return np.array([tuple(item[name] for name in dtype.names) for item in value], dtype)
+
+
+def decode_attributes(attrs: Mapping[str, Any]) -> dict[str, Any]:
+    """Decode attributes written by `encode_attributes`.
+
+    Strings are returned as `str` or list of `str`, all other attributes as NumPy
+    scalars or arrays of their original data type. Attributes without a recorded
+    data type are decoded with `decode_attribute`.
+    """
+    dtypes = attrs.get(DTYPES_ATTRIBUTE, {})
+    decoded = {}
+    for name, value in attrs.items():
+        if name == DTYPES_ATTRIBUTE:
+            continue
+        dtype = dtype_from_json(dtypes[name]) if name in dtypes else None
+        if dtype is None:
+            decoded[name] = decode_attribute(name, value)
+        elif isinstance(dtype, str):
+            decoded[name] = value
+        else:
+            decoded[name] = _decode_value(value, dtype)
+    return decoded
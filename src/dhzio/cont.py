@@ -1,28 +1,81 @@
-import zarr
-import numpy.typing as npt
+"""Signal data in CONT blocks of DAQ-HDF Zarr folders.
+
+The layout follows `dh5io.cont`: a group `CONTn` with the int16 array DATA of shape
+(nSamples, nChannels), the INDEX array of (time, offset) records of the recording
+regions and the attributes SamplePeriod, Calibration, Channels, Name, Comment and
+SignalType (encoded as JSON, see `dhzio.attributes`).
+
+DATA is a chunked and compressed Zarr v3 array. Chunks span all channels by
+default; with `shards` several chunks are stored in one object, which keeps the
+number of files manageable for long recordings with small chunks. The default
+codec is Blosc with Zstd and bit shuffling; pass any Zarr v3 compressors (e.g.
+`zarr.codecs.ZstdCodec(level=3)`) to change it.
+
+Zarr needs no global lock like h5py, so chunks can be read from several threads in
+parallel, see `read_cont_data`.
+"""
+
+import contextlib
+import logging
+import math
+import warnings
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 import numpy as np
-from dhzio.errors import DHZError
+import numpy.typing as npt
+import zarr
+import zarr.codecs
+from zarr.errors import UnstableSpecificationWarning
+from dh5io.cont import get_regions
+from dhspec.cont import (
+    CONT_DTYPE_NAME,
+    CONT_PREFIX,
+    DATA_DATASET_NAME,
+    INDEX_DATASET_NAME,
+    INDEX_DTYPE,
+    ContSignalType,
+    cont_id_from_name,
+    cont_name_from_id,
+)
+from dhzio.attributes import decode_attribute, encode_attribute
+from dhzio.errors import DHZError, DHZWarning
 
-CONT_PREFIX = "CONT"
-DATA_DATASET_NAME = "DATA"
-INDEX_DATASET_NAME = "INDEX"
-CONT_DTYPE_NAME = "CONT_INDEX_ITEM"
+logger = logging.getLogger(__name__)
 
-CONT_DTYPE = np.dtype([("time", np.int64), ("offset", np.int64)])
+# kept for backwards compatibility, INDEX items are (time, offset) records
+CONT_DTYPE = INDEX_DTYPE
 
+# default number of samples per chunk of DATA
+DEFAULT_CHUNK_SAMPLES = 2**16
 
-def cont_name_from_id(id: int) -> str:
-    return f"{CONT_PREFIX}{id}"
 
+def default_compressors() -> tuple:
+    return (zarr.codecs.BloscCodec(cname="zstd", clevel=5, shuffle="bitshuffle"),)
 
-def enumerate_cont_groups(root: zarr.Group) -> list[int]:
-    return [
-        int(name[len(CONT_PREFIX) :])
-        for name in root.group_keys()
-        if name.startswith(CONT_PREFIX)
-    ]
+
+@contextlib.contextmanager
+def _ignore_structured_dtype_warning() -> Iterator[None]:
+    # Zarr v3 has no specification for structured data types like the one of INDEX
+    # yet. zarr-python supports them, but warns on every access.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UnstableSpecificationWarning)
+        yield
 
 
+def get_attribute(group: zarr.Group, name: str, default: Any = None) -> Any:
+    """Attribute `name` of `group` in the NumPy representation of dh5io."""
+    return decode_attribute(name, group.attrs.get(name, default))
+
+
+def get_index(cont_group: zarr.Group) -> np.ndarray:
+    """INDEX of a CONT group as array of (time, offset) records."""
+    with _ignore_structured_dtype_warning():
+        index = cont_group[INDEX_DATASET_NAME][...]
+    return np.asarray(index, dtype=INDEX_DTYPE)
+
+
+# create
 def create_empty_cont_group(
     root: zarr.Group,
     cont_group_id: int | None,
@@ -36,42 +89,332 @@ def create_empty_cont_group(
     channels: np.ndarray | None = None,
     name: str | None = None,
     comment: str | None = None,
+    signal_type: ContSignalType | None = None,
+    chunks: tuple[int, int] | None = None,
+    shards: tuple[int, int] | None = None,
+    compressors: Any = "default",
 ) -> zarr.Group:
+    """Create the group `CONTn` with empty DATA and INDEX arrays.
+
+    `chunks` defaults to `DEFAULT_CHUNK_SAMPLES` samples of all channels, `shards`
+    (a multiple of `chunks`) disables sharding if None. `compressors` are Zarr v3
+    codecs, "default" uses `default_compressors()` and None disables compression.
+    """
     existing_cont_ids = enumerate_cont_groups(root)
 
     # fail if CONT group already exists
     if cont_group_id in existing_cont_ids:
         raise DHZError(f"CONT{cont_group_id} already exists in the folder.")
 
-    # if cont_group_id is None:
-    # cont_group_id = np.max(np.array(existing_cont_ids)) + 1
+    if cont_group_id is None:
+        cont_group_id = max(existing_cont_ids, default=-1) + 1
+        logger.debug(f"No CONT group id provided, creating new CONT group {cont_group_id}")
 
     cont_group = root.create_group(cont_name_from_id(cont_group_id))
 
+    if chunks is None:
+        chunks = (max(1, min(nSamples, DEFAULT_CHUNK_SAMPLES)), max(1, nChannels))
+    if compressors == "default":
+        compressors = default_compressors()
     cont_group.create_array(
-        DATA_DATASET_NAME, shape=(nSamples, nChannels), dtype=np.int16
+        DATA_DATASET_NAME,
+        shape=(nSamples, nChannels),
+        dtype=np.int16,
+        chunks=chunks,
+        shards=shards,
+        compressors=compressors,
+        fill_value=0,
     )
-    cont_group.create_array(INDEX_DATASET_NAME, shape=(n_index_items,), dtype=np.int64)
+    with _ignore_structured_dtype_warning():
+        cont_group.create_array(
+            INDEX_DATASET_NAME,
+            shape=(n_index_items,),
+            dtype=INDEX_DTYPE,
+            chunks=(max(1, n_index_items),),
+            compressors=None,
+            attributes={"dtype_name": CONT_DTYPE_NAME},
+        )
 
-    cont_group.attrs["SamplePeriod"] = np.int32(sample_period_ns)
+    attrs: dict[str, Any] = {"SamplePeriod": int(sample_period_ns)}
 
     # optional attributes
     if calibration is not None:
-        cont_group.attrs["Calibration"] = calibration
+        attrs["Calibration"] = calibration
 
     if channels is not None:
-        cont_group.attrs["Channels"] = channels
+        attrs["Channels"] = channels
 
     # set name attribute
-    if name is not None:
-        cont_group.attrs["Name"] = name
-    else:
-        cont_group.attrs["Name"] = f"CONT{cont_group_id}"
+    attrs["Name"] = name if name is not None else f"CONT{cont_group_id}"
 
     # set comment attribute
-    if comment is not None:
-        cont_group.attrs["Comment"] = comment
-    else:
-        cont_group.attrs["Comment"] = ""
+    attrs["Comment"] = comment if comment is not None else ""
 
+    # set signal type attribute
+    if signal_type is not None:
+        attrs["SignalType"] = signal_type.value
+
+    cont_group.attrs.update({key: encode_attribute(value) for key, value in attrs.items()})
     return cont_group
+
+
+def create_cont_group_from_data(
+    root: zarr.Group,
+    cont_group_id: int,  # group name will be CONT{cont_group_id}
+    data: np.ndarray,
+    index: np.ndarray,
+    sample_period_ns: int,
+    calibration: npt.NDArray[np.float64] | None = None,
+    channels: np.ndarray | None = None,
+    name: str | None = None,
+    comment: str | None = None,
+    signal_type: ContSignalType | None = None,
+    chunks: tuple[int, int] | None = None,
+    shards: tuple[int, int] | None = None,
+    compressors: Any = "default",
+) -> zarr.Group:
+    cont_group = create_empty_cont_group(
+        root,
+        cont_group_id,
+        nSamples=data.shape[0],
+        nChannels=data.shape[1],
+        sample_period_ns=sample_period_ns,
+        n_index_items=index.shape[0],
+        calibration=calibration,
+        channels=channels,
+        name=name,
+        comment=comment,
+        signal_type=signal_type,
+        chunks=chunks,
+        shards=shards,
+        compressors=compressors,
+    )
+
+    # make sure data in integer type
+    if not data.dtype == np.int16:
+        warnings.warn(
+            f"Data was converted from {data.dtype} to numpy.int16", category=DHZWarning
+        )
+        data = data.astype(np.int16)
+    cont_group[DATA_DATASET_NAME][...] = data
+    with _ignore_structured_dtype_warning():
+        cont_group[INDEX_DATASET_NAME][...] = np.asarray(index, dtype=INDEX_DTYPE)
+
+    return cont_group
+
+
+# read
+def get_cont_group_names(root: zarr.Group) -> list[str]:
+    return sorted(
+        (name for name in root.group_keys() if name.startswith(CONT_PREFIX)),
+        key=cont_id_from_name,
+    )
+
+
+def enumerate_cont_groups(root: zarr.Group) -> list[int]:
+    return [cont_id_from_name(name) for name in get_cont_group_names(root)]
+
+
+def get_cont_group_by_id(root: zarr.Group, cont_id: int) -> zarr.Group:
+    name = cont_name_from_id(cont_id)
+    if name not in root.group_keys():
+        raise DHZError(f"CONT{cont_id} does not exist in {root.store}")
+    return root[name]
+
+
+def get_cont_data_by_id(root: zarr.Group, cont_id: int) -> np.ndarray:
+    return get_cont_group_by_id(root, cont_id)[DATA_DATASET_NAME][...]
+
+
+def get_calibrated_cont_data_by_id(root: zarr.Group, cont_id: int) -> np.ndarray:
+    """Return calibrated data from a CONT group. If calibration attribute is
+    missing, return raw data, but issue warning. The shape of the returned array
+    is (nSamples, nChannels)
+    """
+    calibration = get_attribute(get_cont_group_by_id(root, cont_id), "Calibration")
+    if calibration is None:
+        warnings.warn(DHZWarning(f"Calibration attribute is missing from CONT{cont_id}"))
+        return get_cont_data_by_id(root, cont_id)
+    return get_cont_data_by_id(root, cont_id) * calibration
+
+
+def get_cont_regions_by_id(root: zarr.Group, cont_id: int) -> np.ndarray:
+    """Recording regions of a CONT block, see `dh5io.cont.get_regions`."""
+    cont_group = get_cont_group_by_id(root, cont_id)
+    return get_regions(get_index(cont_group), cont_group[DATA_DATASET_NAME].shape[0])
+
+
+def _column_range(channels: Any, n_channels: int) -> tuple[slice, np.ndarray | None]:
+    """Contiguous range of columns to read and the selection within that range (None
+    if the range is the selection)."""
+    if channels is None:
+        return slice(0, n_channels), None
+    selected = np.atleast_1d(np.arange(n_channels)[channels])
+    if selected.size == 0:
+        return slice(0, 0), None
+    first = int(selected.min())
+    return slice(first, int(selected.max()) + 1), selected - first
+
+
+def read_cont_data(
+    root: zarr.Group,
+    cont_id: int,
+    samples: slice = slice(None),
+    channels: Any = None,
+    calibrated: bool = False,
+    max_workers: int | None = None,
+) -> np.ndarray:
+    """Read samples and channels of `CONTn/DATA` with several threads.
+
+    The samples are split at shard (or chunk) boundaries and the pieces are read
+    concurrently by `max_workers` threads (default of `ThreadPoolExecutor`).
+    Channels (a slice, an index or a list of indices) are read as one contiguous
+    range and selected in memory.
+    """
+    cont_group = get_cont_group_by_id(root, cont_id)
+    data = cont_group[DATA_DATASET_NAME]
+    start, stop, step = samples.indices(data.shape[0])
+    if step != 1:
+        raise DHZError("read_cont_data only supports contiguous samples")
+    stop = max(start, stop)
+    columns, selection = _column_range(channels, data.shape[1])
+    pieces = _pieces(start, stop, (data.shards or data.chunks)[0])
+    out = np.empty((stop - start, columns.stop - columns.start), dtype=data.dtype)
+
+    def read(piece: tuple[int, int]) -> None:
+        a, b = piece
+        out[a - start : b - start] = data[a:b, columns]
+
+    if len(pieces) <= 1 or max_workers == 1:
+        for piece in pieces:
+            read(piece)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(read, pieces))
+
+    calibration = get_attribute(cont_group, "Calibration") if calibrated else None
+    return _select_and_calibrate(
+        out, cont_id, channels, columns, selection, calibrated, calibration
+    )
+
+
+def _pieces(start: int, stop: int, piece_rows: int) -> list[tuple[int, int]]:
+    """Split the samples [start, stop) at multiples of `piece_rows`, i.e. at the
+    boundaries of the shards (or chunks) of DATA."""
+    first_edge = math.ceil(start / piece_rows) * piece_rows
+    edges = [start, *range(first_edge, stop, piece_rows), stop]
+    return [(a, b) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def _select_and_calibrate(
+    out: np.ndarray,
+    cont_id: int,
+    channels: Any,
+    columns: slice,
+    selection: np.ndarray | None,
+    calibrated: bool,
+    calibration: np.ndarray | None,
+) -> np.ndarray:
+    """Select `channels` from the contiguous `columns` read into `out` and calibrate."""
+    if selection is not None:
+        out = out[:, selection]
+    if calibrated:
+        if calibration is None:
+            warnings.warn(DHZWarning(f"Calibration attribute is missing from CONT{cont_id}"))
+        else:
+            calibration = calibration[columns]
+            out = out * (calibration if selection is None else calibration[selection])
+    if np.ndim(channels) == 0 and isinstance(channels, (int, np.integer)):
+        out = out[:, 0]
+    return out
+
+
+# validate
+def validate_cont_group(cont_group: zarr.Group) -> None:
+    """Validate a CONT group in a DAQ-HDF Zarr folder.
+
+    This function checks if the CONT group has the required attributes and arrays.
+    """
+    if not isinstance(cont_group, zarr.Group):
+        raise DHZError("Not a valid Zarr group")
+
+    if DATA_DATASET_NAME not in cont_group.array_keys():
+        raise DHZError(f"DATA array is missing from CONT group {cont_group.name}")
+    data = cont_group[DATA_DATASET_NAME]
+    if len(data.shape) != 2:
+        raise DHZError(
+            f"DATA array in {cont_group.name} has wrong shape: {data.shape}. Must be 2D"
+        )
+    if data.dtype != np.int16:
+        raise DHZError(
+            f"DATA array in {cont_group.name} has wrong dtype: {data.dtype}. Must be int16"
+        )
+
+    calibration = get_attribute(cont_group, "Calibration")
+    if calibration is None:
+        warnings.warn(
+            message=f"Calibration attribute is missing from CONT group {cont_group.name}",
+            category=DHZWarning,
+        )
+    elif len(calibration) != data.shape[1]:
+        raise DHZError(
+            f"Calibration attribute in {cont_group.name} has wrong length: "
+            f"{len(calibration)}. Must have length equal to number of channels"
+        )
+
+    if cont_group.attrs.get("SamplePeriod") is None:
+        raise DHZError(f"SamplePeriod attribute is missing from CONT group {cont_group.name}")
+
+    if INDEX_DATASET_NAME not in cont_group.array_keys():
+        raise DHZError(f"INDEX array is missing from CONT group {cont_group.name}")
+    with _ignore_structured_dtype_warning():
+        index_dtype = cont_group[INDEX_DATASET_NAME].dtype
+    if index_dtype.names != ("time", "offset"):
+        raise DHZError(
+            f"INDEX array in {cont_group.name} does not have fields 'time' and 'offset'"
+        )
+
+    if "Channels" in cont_group.attrs:
+        try:
+            channels = get_attribute(cont_group, "Channels")
+        except (KeyError, TypeError, ValueError) as e:
+            raise DHZError(f"Channels attribute in {cont_group.name} is malformed") from e
+        if len(channels) != data.shape[1]:
+            raise DHZError(
+                f"Channels attribute in {cont_group.name} has wrong length: {len(channels)}"
+            )
+    else:
+        # should be an error according to specification, but is often missing
+        warnings.warn(
+            message=f"Channels attribute is missing from CONT group {cont_group.name}",
+            category=DHZWarning,
+        )
+
+
+def validate_cont_index(cont_group: zarr.Group) -> None:
+    """Check that the INDEX of a CONT group is consistent with its DATA, see
+    `dh5io.cont.validate_cont_index`."""
+    index = get_index(cont_group)
+    n_samples = cont_group[DATA_DATASET_NAME].shape[0]
+    sample_period = cont_group.attrs["SamplePeriod"]
+    if len(index) == 0:
+        if n_samples > 0:
+            raise DHZError(f"INDEX of {cont_group.name} is empty but DATA is not")
+        return
+
+    offsets = index["offset"]
+    times = index["time"]
+    if np.any(offsets < 0) or np.any(offsets >= max(n_samples, 1)):
+        raise DHZError(
+            f"INDEX offsets of {cont_group.name} are outside of DATA with {n_samples} samples"
+        )
+    if np.any(np.diff(offsets) <= 0):
+        raise DHZError(f"INDEX offsets of {cont_group.name} are not strictly increasing")
+
+    region_durations = np.diff(offsets) * np.int64(sample_period)
+    overlapping = np.flatnonzero(times[1:] < times[:-1] + region_durations)
+    if len(overlapping) > 0:
+        raise DHZError(
+            f"{len(overlapping)} regions of {cont_group.name} start before the previous "
+            f"region ends (first at region {overlapping[0] + 1})"
+        )
@@ -0,0 +1,584 @@
+"""Conversion between DAQ-HDF5 files and DAQ-HDF Zarr folders.
+
+    from dhzio.convert import dh5_to_dhz, dhz_to_dh5
+
+    dh5_to_dhz("session.dh5", "session.dhz")
+    dhz_to_dh5("session.dhz", "copy.dh5")
+
+All groups, datasets and attributes are copied, i.e. every CONT, SPIKE, TRIALMAP,
+EV02, Markers, Intervals and Operations entry. Attributes are stored with their
+data types (see `dhzio.attributes.encode_attributes`) and the committed data types of
+the HDF5 file (CONT_INDEX_ITEM, INTERVAL) are recorded in the root of the Zarr folder,
+so converting back yields the same file.
+
+Datasets are copied in blocks of rows aligned to the chunks (or shards) of the Zarr
+side. h5py is not thread-safe, so the HDF5 side is accessed from the calling thread
+only while the Zarr side (compression or decompression) runs in a thread pool. At
+most `max_workers` blocks are in flight and a block holds at most about
+`max_memory / (max_workers + 1)` bytes, which bounds the memory use independent of
+the file size.
+
+The progress is kept in the file `<target>.convert.json` next to the target. It
+records the CRC-32 of every copied block of the source, so an interrupted conversion
+is resumed with the same call (blocks already copied are skipped) and the target is
+verified block by block against these checksums at the end. The target is flushed
+before the progress file is saved, so a block is only recorded once it is on disk,
+even if the process is killed. The progress file is
+removed after a successful conversion, and the metadata of the Zarr folder is
+consolidated like by `DHZFolder`.
+"""
+
+import dataclasses
+import json
+import logging
+import math
+import os
+import pathlib
+import threading
+import time
+import zlib
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any
+import h5py
+import numpy as np
+import zarr
+import zarr.storage
+from dhzio.attributes import (
+    decode_attributes,
+    dtype_from_json,
+    dtype_to_json,
+    encode_attributes,
+)
+from dhzio.cont import DEFAULT_CHUNK_SAMPLES, _ignore_structured_dtype_warning
+from dhzio.cont import default_compressors
+from dhzio.dhzfile import consolidate_metadata
+from dhzio.errors import DHZError
+
+logger = logging.getLogger(__name__)
+
+# attribute of the Zarr root with the committed data types of the HDF5 file
+NAMED_DTYPES_ATTRIBUTE = "_dh5_named_dtypes"
+
+PROGRESS_SUFFIX = ".convert.json"
+
+DEFAULT_MAX_MEMORY = 256 * 2**20
+
+# rows per chunk of one-dimensional arrays (INDEX, TRIALMAP, EV02, markers, ...)
+DEFAULT_CHUNK_ROWS = 2**20
+
+
+@dataclasses.dataclass
+class ConversionReport:
+    """Summary of a conversion returned by `dh5_to_dhz` and `dhz_to_dh5`."""
+
+    source: str
+    target: str
+    groups: int = 0
+    arrays: int = 0
+    bytes_copied: int = 0
+    blocks_copied: int = 0
+    blocks_skipped: int = 0
+    verified: bool = False
+    duration_s: float = 0.0
+
+
+@dataclasses.dataclass
+class _Node:
+    path: str  # relative to the root, "" for the root itself
+    kind: str  # "group", "array" or "dtype"
+    attrs: dict
+    shape: tuple = ()
+    dtype: Any = None
+
+
+# HDF5 side
+def _h5_attrs(obj) -> dict:
+    return {name: obj.attrs[name] for name in obj.attrs}
+
+
+def _set_h5_attrs(obj, attrs: dict) -> None:
+    for name, value in attrs.items():
+        if isinstance(value, list):
+            value = np.array(value, dtype=h5py.string_dtype())
+        obj.attrs[name] = value
+
+
+class _H5Side:
+    thread_safe = False
+
+    def __init__(self, file: h5py.File):
+        self.file = file
+        self._named_dtypes: list[str] = []
+
+    def nodes(self) -> Iterator[_Node]:
+        yield _Node("", "group", _h5_attrs(self.file))
+        items: list[tuple[str, Any]] = []
+        self.file.visititems(lambda name, obj: items.append((name, obj)))
+        for name, obj in items:
+            if isinstance(obj, h5py.Datatype):
+                yield _Node(name, "dtype", {}, dtype=obj.dtype)
+            elif isinstance(obj, h5py.Group):
+                yield _Node(name, "group", _h5_attrs(obj))
+            else:
+                yield _Node(name, "array", _h5_attrs(obj), obj.shape, obj.dtype)
+
+    def storage_rows(self, path: str) -> int | None:
+        return None
+
+    def read(self, path: str, rows: slice) -> np.ndarray:
+        dataset = self.file[path]
+        return dataset[()] if dataset.ndim == 0 else dataset[rows]
+
+    def create_dtype(self, path: str, dtype: np.dtype) -> None:
+        if path not in self.file:
+            self.file[path] = dtype
+        self._named_dtypes.append(path)
+
+    def create_group(self, path: str, attrs: dict) -> None:
+        _set_h5_attrs(self.file.require_group(path) if path else self.file, attrs)
+
+    def create_array(self, node: _Node) -> None:
+        if node.path in self.file:
+            dataset = self.file[node.path]
+            if dataset.shape == node.shape and dataset.dtype == node.dtype:
+                _set_h5_attrs(dataset, node.attrs)
+                return
+            del self.file[node.path]
+        dtype = self._named_dtype(node.dtype)
+        dataset = self.file.create_dataset(node.path, shape=node.shape, dtype=dtype)
+        _set_h5_attrs(dataset, node.attrs)
+
+    def _named_dtype(self, dtype: np.dtype):
+        # datasets like the INDEX of CONT blocks refer to committed data types
+        if dtype.names is None:
+            return dtype
+        for path in self._named_dtypes:
+            if self.file[path].dtype == dtype:
+                return self.file[path]
+        return dtype
+
+    def write(self, path: str, rows: slice, data: np.ndarray) -> None:
+        dataset = self.file[path]
+        if dataset.ndim == 0:
+            dataset[()] = data
+        else:
+            dataset[rows] = data
+
+    def flush(self) -> None:
+        self.file.flush()
+
+
+# Zarr side
+class _ZarrSide:
+    thread_safe = True
+
+    def __init__(
+        self,
+        root: zarr.Group,
+        chunk_samples: int = DEFAULT_CHUNK_SAMPLES,
+        shard_chunks: int | None = None,
+        compressors: Any = "default",
+    ):
+        self.root = root
+        self.chunk_samples = chunk_samples
+        self.shard_chunks = shard_chunks
+        self.compressors = default_compressors() if compressors == "default" else compressors
+        self._arrays: dict[str, zarr.Array] = {}
+
+    def _array(self, path: str) -> zarr.Array:
+        if path not in self._arrays:
+            self._arrays[path] = self.root[path]
+        return self._arrays[path]
+
+    def nodes(self) -> Iterator[_Node]:
+        root_attrs = dict(self.root.attrs)
+        named = root_attrs.pop(NAMED_DTYPES_ATTRIBUTE, {})
+        yield _Node("", "group", decode_attributes(root_attrs))
+        for path, description in named.items():
+            yield _Node(path, "dtype", {}, dtype=dtype_from_json(description))
+        members = sorted(self.root.members(max_depth=None), key=lambda item: item[0])
+        for path, obj in members:
+            attrs = decode_attributes(obj.attrs.asdict())
+            if isinstance(obj, zarr.Group):
+                yield _Node(path, "group", attrs)
+            else:
+                yield _Node(path, "array", attrs, obj.shape, obj.dtype)
+
+    def storage_rows(self, path: str) -> int | None:
+        array = self._array(path)
+        if array.ndim == 0:
+            return None
+        return (array.shards or array.chunks)[0]
+
+    def read(self, path: str, rows: slice) -> np.ndarray:
+        array = self._array(path)
+        return array[()] if array.ndim == 0 else array[rows]
+
+    def create_dtype(self, path: str, dtype: np.dtype) -> None:
+        named = dict(self.root.attrs.get(NAMED_DTYPES_ATTRIBUTE, {}))
+        named[path] = dtype_to_json(dtype)
+        self.root.attrs[NAMED_DTYPES_ATTRIBUTE] = named
+
+    def create_group(self, path: str, attrs: dict) -> None:
+        group = self.root.require_group(path) if path else self.root
+        group.attrs.update(encode_attributes(attrs))
+
+    def _layout(self, shape: tuple) -> tuple[tuple, tuple | None]:
+        if len(shape) == 0:
+            return (), None
+        rows = self.chunk_samples if len(shape) > 1 else DEFAULT_CHUNK_ROWS
+        chunks = (max(1, min(shape[0], rows)), *(max(1, n) for n in shape[1:]))
+        if self.shard_chunks is None or shape[0] <= chunks[0]:
+            return chunks, None
+        n_chunks = min(self.shard_chunks, math.ceil(shape[0] / chunks[0]))
+        return chunks, (chunks[0] * n_chunks, *chunks[1:])
+
+    def create_array(self, node: _Node) -> None:
+        if node.path in self.root:
+            array = self.root[node.path]
+            if (
+                isinstance(array, zarr.Array)
+                and array.shape == node.shape
+                and array.dtype == node.dtype
+            ):
+                array.attrs.update(encode_attributes(node.attrs))
+                return
+            del self.root[node.path]
+        chunks, shards = self._layout(node.shape)
+        array = self.root.create_array(
+            node.path,
+            shape=node.shape,
+            dtype=node.dtype,
+            chunks=chunks,
+            shards=shards,
+            compressors=self.compressors,
+            fill_value=None,
+        )
+        array.attrs.update(encode_attributes(node.attrs))
+        self._arrays.pop(node.path, None)
+
+    def write(self, path: str, rows: slice, data: np.ndarray) -> None:
+        array = self._array(path)
+        if array.ndim == 0:
+            array[()] = data
+        else:
+            array[rows] = data
+
+    def flush(self) -> None:
+        # chunks are written to the store synchronously
+        pass
+
+
+# progress and checksums
+def _source_signature(source: pathlib.Path) -> list:
+    stat = (source / "zarr.json").stat() if source.is_dir() else source.stat()
+    return [str(source.resolve()), stat.st_size, stat.st_mtime_ns]
+
+
+class _Progress:
+    """Checksums of the copied blocks, saved to `<target>.convert.json`."""
+
+    def __init__(self, path: pathlib.Path, signature: list, interval_s: float = 1.0):
+        self.path = path
+        self.signature = signature
+        self.interval_s = interval_s
+        self.arrays: dict[str, dict] = {}
+        # called before saving, so that recorded blocks are on disk
+        self.flush: Callable[[], None] | None = None
+        self._saved = 0.0
+        # blocks are written to Zarr and recorded from several threads
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: pathlib.Path, signature: list) -> "_Progress | None":
+        if not path.exists():
+            return None
+        state = json.loads(path.read_text())
+        if state.get("source") != signature:
+            return None
+        progress = cls(path, signature)
+        progress.arrays = state["arrays"]
+        return progress
+
+    def blocks(self, array_path: str, block_rows: int) -> dict[str, int]:
+        with self._lock:
+            entry = self.arrays.get(array_path)
+            if entry is None or entry["block_rows"] != block_rows:
+                entry = self.arrays[array_path] = {"block_rows": block_rows, "crc": {}}
+            return entry["crc"]
+
+    def record(self, checksums: dict[str, int], block: int, crc: int) -> None:
+        with self._lock:
+            checksums[str(block)] = crc
+
+    def save(self, force: bool = False) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._saved < self.interval_s:
+                return
+            if self.flush is not None:
+                self.flush()
+            state = json.dumps({"source": self.signature, "arrays": self.arrays})
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(state)
+            os.replace(tmp, self.path)
+            self._saved = now
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def _crc(data: np.ndarray) -> int:
+    return zlib.crc32(np.ascontiguousarray(data).view(np.uint8).ravel())
+
+
+def _block_rows(node: _Node, align: int | None, max_memory: int, max_workers: int) -> int:
+    if len(node.shape) == 0 or node.shape[0] == 0:
+        return 1
+    row_bytes = max(1, node.dtype.itemsize * math.prod(node.shape[1:]))
+    rows = max(1, max_memory // ((max_workers + 1) * row_bytes))
+    if align:
+        rows = max(align, rows // align * align)
+    return min(rows, node.shape[0])
+
+
+def _blocks(node: _Node, block_rows: int) -> list[tuple[int, slice]]:
+    if len(node.shape) == 0:
+        return [(0, slice(None))]
+    n_rows = node.shape[0]
+    return [
+        (i, slice(start, min(start + block_rows, n_rows)))
+        for i, start in enumerate(range(0, n_rows, block_rows))
+    ]
+
+
+def _pipeline(
+    pool: ThreadPoolExecutor,
+    max_workers: int,
+    blocks: list[tuple[int, slice]],
+    produce: Callable[[int, slice], Any],
+    consume: Callable[[int, slice, Any], None],
+    parallel_produce: bool,
+) -> None:
+    """Run `consume(produce(block))` for all blocks with `max_workers` in flight.
+
+    Either `produce` (reading the Zarr side) or `consume` (writing the Zarr side) runs
+    in `pool`, the other in the calling thread (the HDF5 side).
+    """
+    pending: dict[Future, tuple[int, slice]] = {}
+
+    def drain(limit: int) -> None:
+        while len(pending) > limit:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, rows = pending.pop(future)
+                result = future.result()
+                if parallel_produce:
+                    consume(i, rows, result)
+
+    for i, rows in blocks:
+        drain(max_workers - 1)
+        if parallel_produce:
+            pending[pool.submit(produce, i, rows)] = (i, rows)
+        else:
+            data = produce(i, rows)
+            pending[pool.submit(consume, i, rows, data)] = (i, rows)
+    drain(0)
+
+
+def _convert(
+    source_side,
+    target_side,
+    report: ConversionReport,
+    progress: _Progress,
+    max_memory: int,
+    max_workers: int,
+    verify: bool,
+) -> None:
+    progress.flush = target_side.flush
+    # warnings filters are not thread-safe, so they are set once for all threads
+    with _ignore_structured_dtype_warning():
+        try:
+            _copy(source_side, target_side, report, progress, max_memory, max_workers, verify)
+        finally:
+            # keep the checksums of the blocks copied before an interruption
+            progress.save(force=True)
+
+
+def _copy(
+    source_side,
+    target_side,
+    report: ConversionReport,
+    progress: _Progress,
+    max_memory: int,
+    max_workers: int,
+    verify: bool,
+) -> None:
+    zarr_side = source_side if source_side.thread_safe else target_side
+    nodes = list(source_side.nodes())
+    # committed data types first, datasets may refer to them
+    for node in nodes:
+        if node.kind == "dtype":
+            target_side.create_dtype(node.path, node.dtype)
+
+    arrays: list[tuple[_Node, int]] = []
+    for node in nodes:
+        if node.kind == "group":
+            target_side.create_group(node.path, node.attrs)
+            report.groups += 1
+        elif node.kind == "array":
+            target_side.create_array(node)
+            align = zarr_side.storage_rows(node.path)
+            arrays.append((node, _block_rows(node, align, max_memory, max_workers)))
+            report.arrays += 1
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for node, block_rows in arrays:
+            checksums = progress.blocks(node.path, block_rows)
+            blocks = _blocks(node, block_rows)
+            todo = [(i, rows) for i, rows in blocks if str(i) not in checksums]
+            report.blocks_skipped += len(blocks) - len(todo)
+            if not todo:
+                continue
+            logger.debug(f"Copying {node.path} in {len(todo)} blocks of {block_rows} rows")
+
+            def read(i: int, rows: slice, path=node.path) -> tuple[np.ndarray, int]:
+                data = source_side.read(path, rows)
+                return data, _crc(data)
+
+            def write(i: int, rows: slice, result, path=node.path, checksums=checksums):
+                data, crc = result
+                target_side.write(path, rows, data)
+                progress.record(checksums, i, crc)
+                # runs in the worker threads when writing to Zarr
+                with progress._lock:
+                    report.bytes_copied += data.nbytes
+                    report.blocks_copied += 1
+                progress.save()
+
+            _pipeline(pool, max_workers, todo, read, write, source_side.thread_safe)
+
+        if verify:
+            _verify(pool, max_workers, target_side, arrays, progress)
+            report.verified = True
+
+
+def _verify(pool, max_workers, target_side, arrays, progress: _Progress) -> None:
+    mismatches: list[str] = []
+    for node, block_rows in arrays:
+        checksums = progress.blocks(node.path, block_rows)
+
+        def read(i: int, rows: slice, path=node.path) -> int:
+            return _crc(target_side.read(path, rows))
+
+        def check(i: int, rows: slice, crc: int, path=node.path, checksums=checksums):
+            if checksums.get(str(i)) != crc:
+                mismatches.append(f"{path}[{rows.start}:{rows.stop}]")
+
+        if target_side.thread_safe:
+            _pipeline(pool, max_workers, _blocks(node, block_rows), read, check, True)
+        else:
+            for i, rows in _blocks(node, block_rows):
+                check(i, rows, read(i, rows))
+    if mismatches:
+        raise DHZError(f"Checksum mismatch after conversion in {', '.join(mismatches)}")
+
+
+def _prepare(
+    source: str | os.PathLike,
+    target: str | os.PathLike,
+    overwrite: bool,
+) -> tuple[pathlib.Path, pathlib.Path, _Progress, bool]:
+    source, target = pathlib.Path(source), pathlib.Path(target)
+    if not source.exists():
+        raise FileNotFoundError(f"{source} does not exist")
+    signature = _source_signature(source)
+    progress_path = target.with_name(target.name + PROGRESS_SUFFIX)
+    progress = None if overwrite else _Progress.load(progress_path, signature)
+    resume = progress is not None and target.exists()
+    if not resume:
+        if target.exists() and not overwrite:
+            raise FileExistsError(
+                f"{target} exists and there is no conversion to resume, "
+                "pass overwrite=True to replace it"
+            )
+        progress = _Progress(progress_path, signature)
+    else:
+        logger.info(f"Resuming conversion of {source} to {target}")
+    return source, target, progress, resume
+
+
+def dh5_to_dhz(
+    source: str | os.PathLike,
+    target: str | os.PathLike,
+    chunk_samples: int = DEFAULT_CHUNK_SAMPLES,
+    shard_chunks: int | None = None,
+    compressors: Any = "default",
+    max_workers: int | None = None,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+    verify: bool = True,
+    overwrite: bool = False,
+) -> ConversionReport:
+    """Copy the DH5 file `source` to the Zarr folder `target`.
+
+    CONT DATA arrays get chunks of `chunk_samples` samples of all channels and, with
+    `shard_chunks`, shards of that many chunks. `compressors` are Zarr v3 codecs as in
+    `dhzio.cont.create_empty_cont_group`. An interrupted conversion is resumed unless
+    `overwrite` is True, see the module documentation.
+    """
+    started = time.monotonic()
+    max_workers = max_workers or min(8, os.cpu_count() or 1)
+    source, target, progress, resume = _prepare(source, target, overwrite)
+    report = ConversionReport(str(source), str(target))
+
+    store = zarr.storage.LocalStore(target)
+    try:
+        root = zarr.open_group(store=store, mode="a" if resume else "w")
+        target_side = _ZarrSide(root, chunk_samples, shard_chunks, compressors)
+        with h5py.File(source, "r") as file:
+            source_side = _H5Side(file)
+            _convert(
+                source_side, target_side, report, progress, max_memory, max_workers, verify
+            )
+        consolidate_metadata(store)
+    finally:
+        store.close()
+    progress.remove()
+    report.duration_s = time.monotonic() - started
+    return report
+
+
+def dhz_to_dh5(
+    source: str | os.PathLike,
+    target: str | os.PathLike,
+    max_workers: int | None = None,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+    verify: bool = True,
+    overwrite: bool = False,
+) -> ConversionReport:
+    """Copy the Zarr folder `source` to the DH5 file `target`.
+
+    Datasets are written contiguously and uncompressed like the files created by
+    `dh5io`. An interrupted conversion is resumed unless `overwrite` is True, see the
+    module documentation.
+    """
+    started = time.monotonic()
+    max_workers = max_workers or min(8, os.cpu_count() or 1)
+    source, target, progress, resume = _prepare(source, target, overwrite)
+    report = ConversionReport(str(source), str(target))
+
+    store = zarr.storage.LocalStore(source, read_only=True)
+    try:
+        with _ignore_structured_dtype_warning():
+            source_side = _ZarrSide(zarr.open_group(store=store, mode="r"))
+        with h5py.File(target, "a" if resume else "w") as file:
+            target_side = _H5Side(file)
+            _convert(
+                source_side, target_side, report, progress, max_memory, max_workers, verify
+            )
+    finally:
+        store.close()
+    progress.remove()
+    report.duration_s = time.monotonic() - started
+    return report
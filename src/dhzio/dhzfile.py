@@ -1,26 +1,152 @@
 import pathlib
+import warnings
+from collections.abc import AsyncIterator
+import numpy
 import zarr
 import zarr.storage
+from zarr.errors import ZarrUserWarning
+import dhzio.aio as aio
+import dhzio.cont as cont
+
+
+def consolidate_metadata(store: zarr.storage.StoreLike) -> zarr.Group:
+    """Consolidate the metadata of the hierarchy in `store` into its root."""
+    with cont._ignore_structured_dtype_warning(), warnings.catch_warnings():
+        # consolidated metadata is supported by zarr-python, but not yet specified
+        warnings.filterwarnings("ignore", "Consolidated metadata", ZarrUserWarning)
+        return zarr.consolidate_metadata(store, zarr_format=3)
 
 
 class DHZFolder:
     """Class for interacting with DAQ-HD (*.dh5) data folders from the Kreiter lab.
 
     See https://github.com/cog-neurophys-lab/DAQ-HDF5 for the specification of the format for HDF5.
+
+    `mode` is "r" (read only), "r+" (read and write), "a" (read and write, create if
+    missing) or "w" (create, replacing an existing folder).
+
+    The metadata of all groups and arrays is consolidated into the `zarr.json` of the
+    root, so opening a folder and listing its blocks reads a single file. The write
+    methods of this class keep the consolidated metadata up to date: it is rewritten
+    before the next read through this folder and when the folder is closed. Callers
+    that modify the hierarchy through `root` must call `consolidate` afterwards, else
+    the changes are not seen by this folder and not recorded in the metadata.
     """
 
     store: zarr.storage.StoreLike
-    root: zarr.Group
 
-    def __init__(self, folder: str | pathlib.Path):
-        self.store = zarr.storage.LocalStore(folder)
-        self.root = zarr.group(store=self.store, overwrite=False)
+    def __init__(self, folder: str | pathlib.Path, mode: str = "a"):
+        if mode not in ("r", "r+", "a", "w"):
+            raise ValueError(f"Invalid mode {mode!r}, must be 'r', 'r+', 'a' or 'w'")
+        self.mode = mode
+        self.store = zarr.storage.LocalStore(folder, read_only=mode == "r")
+        with cont._ignore_structured_dtype_warning():
+            self._root = zarr.open_group(store=self.store, mode=mode, zarr_format=3)
+        self._async_root: zarr.AsyncGroup | None = None
+        # folders written without consolidated metadata get it on first use
+        self._stale = self.writable and self._root.metadata.consolidated_metadata is None
 
     def __del__(self):
-        self.store.close()
+        # not initialized if opening failed
+        if hasattr(self, "_root"):
+            self.close()
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def writable(self) -> bool:
+        return self.mode != "r"
+
+    @property
+    def root(self) -> zarr.Group:
+        """Root group of the folder; call `consolidate` after writing through it."""
+        return self._current_root()
+
+    def _current_root(self) -> zarr.Group:
+        if self._stale:
+            self.consolidate()
+        return self._root
+
+    def consolidate(self) -> None:
+        """Write the consolidated metadata of the hierarchy and reload the root."""
+        self._root = consolidate_metadata(self.store)
+        self._async_root = None
+        self._stale = False
+
+    def close(self) -> None:
+        if self._stale:
+            self.consolidate()
         self.store.close()
+
+    # cont
+    def get_cont_group_names(self) -> list[str]:
+        return cont.get_cont_group_names(self._current_root())
+
+    def get_cont_group_ids(self) -> list[int]:
+        return cont.enumerate_cont_groups(self._current_root())
+
+    def get_cont_group_by_id(self, cont_id: int) -> zarr.Group:
+        return cont.get_cont_group_by_id(self._current_root(), cont_id)
+
+    def get_cont_attrs_by_id(self, cont_id: int) -> dict:
+        group = self.get_cont_group_by_id(cont_id)
+        return {name: cont.get_attribute(group, name) for name in group.attrs}
+
+    def get_cont_data_by_id(self, cont_id: int) -> numpy.ndarray:
+        return cont.get_cont_data_by_id(self._current_root(), cont_id)
+
+    def get_calibrated_cont_data_by_id(self, cont_id: int) -> numpy.ndarray:
+        return cont.get_calibrated_cont_data_by_id(self._current_root(), cont_id)
+
+    def get_cont_index_by_id(self, cont_id: int) -> numpy.ndarray:
+        return cont.get_index(self.get_cont_group_by_id(cont_id))
+
+    def get_cont_regions_by_id(self, cont_id: int) -> numpy.ndarray:
+        return cont.get_cont_regions_by_id(self._current_root(), cont_id)
+
+    def read_cont_data(self, cont_id: int, samples: slice = slice(None), **kwargs):
+        """Read samples and channels of a CONT block, see `dhzio.cont.read_cont_data`."""
+        return cont.read_cont_data(self._current_root(), cont_id, samples, **kwargs)
+
+    def create_cont_group_from_data(self, cont_group_id: int, data, index, **kwargs):
+        """Write a CONT block, see `dhzio.cont.create_cont_group_from_data`."""
+        root = self._current_root()
+        self._stale = True
+        return cont.create_cont_group_from_data(root, cont_group_id, data, index, **kwargs)
+
+    def create_empty_cont_group(self, cont_group_id: int | None, *args, **kwargs):
+        """Create an empty CONT block, see `dhzio.cont.create_empty_cont_group`."""
+        root = self._current_root()
+        self._stale = True
+        return cont.create_empty_cont_group(root, cont_group_id, *args, **kwargs)
+
+    def validate(self) -> None:
+        """Validate all CONT groups, raising DHZError on the first problem."""
+        for cont_id in self.get_cont_group_ids():
+            group = self.get_cont_group_by_id(cont_id)
+            cont.validate_cont_group(group)
+            cont.validate_cont_index(group)
+
+    # asynchronous access
+    async def get_async_root(self) -> zarr.AsyncGroup:
+        self._current_root()
+        if self._async_root is None:
+            self._async_root = await aio.open_root(self.store)
+        return self._async_root
+
+    async def read_cont(self, cont_id: int, t_start=None, t_stop=None, **kwargs):
+        """Read a time window of a CONT block, see `dhzio.aio.read_cont`."""
+        root = await self.get_async_root()
+        return await aio.read_cont(root, cont_id, t_start, t_stop, **kwargs)
+
+    async def iter_cont(
+        self, cont_id: int, t_start=None, t_stop=None, **kwargs
+    ) -> AsyncIterator[aio.ContBlock]:
+        """Iterate over a time window of a CONT block, see `dhzio.aio.iter_cont`."""
+        root = await self.get_async_root()
+        async for block in aio.iter_cont(root, cont_id, t_start, t_stop, **kwargs):
+            yield block
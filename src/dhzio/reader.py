@@ -0,0 +1,67 @@
+"""`SessionReader` of DAQ-HDF Zarr folders, see `dh5io.reader`.
+
+The folder is opened read only with its consolidated metadata (see `DHZFolder`), so
+listing blocks and reading attributes does not touch the store again. CONT samples
+are read with several threads by `dhzio.cont.read_cont_data`. SPIKE blocks, TRIALMAP,
+EV02 and Markers are read from the arrays of the same names, as written by
+`dhzio.convert`.
+"""
+
+import pathlib
+from collections.abc import Mapping
+from typing import Any
+import numpy as np
+import zarr
+from dh5io.reader import BaseSessionReader
+from dhzio.attributes import decode_attributes
+from dhzio.cont import _ignore_structured_dtype_warning, read_cont_data
+from dhzio.dhzfile import DHZFolder
+
+
+class DHZReader(BaseSessionReader):
+    """`SessionReader` of a DAQ-HDF Zarr folder."""
+
+    def __init__(self, path: str | pathlib.Path, max_workers: int | None = None):
+        super().__init__(path)
+        self.folder = DHZFolder(path, mode="r")
+        self.max_workers = max_workers
+        self._root = self.folder.root
+        self._attrs_cache: dict[str, Mapping[str, Any]] = {}
+
+    def _node(self, path: str) -> zarr.Group | zarr.Array | None:
+        if not path:
+            return self._root
+        with _ignore_structured_dtype_warning():
+            try:
+                return self._root[path]
+            except KeyError:
+                return None
+
+    def _group_names(self, path: str = "") -> list[str]:
+        group = self._node(path)
+        return sorted(group.group_keys()) if isinstance(group, zarr.Group) else []
+
+    def _array_names(self, path: str) -> list[str]:
+        group = self._node(path)
+        return sorted(group.array_keys()) if isinstance(group, zarr.Group) else []
+
+    def _attrs(self, path: str) -> Mapping[str, Any]:
+        if path not in self._attrs_cache:
+            self._attrs_cache[path] = decode_attributes(self._node(path).attrs.asdict())
+        return self._attrs_cache[path]
+
+    def _shape(self, path: str) -> tuple[int, ...] | None:
+        array = self._node(path)
+        return array.shape if isinstance(array, zarr.Array) else None
+
+    def _read(self, path: str, selection: Any = slice(None)) -> np.ndarray:
+        with _ignore_structured_dtype_warning():
+            return self._node(path)[selection]
+
+    def _read_cont_samples(self, cont_id, samples, channels, calibrated) -> np.ndarray:
+        return read_cont_data(
+            self._root, cont_id, samples, channels, calibrated, max_workers=self.max_workers
+        )
+
+    def close(self) -> None:
+        self.folder.close()
@@ -0,0 +1,21 @@
+import dataclasses
+import pytest
+from dh5io.synthetic import SyntheticConfig, generate_session
+
+
+@pytest.fixture
+def session_config(request) -> SyntheticConfig:
+    """Config of the small synthetic `session`.
+
+    Change fields with indirect parametrization, e.g.
+    `@pytest.mark.parametrize("session_config", [{"n_cont": 1}], indirect=True)`.
+    """
+    config = SyntheticConfig(
+        n_cont=2, n_channels=3, n_regions=3, region_duration_s=1.0, gap_duration_s=0.5
+    )
+    return dataclasses.replace(config, **getattr(request, "param", {}))
+
+
+@pytest.fixture
+def session(tmp_path, session_config):
+    return generate_session(tmp_path / "session.dh5", session_config)
@@ -0,0 +1,74 @@
+import dataclasses
+import h5py
+import numpy as np
+import pytest
+from dh5io.access import (
+    MAX_CHUNK_CACHE_SLOTS,
+    PROFILES,
+    chunk_cache_settings,
+    get_profile,
+    open_file,
+)
+from dh5io.dh5file import DH5File
+from dh5io.errors import DH5Error
+
+
+def create_chunked_file(filename):
+    with h5py.File(filename, "w") as f:
+        group = f.create_group("CONT1")
+        group.create_dataset("DATA", shape=(10_000, 64), chunks=(1000, 16), dtype=np.int16)
+        group.create_dataset("INDEX", shape=(1,), dtype=np.int64)
+
+
+def test_profile_file_kwargs():
+    kwargs = PROFILES["metadata"].file_kwargs("r")
+    assert kwargs["page_buf_size"] == 16 * 2**20
+    assert "page_buf_size" not in PROFILES["metadata"].file_kwargs("w")
+    assert PROFILES["default"].file_kwargs() == {}
+    with pytest.raises(DH5Error, match="Unknown access profile"):
+        get_profile("fast")
+
+
+def test_chunk_cache_settings(tmp_path):
+    filename = tmp_path / "chunked.h5"
+    create_chunked_file(filename)
+    with h5py.File(filename, "r") as f:
+        dataset = f["CONT1/DATA"]
+        chunk_nbytes = 1000 * 16 * 2
+        nslots, nbytes, w0 = chunk_cache_settings(dataset, PROFILES["random"])
+        # 64 rows of 4 chunks are smaller than the minimum cache size
+        assert nbytes == max(64 * 4 * chunk_nbytes, 256 * 2**20)
+        assert w0 == 0.75
+        assert nslots >= 100 * (nbytes // chunk_nbytes)
+
+        small = dataclasses.replace(PROFILES["sequential"], rdcc_nbytes=0)
+        _, nbytes, w0 = chunk_cache_settings(dataset, small)
+        assert nbytes == 2 * 4 * chunk_nbytes
+        assert w0 == 1.0
+        assert chunk_cache_settings(dataset, PROFILES["metadata"]) is None
+
+
+def test_chunk_cache_slots_are_bounded(tmp_path):
+    with h5py.File(tmp_path / "small_chunks.h5", "w") as f:
+        dataset = f.create_dataset("DATA", shape=(10_000, 1), chunks=(64, 1), dtype=np.int16)
+        nslots, nbytes, _ = chunk_cache_settings(dataset, PROFILES["random"])
+    # 256 MiB hold two million chunks of 128 bytes
+    assert nbytes // 128 > MAX_CHUNK_CACHE_SLOTS
+    assert MAX_CHUNK_CACHE_SLOTS <= nslots < MAX_CHUNK_CACHE_SLOTS + 100
+
+
+def test_dh5file_profile(tmp_path):
+    filename = tmp_path / "chunked.h5"
+    create_chunked_file(filename)
+    with DH5File(filename, profile="sequential") as dh5file:
+        assert dh5file.file.id.get_access_plist().get_cache()[2] == 16 * 2**20
+        dataset = dh5file.get_cont_data_dataset_by_id(1)
+        _, nbytes, w0 = dataset.id.get_access_plist().get_chunk_cache()
+        assert nbytes == 16 * 2**20
+        assert w0 == 1.0
+        assert dataset.shape == (10_000, 64)
+        assert dh5file.get_cont_data_dataset_by_id(1) is dataset
+
+    # page buffer on a file without paged file space
+    with open_file(filename, "r", "metadata") as f:
+        assert f["CONT1/DATA"].shape == (10_000, 64)
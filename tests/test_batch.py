@@ -0,0 +1,99 @@
+import os
+import numpy as np
+import dh5io.cont as cont
+from dh5io.batch import estimate_memory, map_sessions
+from dh5io.create import create_dh_file
+from dh5io.dh5file import DH5File
+from dhspec.cont import CHANNELS_DTYPE
+
+
+def create_file(filename, n_samples: int):
+    with create_dh_file(filename, overwrite=True, boards=["board"]) as dh5file:
+        cont.create_cont_group_from_data_in_file(
+            dh5file.file,
+            1,
+            data=np.ones((n_samples, 2), dtype=np.int16),
+            index=cont.create_empty_index_array(1),
+            sample_period_ns=1_000_000,
+            calibration=np.ones(2),
+            channels=np.zeros(2, dtype=CHANNELS_DTYPE),
+        )
+
+
+def n_samples(dh5file: DH5File) -> int:
+    return dh5file.get_cont_group_by_id(1)["DATA"].shape[0]
+
+
+def fail_on_small(dh5file: DH5File) -> int:
+    if n_samples(dh5file) < 20:
+        raise ValueError("too small")
+    return n_samples(dh5file)
+
+
+def crash(dh5file: DH5File) -> None:
+    os._exit(1)
+
+
+def test_estimate_memory(tmp_path):
+    filename = tmp_path / "a.dh5"
+    create_file(filename, 100)
+    assert estimate_memory(filename) == 100 * 2 * 2
+    assert estimate_memory(filename, factor=4) == 100 * 2 * 2 * 4
+
+
+def test_map_sessions(tmp_path):
+    paths = []
+    for i in range(4):
+        paths.append(tmp_path / f"{i}.dh5")
+        create_file(paths[-1], 10 * (i + 1))
+
+    results = {r.path: r for r in map_sessions(fail_on_small, paths, workers=2)}
+    assert len(results) == 4
+    assert not results[str(paths[0])].ok
+    assert "too small" in results[str(paths[0])].error
+    assert [results[str(p)].value for p in paths[1:]] == [20, 30, 40]
+
+
+def test_map_sessions_memory_budget(tmp_path):
+    paths = [tmp_path / "small.dh5", tmp_path / "large.dh5", tmp_path / "missing.dh5"]
+    create_file(paths[0], 10)
+    create_file(paths[1], 1000)
+
+    results = {
+        r.path: r for r in map_sessions(n_samples, paths, workers=2, memory_budget=1000)
+    }
+    assert results[str(paths[0])].value == 10
+    # larger than the budget, runs alone
+    assert results[str(paths[1])].value == 1000
+    assert results[str(paths[2])].attempts == 0
+    assert not results[str(paths[2])].ok
+
+
+def test_map_sessions_estimates_memory_lazily(tmp_path):
+    paths = []
+    for i in range(4):
+        paths.append(tmp_path / f"{i}.dh5")
+        create_file(paths[-1], 10)
+    estimated = []
+
+    def memory_estimate(path):
+        estimated.append(path)
+        return estimate_memory(path)
+
+    results = map_sessions(
+        n_samples, paths, workers=1, memory_budget=10**6, memory_estimate=memory_estimate
+    )
+    assert next(results).value == 10
+    # the first result arrives before all files have been opened
+    assert len(estimated) < len(paths)
+    assert [r.value for r in results] == [10, 10, 10]
+    assert len(estimated) == len(paths)
+
+
+def test_map_sessions_worker_crash(tmp_path):
+    filename = tmp_path / "a.dh5"
+    create_file(filename, 10)
+    (result,) = map_sessions(crash, [filename], workers=1, retries=1)
+    assert not result.ok
+    assert result.attempts == 2
+    assert "died" in result.error
@@ -0,0 +1,68 @@
+import gc
+import numpy as np
+import pytest
+import dh5io.cont as cont
+from dh5io.cache import FileCache, _file_caches
+from dh5io.create import create_dh_file
+from dh5io.errors import DH5Error
+from dh5io.markers import add_marker_to_file
+from dh5io.trialmap import add_trialmap_to_file
+from dhspec.trialmap import TRIALMAP_DATASET_DTYPE
+
+
+def test_cache_returns_same_handles(tmp_path):
+    filename = tmp_path / "test.dh5"
+    with create_dh_file(filename) as dh5file:
+        cont.create_empty_cont_group_in_file(
+            dh5file.file, 1, nSamples=10, nChannels=2, sample_period_ns=1000
+        )
+        assert dh5file.get_cont_group_by_id(1) is dh5file.get_cont_group_by_id(1)
+        assert dh5file.get_cont_index_by_id(1) is dh5file.get_cont_index_by_id(1)
+        assert dh5file.get_cont_attrs_by_id(1)["SamplePeriod"] == 1000
+        assert dh5file.get_cont_size(1) == (10, 2)
+        with pytest.raises(DH5Error):
+            dh5file.get_cont_group_by_id(2)
+
+
+def test_cache_is_invalidated_by_write_functions(tmp_path):
+    filename = tmp_path / "test.dh5"
+    with create_dh_file(filename) as dh5file:
+        assert dh5file.get_cont_group_ids() == []
+        assert len(dh5file.get_markers()) == 0
+
+        cont.create_empty_cont_group_in_file(
+            dh5file.file, 1, nSamples=10, nChannels=2, sample_period_ns=1000
+        )
+        cont.create_empty_cont_group_in_file(
+            dh5file, 2, nSamples=10, nChannels=2, sample_period_ns=1000
+        )
+        assert dh5file.get_cont_group_ids() == [1, 2]
+        assert dh5file.get_cont_group_by_id(2).name == "/CONT2"
+
+        add_marker_to_file(dh5file.file, "m", np.array([1, 2], dtype=np.int64))
+        assert list(dh5file.get_markers()) == ["m"]
+
+        trialmap = np.rec.array([(1, 2, 3, 10, 20)], dtype=TRIALMAP_DATASET_DTYPE)
+        add_trialmap_to_file(dh5file.file, trialmap)
+        assert "1 Trials in TRIALMAP" in str(dh5file)
+
+
+def test_cache_can_be_invalidated_explicitly(tmp_path):
+    filename = tmp_path / "test.dh5"
+    with create_dh_file(filename) as dh5file:
+        assert dh5file.get_spike_group_names() == []
+        dh5file.file.create_group("SPIKE3")
+        assert dh5file.get_spike_group_names() == []
+        dh5file.invalidate_cache()
+        assert dh5file.get_spike_group_names() == ["SPIKE3"]
+
+
+def test_caches_of_closed_files_are_forgotten(tmp_path):
+    filename = tmp_path / "test.dh5"
+    with create_dh_file(filename) as dh5file:
+        cache = FileCache(dh5file.file)
+        fileno = dh5file.file.id.fileno
+        assert cache in _file_caches[fileno]
+    del cache, dh5file
+    gc.collect()
+    assert fileno not in _file_caches
@@ -0,0 +1,84 @@
+import os
+import numpy as np
+import pytest
+import dh5io.cont as cont
+from dh5io.catalog import Catalog
+from dh5io.create import create_dh_file
+from dh5io.markers import add_marker_to_file
+from dh5io.trialmap import add_trialmap_to_file
+from dhspec.trialmap import TRIALMAP_DATASET_DTYPE
+
+
+def create_session(filename, n_correct: int, stim_no: int, sample_period_ns: int):
+    with create_dh_file(filename, overwrite=True) as dh5file:
+        cont.create_empty_cont_group_in_file(
+            dh5file.file,
+            1,
+            nSamples=100,
+            nChannels=4,
+            sample_period_ns=sample_period_ns,
+            signal_type=cont.ContSignalType.LFP,
+        )
+        trials = [(i, stim_no, 0, i * 10, i * 10 + 5) for i in range(n_correct)]
+        trials += [(n_correct, stim_no, 1, 0, 1)]
+        add_trialmap_to_file(
+            dh5file.file, np.rec.array(trials, dtype=TRIALMAP_DATASET_DTYPE)
+        )
+        add_marker_to_file(dh5file.file, "reward", np.array([1], dtype=np.int64))
+
+
+@pytest.fixture
+def session_dir(tmp_path):
+    root = tmp_path / "sessions"
+    (root / "monkey_a").mkdir(parents=True)
+    create_session(root / "monkey_a" / "s1.dh5", 250, 12, 1_000_000)
+    create_session(root / "monkey_a" / "s2.dh5", 100, 12, 1_000_000)
+    create_session(root / "s3.dh5", 300, 12, 1_000)
+    create_session(root / "s4.dh5", 300, 5, 1_000_000)
+    return root
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_catalog_update_and_query(session_dir, tmp_path, workers):
+    with Catalog(tmp_path / "catalog.sqlite") as catalog:
+        stats = catalog.update(session_dir, workers=workers)
+        assert stats.indexed == 4
+        assert len(catalog.paths()) == 4
+
+        found = catalog.find_sessions(
+            stim_no=12, outcome=0, min_trials=200, signal_type="LFP", sample_rate_hz=1000
+        )
+        assert [os.path.basename(p) for p in found] == ["s1.dh5"]
+        assert len(catalog.find_sessions(stim_no=12)) == 3
+        assert len(catalog.find_sessions(sample_rate_hz=1e6)) == 1
+        assert len(catalog.find_sessions(marker="reward")) == 4
+        assert catalog.find_sessions(marker="missing") == []
+        assert catalog.query("SELECT COUNT(*) FROM channels") == [(16,)]
+
+
+def test_catalog_update_is_incremental(session_dir, tmp_path):
+    database = tmp_path / "catalog.sqlite"
+    with Catalog(database) as catalog:
+        catalog.update(session_dir, workers=1)
+
+    os.remove(session_dir / "s4.dh5")
+    create_session(session_dir / "s3.dh5", 10, 12, 1_000)
+    stat = os.stat(session_dir / "s3.dh5")
+    os.utime(session_dir / "s3.dh5", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    with Catalog(database) as catalog:
+        stats = catalog.update(session_dir, workers=1)
+        assert (stats.indexed, stats.unchanged, stats.removed) == (1, 2, 1)
+        assert catalog.query("SELECT COUNT(*) FROM files") == [(3,)]
+        assert catalog.query("SELECT COUNT(*) FROM trials") == [(6,)]
+        assert catalog.find_sessions(stim_no=12, outcome=0, min_trials=200) == [
+            str((session_dir / "monkey_a" / "s1.dh5").resolve())
+        ]
+
+
+def test_catalog_skips_broken_files(session_dir, tmp_path):
+    (session_dir / "broken.dh5").write_bytes(b"not an hdf5 file")
+    with Catalog() as catalog:
+        stats = catalog.update(session_dir, workers=1)
+        assert stats.indexed == 4
+        assert stats.failed == 1
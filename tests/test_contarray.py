@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+import dh5io.cont as cont
+from dh5io.create import create_dh_file
+from dh5io.dh5file import DH5File
+from dh5io.errors import DH5Warning
+from dhspec.cont import CHANNELS_DTYPE
+
+
+@pytest.fixture
+def filename(tmp_path):
+    # two regions of 50 and 30 samples at 1 ms, the second one starting at 1 s
+    filename = tmp_path / "test.dh5"
+    data = np.arange(80 * 4, dtype=np.int16).reshape(80, 4)
+    index = cont.create_empty_index_array(2)
+    index["offset"] = [0, 50]
+    index["time"] = [0, 1_000_000_000]
+    with create_dh_file(filename, boards=["board"]) as dh5file:
+        cont.create_cont_group_from_data_in_file(
+            dh5file.file,
+            1,
+            data=data,
+            index=index,
+            sample_period_ns=np.int32(1_000_000),
+            calibration=np.array([1.0, 2.0, 3.0, 4.0]),
+            channels=np.zeros(4, dtype=CHANNELS_DTYPE),
+        )
+    return filename
+
+
+def test_shape_and_indexing(filename):
+    with DH5File(filename) as dh5file:
+        expected = dh5file.get_cont_data_by_id(1)
+        array = dh5file.cont[1]
+        assert list(dh5file.cont) == [1]
+        assert array.shape == (80, 4)
+        assert array.dtype == np.int16
+        assert len(array) == 80
+        assert dh5file.cont[1] is array
+
+        np.testing.assert_array_equal(array[10:20], expected[10:20])
+        np.testing.assert_array_equal(array[10:20, 2], expected[10:20, 2])
+        np.testing.assert_array_equal(array[5, [3, 0]], expected[5, [3, 0]])
+        np.testing.assert_array_equal(array[::7, 1::2], expected[::7, 1::2])
+        np.testing.assert_array_equal(array[[30, 2, 30], -1], expected[[30, 2, 30], -1])
+        np.testing.assert_array_equal(array[..., 1], expected[:, 1])
+        np.testing.assert_array_equal(np.asarray(array), expected)
+        with pytest.raises(IndexError):
+            array[0, 4]
+        with pytest.raises(KeyError):
+            dh5file.cont[2]
+
+
+def test_calibrated(filename):
+    with DH5File(filename) as dh5file:
+        expected = dh5file.get_calibrated_cont_data_by_id(1)
+        calibrated = dh5file.cont[1].calibrated
+        assert calibrated.dtype == np.float64
+        np.testing.assert_array_equal(calibrated[:, [1, 3]], expected[:, [1, 3]])
+        np.testing.assert_array_equal(calibrated[3], expected[3])
+
+        # missing Calibration attribute
+        calibrated.calibration = None
+        with pytest.warns(DH5Warning):
+            np.testing.assert_array_equal(calibrated[0], expected[0] / [1, 2, 3, 4])
+
+
+def test_time_slicing(filename):
+    with DH5File(filename) as dh5file:
+        array = dh5file.cont[1]
+        expected = dh5file.get_cont_data_by_id(1)
+        # seconds
+        np.testing.assert_array_equal(array.time[0.010:0.020], expected[10:20])
+        # across the gap: last 5 samples of the first region and 3 of the second
+        np.testing.assert_array_equal(array.time[0.045:1.003, 0], expected[45:53, 0])
+        # nanoseconds, inside the gap
+        assert array.time[500_000_000:900_000_000].shape == (0, 4)
+        np.testing.assert_array_equal(array.time[1_000_000_001:None], expected[51:])
+        assert array.time.samples(None, 0.0105) == slice(0, 11)
+        times = array.times(slice(48, 52))
+        np.testing.assert_array_equal(
+            times, [48_000_000, 49_000_000, 1_000_000_000, 1_001_000_000]
+        )
+
+
+def test_time_range_to_samples():
+    regions = cont.get_regions(
+        np.array([(100, 0), (200, 10)], dtype=cont.create_empty_index_array(0).dtype), 15
+    )
+    assert cont.time_range_to_samples(regions, 10, None, None) == slice(0, 15)
+    assert cont.time_range_to_samples(regions, 10, 105, 150) == slice(1, 5)
+    assert cont.time_range_to_samples(regions, 10, 0, 100) == slice(0, 0)
+    assert cont.time_range_to_samples(regions, 10, 195, 211) == slice(10, 12)
+    assert cont.time_range_to_samples(regions, 10, 300, None) == slice(15, 15)
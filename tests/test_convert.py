@@ -0,0 +1,160 @@
+import json
+import subprocess
+import sys
+import h5py
+import numpy as np
+import pytest
+import dhzio.convert
+from dhspec.intervals import INTERVAL_DATASET_DTYPE
+from dhzio.convert import dh5_to_dhz, dhz_to_dh5
+from dhzio.dhzfile import DHZFolder
+from dhzio.errors import DHZError
+
+
+@pytest.fixture
+def source(session):
+    with h5py.File(session, "a") as file:
+        intervals = file.create_group("Intervals")
+        intervals["INTERVAL"] = INTERVAL_DATASET_DTYPE
+        saccades = intervals.create_dataset("saccade", shape=(2,), dtype=intervals["INTERVAL"])
+        saccades[:] = np.array([(10, 20), (30, 45)], dtype=INTERVAL_DATASET_DTYPE)
+    return session
+
+
+def _contents(filename) -> dict:
+    contents = {}
+
+    def visit(name, obj):
+        attrs = {key: repr(obj.attrs[key]) for key in obj.attrs}
+        data = obj[()].tobytes() if isinstance(obj, h5py.Dataset) else None
+        contents[name] = (type(obj).__name__, attrs, data, getattr(obj, "dtype", None))
+
+    with h5py.File(filename, "r") as file:
+        file.visititems(visit)
+        contents["/"] = {key: repr(file.attrs[key]) for key in file.attrs}
+    return contents
+
+
+def _nbytes(filename) -> int:
+    nbytes = []
+    with h5py.File(filename, "r") as file:
+        file.visititems(
+            lambda name, obj: nbytes.append(obj.nbytes) if isinstance(obj, h5py.Dataset) else None
+        )
+    return sum(nbytes)
+
+
+def test_roundtrip(source, tmp_path):
+    report = dh5_to_dhz(
+        source, tmp_path / "session.dhz", chunk_samples=256, shard_chunks=2, max_memory=2**14
+    )
+    assert report.verified
+    assert report.blocks_copied > report.arrays
+    assert report.bytes_copied == _nbytes(source)
+    assert not (tmp_path / "session.dhz.convert.json").exists()
+
+    with DHZFolder(tmp_path / "session.dhz") as folder:
+        assert folder.get_cont_group_ids() == [1, 2]
+        with h5py.File(source, "r") as file:
+            np.testing.assert_array_equal(folder.get_cont_data_by_id(1), file["CONT1/DATA"])
+        assert folder.get_cont_group_by_id(1)["DATA"].shards == (512, 3)
+
+    report = dhz_to_dh5(tmp_path / "session.dhz", tmp_path / "copy.dh5", max_memory=2**14)
+    assert report.verified
+    assert _contents(tmp_path / "copy.dh5") == _contents(source)
+    with h5py.File(tmp_path / "copy.dh5", "r") as file:
+        assert file["CONT1/INDEX"].id.get_type().committed()
+        assert file["Intervals/saccade"].id.get_type().committed()
+
+    with pytest.raises(FileExistsError):
+        dhz_to_dh5(tmp_path / "session.dhz", tmp_path / "copy.dh5")
+
+
+def test_resume_after_interruption(source, tmp_path, monkeypatch):
+    target = tmp_path / "session.dhz"
+    write = dhzio.convert._ZarrSide.write
+    calls = []
+
+    def failing_write(self, path, rows, data):
+        calls.append(path)
+        if len(calls) == 5:
+            raise KeyboardInterrupt
+        write(self, path, rows, data)
+
+    monkeypatch.setattr(dhzio.convert._ZarrSide, "write", failing_write)
+    with pytest.raises(KeyboardInterrupt):
+        dh5_to_dhz(source, target, chunk_samples=256, max_memory=2**14, max_workers=1)
+    assert (tmp_path / "session.dhz.convert.json").exists()
+
+    monkeypatch.setattr(dhzio.convert._ZarrSide, "write", write)
+    report = dh5_to_dhz(source, target, chunk_samples=256, max_memory=2**14, max_workers=1)
+    assert report.blocks_skipped == 4
+    assert report.verified
+
+    dhz_to_dh5(target, tmp_path / "copy.dh5")
+    assert _contents(tmp_path / "copy.dh5") == _contents(source)
+
+
+# converts argv[3] to argv[4] with `dhzio.convert.<argv[2]>` and kills the process
+# without any cleanup after the target side argv[1] wrote a few blocks
+KILLED_CONVERSION = """
+import os, sys
+import dhzio.convert as convert
+
+side = getattr(convert, sys.argv[1])
+write = side.write
+calls = []
+
+def write_and_kill(self, path, rows, data):
+    write(self, path, rows, data)
+    calls.append(path)
+    if len(calls) == 6:
+        os._exit(1)
+
+side.write = write_and_kill
+convert_function = getattr(convert, sys.argv[2])
+convert_function(sys.argv[3], sys.argv[4], max_memory=2**14, max_workers=1)
+"""
+
+
+@pytest.mark.parametrize("to_dh5", [False, True])
+def test_resume_after_kill(source, tmp_path, to_dh5):
+    if to_dh5:
+        dh5_to_dhz(source, tmp_path / "session.dhz")
+        args = ["_H5Side", "dhz_to_dh5", tmp_path / "session.dhz", tmp_path / "copy.dh5"]
+    else:
+        args = ["_ZarrSide", "dh5_to_dhz", source, tmp_path / "copy.dhz"]
+    killed = subprocess.run([sys.executable, "-c", KILLED_CONVERSION, *map(str, args)])
+    assert killed.returncode == 1
+    progress = json.loads(args[3].with_name(args[3].name + ".convert.json").read_text())
+    assert any(entry["crc"] for entry in progress["arrays"].values())
+
+    convert = dhz_to_dh5 if to_dh5 else dh5_to_dhz
+    report = convert(args[2], args[3], max_memory=2**14, max_workers=1)
+    assert report.verified
+    assert report.blocks_skipped > 0
+    if not to_dh5:
+        dhz_to_dh5(args[3], tmp_path / "copy.dh5")
+    assert _contents(tmp_path / "copy.dh5") == _contents(source)
+
+
+def test_verify_detects_corruption(source, tmp_path, monkeypatch):
+    read = dhzio.convert._ZarrSide.read
+
+    def corrupted_read(self, path, rows):
+        data = read(self, path, rows)
+        return data + 1 if path == "CONT1/DATA" else data
+
+    monkeypatch.setattr(dhzio.convert._ZarrSide, "read", corrupted_read)
+    with pytest.raises(DHZError, match="CONT1/DATA"):
+        dh5_to_dhz(source, tmp_path / "session.dhz")
+
+
+def test_cli(source, tmp_path, capsys):
+    from dh5cli.dh5convert import main
+
+    assert main([str(source), str(tmp_path / "session.dhz"), "--compressor", "zstd"]) == 0
+    assert json.loads(capsys.readouterr().out)["verified"]
+    assert main([str(tmp_path / "session.dhz"), str(tmp_path / "copy.dh5")]) == 0
+    assert _contents(tmp_path / "copy.dh5") == _contents(source)
+    assert main([str(tmp_path / "session.dhz"), str(tmp_path / "copy.dh5")]) == 1
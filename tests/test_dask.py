@@ -0,0 +1,43 @@
+import pickle
+import h5py
+import numpy as np
+import pytest
+from dh5io.dh5file import DH5File
+
+da = pytest.importorskip("dask.array")
+from dh5io.dask import cont_to_dask, default_chunks  # noqa: E402
+
+
+def test_cont_to_dask(session):
+    data, times = cont_to_dask(session, 1, chunks=700, return_times=True)
+    assert data.shape == (3000, 3)
+    assert data.dtype == np.float64
+    assert data.chunks[0] == (700,) * 4 + (200,)
+    assert times.chunks[0] == data.chunks[0]
+
+    with DH5File(session) as dh5file:
+        expected = dh5file.get_calibrated_cont_data_by_id(1)
+        np.testing.assert_allclose(data.compute(), expected)
+        np.testing.assert_array_equal(times.compute(), dh5file.cont[1].times())
+
+    raw = cont_to_dask(session, 1, calibrated=False)
+    assert raw.dtype == np.int16
+    # graph holds no h5py handles
+    restored = pickle.loads(pickle.dumps(raw))
+    np.testing.assert_array_equal(
+        restored[100:200].compute(scheduler="synchronous"), (expected[100:200] / 1e-6).round()
+    )
+
+
+def test_file_can_be_written_after_compute(session):
+    data = cont_to_dask(session, 1)
+    data.sum().compute()
+    # no read-only handle is left open
+    with h5py.File(session, "a") as file:
+        file["CONT1/DATA"][0] = 0
+
+
+def test_default_chunks():
+    assert default_chunks((10**8, 16), np.int16, None, chunk_bytes=32 * 1000) == (1000, 16)
+    assert default_chunks((10**8, 16), np.int16, (300, 16), chunk_bytes=32 * 1000) == (900, 16)
+    assert default_chunks((10, 16), np.int16, None) == (10, 16)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from dh5io.dh5file import DH5File
+from dh5io.errors import DH5Error, DH5Warning
+
+mne = pytest.importorskip("mne")
+from dh5io.dh5mne import (  # noqa: E402
+    GAP_DESCRIPTION,
+    RawDH5,
+    events_from_dh5,
+    read_epochs_dh5,
+    read_raw_dh5,
+)
+
+
+def test_raw_is_lazy_with_gaps(session):
+    raw = read_raw_dh5(session, cont_ids=[1, 2])
+    assert isinstance(raw, RawDH5)
+    assert not raw.preload
+    assert raw.info["sfreq"] == 1000.0
+    assert raw.ch_names[:4] == ["CONT1/0", "CONT1/1", "CONT1/2", "CONT2/0"]
+
+    with DH5File(session) as dh5file:
+        lfp = dh5file.cont[1]
+        regions = lfp.regions
+        expected = lfp.calibrated[:]
+    assert raw.first_samp == regions["time"][0] // 1_000_000
+    # three regions of one second with two gaps of half a second
+    assert raw.n_times == 3000 + 2 * 500
+
+    gaps = raw.annotations[raw.annotations.description == GAP_DESCRIPTION]
+    assert len(gaps) == 2
+    np.testing.assert_allclose(gaps.duration, 0.5)
+    np.testing.assert_allclose(gaps.onset - raw.first_time, [1.0, 2.5])
+
+    data = raw.get_data(picks=["CONT1/2", "CONT1/0"], start=900, stop=1600)
+    np.testing.assert_allclose(data[:, :100], expected[900:1000, [2, 0]].T)
+    np.testing.assert_array_equal(data[:, 100:600], 0)
+    np.testing.assert_allclose(data[:, 600:], expected[1000:1100, [2, 0]].T)
+
+    loaded = read_raw_dh5(session, cont_ids=[1], preload=True)
+    np.testing.assert_allclose(loaded.get_data()[:, :1000], expected[:1000].T)
+
+
+def test_epochs(session):
+    raw = read_raw_dh5(session, cont_ids=[1])
+    events, event_id = events_from_dh5(raw, marker="stimulus")
+    assert len(events) == 3
+    lazy = mne.Epochs(raw, events, event_id, tmin=-0.1, tmax=0.2, baseline=None, preload=True)
+
+    epochs = read_epochs_dh5(session, cont_ids=[1], marker="stimulus", tmin=-0.1, tmax=0.2)
+    assert epochs.get_data().shape == (3, 3, 301)
+    np.testing.assert_array_equal(epochs.events, lazy.events)
+    np.testing.assert_allclose(epochs.get_data(), lazy.get_data())
+
+    # tiny batches read one window at a time
+    batched = read_epochs_dh5(
+        session, cont_ids=[1], marker="stimulus", tmin=-0.1, tmax=0.2, batch_bytes=1
+    )
+    np.testing.assert_allclose(batched.get_data(), epochs.get_data())
+
+    trials = read_epochs_dh5(session, tmin=0.0, tmax=0.5)
+    assert len(trials) == 3
+    assert all(name.startswith("stim/") for name in trials.event_id)
+
+    with pytest.warns(DH5Warning, match="Dropping 3 of 3"), pytest.raises(DH5Error):
+        read_epochs_dh5(session, marker="stimulus", tmin=-1.0, tmax=0.0)
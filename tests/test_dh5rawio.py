@@ -0,0 +1,161 @@
+import numpy as np
+import pytest
+from dh5io.dh5file import DH5File
+from dh5io.iostats import measure_io
+
+pytest.importorskip("neo")
+from dh5neo import DH5RawIO, dh5rawio  # noqa: E402
+
+
+def test_parse_header(session):
+    reader = DH5RawIO(session)
+    reader.parse_header()
+    assert reader.block_count() == 1
+    assert reader.segment_count(0) == 3
+    assert reader.signal_streams_count() == 2
+    assert reader.signal_channels_count(0) == 3
+
+    with DH5File(session) as dh5file:
+        trialmap = dh5file.get_trialmap()
+        regions = dh5file.cont[1].regions
+    for seg_index in range(3):
+        assert reader.segment_t_start(0, seg_index) == trialmap["StartTime"][seg_index] / 1e9
+        assert reader.segment_t_stop(0, seg_index) == trialmap["EndTime"][seg_index] / 1e9
+        assert reader.get_signal_size(0, seg_index, 0) == 1000
+        assert reader.get_signal_t_start(0, seg_index, 0) == regions["time"][seg_index] / 1e9
+
+
+def test_get_analogsignal_chunk(session):
+    reader = DH5RawIO(session)
+    reader.parse_header()
+    with DH5File(session) as dh5file:
+        data = dh5file.get_cont_data_by_id(2)
+
+    chunk = reader.get_analogsignal_chunk(
+        seg_index=1, i_start=10, i_stop=110, stream_index=1, channel_indexes=[2, 0]
+    )
+    np.testing.assert_array_equal(chunk, data[1010:1110][:, [2, 0]])
+    chunk = reader.get_analogsignal_chunk(seg_index=2, stream_index=1)
+    np.testing.assert_array_equal(chunk, data[2000:3000])
+
+    scaled = reader.rescale_signal_raw_to_float(chunk, stream_index=1)
+    with DH5File(session) as dh5file:
+        expected = dh5file.get_calibrated_cont_data_by_id(2)[2000:3000]
+    np.testing.assert_allclose(scaled, expected, rtol=1e-6)
+
+    with pytest.raises(IndexError):
+        reader.get_analogsignal_chunk(seg_index=0, i_start=0, i_stop=1001, stream_index=0)
+
+
+@pytest.mark.parametrize(
+    "session_config", [{"n_cont": 1, "n_regions": 2, "region_duration_s": 10.0}], indirect=True
+)
+def test_without_trialmap(session):
+    with DH5File(session, "r+") as dh5file:
+        del dh5file.file["TRIALMAP"]
+
+    reader = DH5RawIO(session)
+    reader.parse_header()
+    assert reader.segment_count(0) == 1
+    n_samples = reader.get_signal_size(0, 0, 0)
+    assert n_samples == 2 * 10_000
+    assert reader.segment_t_stop(0, 0) > reader.segment_t_start(0, 0)
+
+
+def test_spikes(session):
+    reader = DH5RawIO(session)
+    reader.parse_header()
+    with DH5File(session) as dh5file:
+        times = dh5file.file["SPIKE0/INDEX"][()]
+        clusters = dh5file.file["SPIKE0/CLUSTER_INFO"][()]
+        waveforms = dh5file.file["SPIKE0/DATA"][()].reshape(len(times), 32, -1)
+        trialmap = dh5file.get_trialmap()
+
+    assert reader.spike_channels_count() == len(np.unique(clusters))
+    channel = 1
+    cluster = int(reader.header["spike_channels"]["name"][channel].split("/")[1])
+    seg_index = 2
+    in_trial = (times >= trialmap["StartTime"][seg_index]) & (
+        times < trialmap["EndTime"][seg_index]
+    )
+    selected = np.flatnonzero(in_trial & (clusters == cluster))
+
+    assert reader.spike_count(0, seg_index, channel) == len(selected)
+    timestamps = reader.get_spike_timestamps(0, seg_index, channel)
+    np.testing.assert_array_equal(timestamps, times[selected])
+    np.testing.assert_allclose(reader.rescale_spike_timestamp(timestamps), times[selected] / 1e9)
+    np.testing.assert_array_equal(
+        reader.get_spike_raw_waveforms(0, seg_index, channel),
+        waveforms[selected].transpose(0, 2, 1),
+    )
+
+    t_start, t_stop = times[selected[1]] / 1e9, times[selected[-2]] / 1e9
+    assert len(reader.get_spike_timestamps(0, seg_index, channel, t_start, t_stop)) == (
+        len(selected) - 2
+    )
+    empty = reader.get_spike_raw_waveforms(0, seg_index, channel, 0.0, 0.0)
+    assert empty.shape == (0, waveforms.shape[2], 32)
+
+
+def test_spike_waveforms_read_only_the_unit(session, monkeypatch):
+    reader = DH5RawIO(session)
+    reader.parse_header()
+    with DH5File(session) as dh5file:
+        times = dh5file.file["SPIKE0/INDEX"][()]
+        clusters = dh5file.file["SPIKE0/CLUSTER_INFO"][()]
+        waveforms = dh5file.file["SPIKE0/DATA"][()].reshape(len(times), 32, -1)
+        trialmap = dh5file.get_trialmap()
+    channel = 1
+    cluster = int(reader.header["spike_channels"]["name"][channel].split("/")[1])
+    seg_index = 2
+    in_trial = (times >= trialmap["StartTime"][seg_index]) & (
+        times < trialmap["EndTime"][seg_index]
+    )
+    selected = np.flatnonzero(in_trial & (clusters == cluster))
+    assert len(selected) > 2
+
+    # at most two waveforms per read
+    monkeypatch.setattr(dh5rawio, "WAVEFORM_BATCH_BYTES", 2 * waveforms[0].nbytes)
+    with measure_io(log_level=None) as stats:
+        result = reader.get_spike_raw_waveforms(0, seg_index, channel)
+    np.testing.assert_array_equal(result, waveforms[selected].transpose(0, 2, 1))
+    data_stats = stats.datasets[f"{session}:/SPIKE0/DATA"]
+    assert data_stats.bytes_requested == len(selected) * waveforms[0].nbytes
+    assert data_stats.read_calls >= len(selected) / 2
+
+
+def test_events_and_epochs(session):
+    reader = DH5RawIO(session)
+    reader.parse_header()
+    with DH5File(session) as dh5file:
+        events = dh5file.get_events_array()
+        trialmap = dh5file.get_trialmap()
+
+    assert list(reader.header["event_channels"]["type"]) == [b"epoch", b"event"]
+    timestamps, durations, labels = reader.get_event_timestamps(0, 1, 0)
+    np.testing.assert_array_equal(timestamps, trialmap["StartTime"][[1]])
+    np.testing.assert_array_equal(
+        reader.rescale_epoch_duration(durations, "float64", 0),
+        (trialmap["EndTime"][[1]] - trialmap["StartTime"][[1]]) / 1e9,
+    )
+    assert list(labels) == [str(trialmap["TrialNo"][1])]
+
+    in_trial = (events["time"] >= trialmap["StartTime"][1]) & (
+        events["time"] < trialmap["EndTime"][1]
+    )
+    assert reader.event_count(0, 1, 1) == in_trial.sum()
+    timestamps, durations, labels = reader.get_event_timestamps(0, 1, 1)
+    assert durations is None
+    np.testing.assert_array_equal(timestamps, events["time"][in_trial])
+    np.testing.assert_array_equal(labels, events["event"][in_trial].astype(str))
+
+
+def test_read_block(session):
+    from dh5neo import DH5IO
+
+    block = DH5IO(session).read_block()
+    assert len(block.segments) == 3
+    segment = block.segments[0]
+    assert len(segment.analogsignals) == 2
+    assert len(segment.spiketrains) == len(block.segments[1].spiketrains) > 0
+    assert len(segment.epochs) == 1 and len(segment.events) == 1
@@ -0,0 +1,87 @@
+import json
+import pathlib
+import numpy as np
+import pytest
+import dh5cli.dh5validate
+import dh5io.cont as cont
+from dh5cli.dh5validate import is_cached, load_cache, main
+from dh5io.create import create_dh_file
+from dhspec.cont import CHANNELS_DTYPE
+
+
+@pytest.fixture
+def session_dir(tmp_path):
+    root = tmp_path / "sessions"
+    (root / "day1").mkdir(parents=True)
+    for filename in [root / "day1" / "a.dh5", root / "b.dh5"]:
+        with create_dh_file(filename, boards=["board"]) as dh5file:
+            cont.create_empty_cont_group_in_file(
+                dh5file.file,
+                1,
+                nSamples=10,
+                nChannels=2,
+                sample_period_ns=1000,
+                calibration=np.ones(2),
+                channels=np.zeros(2, dtype=CHANNELS_DTYPE),
+            )
+    (root / "broken.dh5").write_bytes(b"not an hdf5 file")
+    return root
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_validate_directory(session_dir, tmp_path, workers):
+    report_file = tmp_path / "report.ndjson"
+    exit_code = main([str(session_dir), "--workers", workers, "-o", str(report_file)])
+    assert exit_code == 1
+
+    results = {
+        r["path"].split("/")[-1]: r
+        for r in map(json.loads, report_file.read_text().splitlines())
+    }
+    assert set(results) == {"a.dh5", "b.dh5", "broken.dh5"}
+    assert results["a.dh5"]["ok"] and results["b.dh5"]["ok"]
+    assert not results["broken.dh5"]["ok"]
+    assert all(c["duration_s"] >= 0 for c in results["a.dh5"]["checks"])
+
+
+def test_validate_uses_results_cache(session_dir, tmp_path):
+    cache_file = tmp_path / "cache.json"
+    report_file = tmp_path / "report.json"
+    args = [str(session_dir / "day1"), "--workers", "1", "--cache", str(cache_file)]
+    assert main(args + ["--format", "json", "-o", str(report_file)]) == 0
+    report = json.loads(report_file.read_text())
+    assert report["n_files"] == 1
+    assert report["files"][0]["cached"] is False
+
+    assert main(args + ["--format", "json", "-o", str(report_file)]) == 0
+    assert json.loads(report_file.read_text())["files"][0]["cached"] is True
+
+    # a different level is not taken from the cache
+    main(args + ["--level", "deep", "--format", "json", "-o", str(report_file)])
+    assert json.loads(report_file.read_text())["files"][0]["cached"] is False
+
+
+def test_interrupted_run_keeps_results(session_dir, tmp_path, monkeypatch):
+    cache_file = tmp_path / "cache.json"
+    validate_file = dh5cli.dh5validate.validate_file
+    calls = []
+
+    def interrupted_validate_file(path, level):
+        calls.append(path)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        return validate_file(path, level)
+
+    monkeypatch.setattr(dh5cli.dh5validate, "CACHE_SAVE_INTERVAL_S", 0.0)
+    monkeypatch.setattr(dh5cli.dh5validate, "validate_file", interrupted_validate_file)
+    args = [str(session_dir), "--workers", "1", "--cache", str(cache_file)]
+    with pytest.raises(KeyboardInterrupt):
+        main(args + ["-o", str(tmp_path / "report.ndjson")])
+    assert list(load_cache(cache_file)) == calls[:1]
+
+    # files removed after the scan are not taken from the cache
+    path = pathlib.Path(calls[0])
+    cached = load_cache(cache_file)[calls[0]]
+    assert is_cached(cached, path, "standard")
+    path.unlink()
+    assert not is_cached(cached, path, "standard")
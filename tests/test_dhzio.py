@@ -1,23 +1,201 @@
-from unittest import skip
-import dhzio
-import dhzio.cont
-import zarr
+import asyncio
 import numpy as np
 import pytest
+import zarr
+import dhzio.cont
 import dhzio.dhzfile
+from dhspec.cont import CHANNELS_DTYPE, create_empty_index_array
+from dhzio.errors import DHZError, DHZWarning
 
 
-@pytest.mark.skip(reason="This test is not implemented yet")
-def test_dhzio(tmp_path):
-    folder = tmp_path / "test.dhz"
+def _channels(n: int) -> np.ndarray:
+    channels = np.zeros(n, dtype=CHANNELS_DTYPE)
+    channels["GlobalChanNumber"] = np.arange(n)
+    channels["MaxVoltageRange"] = 5.0
+    return channels
+
+
+def test_create_empty_cont_group(tmp_path):
+    with dhzio.dhzfile.DHZFolder(tmp_path / "test.dhz") as dhzfile:
+        cont_group = dhzio.cont.create_empty_cont_group(
+            dhzfile.root,
+            cont_group_id=10,
+            nSamples=1000,
+            nChannels=32,
+            sample_period_ns=1000,
+        )
+        assert cont_group["DATA"].shape == (1000, 32)
+        assert cont_group["DATA"].dtype == np.int16
+        # written through the root, not by the folder
+        dhzfile.consolidate()
+        assert dhzfile.get_cont_index_by_id(10).dtype.names == ("time", "offset")
+        assert dhzfile.get_cont_group_ids() == [10]
+        with pytest.raises(DHZError, match="already exists"):
+            dhzio.cont.create_empty_cont_group(dhzfile.root, 10, 10, 1, 1000)
+
+
+def test_cont_roundtrip(tmp_path):
+    rng = np.random.default_rng(0)
+    data = rng.integers(-1000, 1000, size=(5000, 6), dtype=np.int16)
+    index = create_empty_index_array(2)
+    index["time"] = [1_000_000, 10_000_000_000]
+    index["offset"] = [0, 3000]
+    calibration = np.linspace(1e-6, 2e-6, 6)
+
+    with dhzio.dhzfile.DHZFolder(tmp_path / "test.dhz") as dhzfile:
+        dhzfile.create_cont_group_from_data(
+            2,
+            data,
+            index,
+            sample_period_ns=1_000_000,
+            calibration=calibration,
+            channels=_channels(6),
+            chunks=(256, 6),
+            shards=(1024, 6),
+            compressors=zarr.codecs.ZstdCodec(level=3),
+        )
+        dhzfile.create_cont_group_from_data(1, data[:10], index[:1], sample_period_ns=1000)
+
+    with dhzio.dhzfile.DHZFolder(tmp_path / "test.dhz") as dhzfile:
+        assert dhzfile.get_cont_group_ids() == [1, 2]
+        dataset = dhzfile.get_cont_group_by_id(2)["DATA"]
+        assert dataset.chunks == (256, 6)
+        assert dataset.shards == (1024, 6)
+
+        np.testing.assert_array_equal(dhzfile.get_cont_data_by_id(2), data)
+        np.testing.assert_array_equal(dhzfile.get_cont_index_by_id(2), index)
+        np.testing.assert_allclose(dhzfile.get_calibrated_cont_data_by_id(2), data * calibration)
+        attrs = dhzfile.get_cont_attrs_by_id(2)
+        assert attrs["SamplePeriod"] == 1_000_000
+        assert attrs["Name"] == "CONT2"
+        np.testing.assert_array_equal(attrs["Channels"], _channels(6))
+        assert attrs["Channels"].dtype == CHANNELS_DTYPE
+
+        regions = dhzfile.get_cont_regions_by_id(2)
+        assert list(regions["stop"]) == [3000, 5000]
+
+        with pytest.warns(DHZWarning):
+            dhzfile.get_calibrated_cont_data_by_id(1)
+        with pytest.warns(DHZWarning, match="Channels"):
+            dhzfile.validate()
 
-    dhzfile = dhzio.dhzfile.DHZFolder(folder)
 
-    # create a new CONT group
-    cont_group = dhzio.cont.create_empty_cont_group(
-        dhzfile.root,
-        cont_group_id=10,
-        nSamples=1000,
-        nChannels=32,
-        sample_period_ns=1000,
+def test_read_cont_data(tmp_path):
+    rng = np.random.default_rng(1)
+    data = rng.integers(-1000, 1000, size=(10_000, 8), dtype=np.int16)
+    index = create_empty_index_array(1)
+    with dhzio.dhzfile.DHZFolder(tmp_path / "test.dhz") as dhzfile:
+        dhzfile.create_cont_group_from_data(
+            1,
+            data,
+            index,
+            sample_period_ns=1000,
+            calibration=np.full(8, 0.5),
+            chunks=(300, 8),
+        )
+        read = dhzfile.read_cont_data(1, slice(150, 9_100), channels=[5, 1], max_workers=4)
+        np.testing.assert_array_equal(read, data[150:9100][:, [5, 1]])
+        read = dhzfile.read_cont_data(1, slice(0, 10), channels=3, calibrated=True)
+        np.testing.assert_array_equal(read, data[:10, 3] * 0.5)
+        np.testing.assert_array_equal(dhzfile.read_cont_data(1), data)
+        assert dhzfile.read_cont_data(1, slice(20, 10)).shape == (0, 8)
+
+
+def test_validate_cont_index(tmp_path):
+    index = create_empty_index_array(2)
+    index["offset"] = [0, 5]
+    index["time"] = [0, 1]  # second region starts before the first ends
+    with dhzio.dhzfile.DHZFolder(tmp_path / "test.dhz") as dhzfile:
+        dhzfile.create_cont_group_from_data(
+            1,
+            np.zeros((10, 1), dtype=np.int16),
+            index,
+            sample_period_ns=1000,
+            calibration=np.ones(1),
+            channels=_channels(1),
+        )
+        with pytest.raises(DHZError, match="start before"):
+            dhzfile.validate()
+
+
+def test_async_read_cont(tmp_path):
+    rng = np.random.default_rng(1)
+    data = rng.integers(-1000, 1000, size=(3000, 4), dtype=np.int16)
+    index = create_empty_index_array(2)
+    index["time"] = [0, 2_000_000]  # 1 ms gap between the regions
+    index["offset"] = [0, 1000]
+
+    async def read(dhzfile):
+        window = await dhzfile.read_cont(1, 500_000, 2_500_000, channels=[2, 0])
+        calibrated = await dhzfile.read_cont(1, 0.0, 0.0005, channels=1, calibrated=True)
+        blocks = [
+            block
+            async for block in dhzfile.iter_cont(
+                1, t_start=100_000, block_samples=256, max_concurrency=2
+            )
+        ]
+        return window, calibrated, blocks
+
+    with dhzio.dhzfile.DHZFolder(tmp_path / "test.dhz") as dhzfile:
+        dhzfile.create_cont_group_from_data(
+            1, data, index, sample_period_ns=1000, calibration=np.full(4, 0.5), chunks=(100, 4)
+        )
+        window, calibrated, blocks = asyncio.run(read(dhzfile))
+        with pytest.raises(DHZError, match="CONT7"):
+            asyncio.run(dhzfile.read_cont(7))
+
+    # samples 500-999 of the first region and 0-499 of the second
+    np.testing.assert_array_equal(window, data[500:1500][:, [2, 0]])
+    np.testing.assert_array_equal(calibrated, data[:500, 1] * 0.5)
+    assert blocks[0].samples == slice(100, 256)
+    assert all(len(block.data) <= 256 for block in blocks)
+    np.testing.assert_array_equal(np.concatenate([b.data for b in blocks]), data[100:])
+    times = np.concatenate([b.times for b in blocks])
+    assert times[0] == 100_000 and times[900] == 2_000_000
+
+
+def test_consolidated_metadata(tmp_path, monkeypatch):
+    folder = tmp_path / "test.dhz"
+    data = np.arange(200, dtype=np.int16).reshape(100, 2)
+    with dhzio.dhzfile.DHZFolder(folder, mode="w") as dhzfile:
+        dhzfile.create_cont_group_from_data(
+            1, data, create_empty_index_array(1), sample_period_ns=1000
+        )
+        assert dhzfile.get_cont_group_ids() == [1]
+        dhzio.cont.create_empty_cont_group(dhzfile.root, 2, 10, 2, 1000)
+        dhzfile.consolidate()
+        dhzfile.create_empty_cont_group(3, 10, 2, 1000)
+        assert dhzfile.get_cont_group_ids() == [1, 2, 3]
+
+    # reading does not rewrite the metadata, also not in a writable folder
+    consolidations = []
+    monkeypatch.setattr(
+        dhzio.dhzfile,
+        "consolidate_metadata",
+        lambda store: consolidations.append(store) or zarr.open_group(store, mode="r"),
     )
+    with dhzio.dhzfile.DHZFolder(folder) as dhzfile:
+        for _ in range(5):
+            assert "CONT1" in dhzfile.root
+            assert dhzfile.get_cont_group_ids() == [1, 2, 3]
+    assert consolidations == []
+    monkeypatch.undo()
+
+    # listing and opening arrays only needs the consolidated metadata of the root
+    (folder / "CONT1" / "zarr.json").unlink()
+    (folder / "CONT1" / "DATA" / "zarr.json").unlink()
+    with dhzio.dhzfile.DHZFolder(folder, mode="r") as dhzfile:
+        assert dhzfile.get_cont_group_ids() == [1, 2, 3]
+        np.testing.assert_array_equal(dhzfile.read_cont_data(1, slice(10, 20)), data[10:20])
+
+    # folders without consolidated metadata are consolidated when opened for writing
+    legacy = zarr.open_group(tmp_path / "legacy.dhz", mode="w")
+    legacy.create_group("CONT4")
+    with dhzio.dhzfile.DHZFolder(tmp_path / "legacy.dhz", mode="r") as dhzfile:
+        assert dhzfile.get_cont_group_ids() == [4]
+    dhzio.dhzfile.DHZFolder(tmp_path / "legacy.dhz").close()
+    root = zarr.open_group(tmp_path / "legacy.dhz", mode="r")
+    assert "CONT4" in root.metadata.consolidated_metadata.metadata
+
+    with pytest.raises(ValueError, match="Invalid mode"):
+        dhzio.dhzfile.DHZFolder(folder, mode="x")
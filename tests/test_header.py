@@ -0,0 +1,122 @@
+import datetime
+import json
+import os
+import h5py
+import numpy as np
+import pytest
+import dh5io.cont as cont
+from dh5io.create import create_dh_file
+from dh5io.header import (
+    FileHeader,
+    load_header,
+    read_header,
+    read_sidecar,
+    sidecar_path,
+)
+from dh5io.markers import add_marker_to_file
+from dh5io.operations import add_operation_to_file
+from dh5io.trialmap import add_trialmap_to_file
+from dhspec.trialmap import TRIALMAP_DATASET_DTYPE
+
+
+@pytest.fixture
+def dh5_filename(tmp_path):
+    filename = tmp_path / "test.dh5"
+    with create_dh_file(filename, boards=["board1"]) as dh5file:
+        index = cont.create_empty_index_array(2)
+        index[0] = (1000, 0)
+        index[1] = (100_000, 60)
+        cont.create_cont_group_from_data_in_file(
+            dh5file.file,
+            5,
+            data=np.zeros((100, 2), dtype=np.int16),
+            index=index,
+            sample_period_ns=1000,
+            calibration=np.array([0.5, 2.0]),
+            signal_type=cont.ContSignalType.LFP,
+        )
+        trialmap = np.rec.array(
+            [(1, 12, 0, 0, 10), (2, 12, 0, 20, 30), (3, 12, 1, 40, 50), (4, 3, 0, 60, 70)],
+            dtype=TRIALMAP_DATASET_DTYPE,
+        )
+        add_trialmap_to_file(dh5file.file, trialmap)
+        add_marker_to_file(dh5file.file, "reward", np.array([5, 25], dtype=np.int64))
+        add_operation_to_file(
+            dh5file.file, "filter", tool="test", date=datetime.datetime(2024, 2, 3, 4, 5, 6)
+        )
+    return filename
+
+
+def test_read_header(dh5_filename):
+    header = load_header(dh5_filename, use_sidecar=False)
+    assert header.version == 2
+    assert header.boards == ["board1"]
+    assert len(header.conts) == 1
+    cont_header = header.conts[0]
+    assert cont_header.id == 5
+    assert cont_header.signal_type == "LFP"
+    assert (cont_header.n_samples, cont_header.n_channels) == (100, 2)
+    assert cont_header.sample_rate_hz == 1e6
+    assert cont_header.calibration == [0.5, 2.0]
+    assert cont_header.n_regions == 2
+    assert cont_header.start_time_ns == 1000
+    assert cont_header.end_time_ns == 100_000 + 40 * 1000
+    assert header.n_trials == 4
+    assert {(t.stim_no, t.outcome): t.count for t in header.trial_counts} == {
+        (3, 0): 1,
+        (12, 0): 2,
+        (12, 1): 1,
+    }
+    assert header.markers == {"reward": 2}
+    assert [op.name for op in header.operations] == ["000_create_file", "001_filter"]
+    assert header.operations[1].date == "2024-02-03T04:05:06"
+    assert not sidecar_path(dh5_filename).exists()
+
+
+def test_scalar_calibration(dh5_filename):
+    with h5py.File(dh5_filename, "r+") as file:
+        file["CONT5"].attrs["Calibration"] = 0.5
+    header = load_header(dh5_filename, use_sidecar=False)
+    assert header.conts[0].calibration == [0.5]
+
+
+def test_header_roundtrip(dh5_filename):
+    header = load_header(dh5_filename, use_sidecar=False)
+    restored = FileHeader.from_dict(json.loads(json.dumps(header.to_dict())))
+    assert restored == header
+
+
+def test_sidecar_is_written_and_reused(dh5_filename):
+    header = load_header(dh5_filename)
+    path = sidecar_path(dh5_filename)
+    assert path.exists()
+    assert read_sidecar(dh5_filename) == header
+
+    # a fresh sidecar is used without opening the file
+    content = json.loads(path.read_text())
+    content["header"]["n_trials"] = 1234
+    path.write_text(json.dumps(content))
+    assert load_header(dh5_filename).n_trials == 1234
+
+    # a modified file invalidates the sidecar
+    stat = os.stat(dh5_filename)
+    os.utime(dh5_filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert read_sidecar(dh5_filename) is None
+    assert load_header(dh5_filename).n_trials == 4
+
+
+def test_sidecar_in_cache_dir(dh5_filename, tmp_path):
+    cache_dir = tmp_path / "cache"
+    load_header(dh5_filename, cache_dir=cache_dir)
+    assert not sidecar_path(dh5_filename).exists()
+    assert sidecar_path(dh5_filename, cache_dir).parent == cache_dir
+    assert read_sidecar(dh5_filename, cache_dir) is not None
+
+
+def test_dh5file_get_header(dh5_filename):
+    from dh5io import DH5File
+
+    with DH5File(dh5_filename) as dh5file:
+        header = dh5file.get_header()
+        assert header is dh5file.get_header()
+        assert header == read_header(dh5file.file)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from dh5io.dh5file import DH5File
+from dh5io.errors import DH5Error
+from dh5io.markers import add_marker_to_file
+
+
+def test_load_into_memory(session):
+    with DH5File(session) as dh5file:
+        expected = dh5file.get_cont_data_by_id(1)
+
+    with DH5File.load_into_memory(session) as dh5file:
+        assert dh5file.file.driver == "core"
+        np.testing.assert_array_equal(dh5file.get_cont_data_by_id(1), expected)
+        assert len(dh5file.get_trialmap()) == 3
+
+
+def test_load_from_bytes(session):
+    with DH5File.load_into_memory(session.read_bytes()) as dh5file:
+        assert dh5file.get_cont_group_ids() == [1, 2]
+        assert "stimulus" in dh5file.get_markers()
+
+    with pytest.raises(DH5Error, match="written back"):
+        DH5File.load_into_memory(session.read_bytes(), write_back=True)
+
+
+def test_write_back(session):
+    with DH5File.load_into_memory(session, write_back=True) as dh5file:
+        add_marker_to_file(dh5file.file, "reward", np.array([5], dtype=np.int64))
+        assert "reward" in dh5file.get_markers()
+
+    with DH5File(session) as dh5file:
+        assert list(dh5file.get_markers()["reward"]) == [5]
@@ -0,0 +1,71 @@
+import logging
+import h5py
+import numpy as np
+import pytest
+import dh5io.iostats as iostats
+from dh5io.cont import get_cont_data_by_id_from_file
+from dh5io.dh5file import DH5File
+from dh5io.errors import DH5Error
+from dh5io.iostats import measure_io
+
+
+def test_dh5file_io_stats(session):
+    with DH5File(session, instrument=True) as dh5file:
+        dh5file.get_cont_data_by_id(1)
+        dh5file.get_trialmap()
+        dh5file.get_markers().window("stimulus", 0, 10**18)
+        stats = dh5file.io_stats()
+        assert stats.read_calls == 3
+        assert stats.bytes_requested >= 3000 * 3 * 2
+        key = f"{session}:/CONT1/DATA"
+        assert stats.datasets[key].bytes_requested == 3000 * 3 * 2
+        # contiguous dataset, everything is read from storage
+        assert stats.datasets[key].bytes_read == 3000 * 3 * 2
+        assert stats.to_dict()["read_calls"] == 3
+
+    with DH5File(session) as dh5file:
+        dh5file.get_cont_data_by_id(1)
+        with pytest.raises(DH5Error, match="instrument=True"):
+            dh5file.io_stats()
+
+
+def test_measure_io(session, caplog):
+    with caplog.at_level(logging.INFO, logger="dh5io.iostats"):
+        with measure_io() as stats:
+            get_cont_data_by_id_from_file(session, 1)
+    assert stats.read_calls == 1
+    assert "1 reads" in caplog.text
+
+    # nothing is recorded outside of the block
+    get_cont_data_by_id_from_file(session, 1)
+    assert stats.read_calls == 1
+
+
+def test_chunk_cache_estimate(tmp_path):
+    filename = tmp_path / "chunked.h5"
+    with h5py.File(filename, "w") as f:
+        data = np.zeros((1000, 4), dtype=np.int16)
+        f.create_dataset("DATA", data=data, chunks=(100, 4), compression="gzip")
+
+    with h5py.File(filename, "r") as f, measure_io(log_level=None) as stats:
+        dataset = f["DATA"]
+        iostats.read(dataset, np.s_[50:250])
+        iostats.read(dataset, np.s_[150:160, 1])
+        iostats.read(dataset, np.s_[[10, 950], ...])
+
+    assert stats.chunk_misses == 3 + 1
+    assert stats.chunk_hits == 1 + 1
+    assert stats.filtered_read_s > 0
+    # compressed zeros take much less space than the chunks in memory
+    assert stats.bytes_read < 4 * 100 * 4 * 2
+
+
+def test_touched_chunks():
+    shape, chunks = (100, 8), (10, 4)
+    assert len(list(iostats._touched_chunks(shape, chunks, ()))) == 10 * 2
+    assert list(iostats._touched_chunks(shape, chunks, np.s_[..., 2])) == [
+        (i, 0) for i in range(10)
+    ]
+    assert list(iostats._touched_chunks(shape, chunks, np.s_[-5:, [1, 5]])) == [(9, 0), (9, 1)]
+    assert list(iostats._touched_chunks(shape, chunks, np.s_[::50, 0])) == [(0, 0), (5, 0)]
+    assert len(list(iostats._touched_chunks(shape, chunks, "time"))) == 20
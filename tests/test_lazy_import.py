@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+
+def run(code: str) -> str:
+    return subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+
+
+def test_import_dh5io_is_lazy():
+    heavy = ("dh5io.", "h5py", "neo", "zarr", "mne", "scipy")
+    out = run(
+        "import sys, dh5io; "
+        f"print(sorted(m for m in sys.modules if m.startswith({heavy})))"
+    )
+    assert out.strip() == "[]"
+
+
+def test_lazy_attributes():
+    out = run(
+        "import dh5io; "
+        "print(dh5io.DH5File.__name__, dh5io.cont.__name__, 'DH5File' in dir(dh5io))"
+    )
+    assert out.split() == ["DH5File", "dh5io.cont", "True"]
+
+
+def test_all_matches_lazy_names():
+    import dh5io
+
+    assert sorted(dh5io.__all__) == sorted(dh5io._LAZY_NAMES)
+    out = run("from dh5io import *; print(DH5File.__name__, measure_io.__name__)")
+    assert out.split() == ["DH5File", "measure_io"]
@@ -5,9 +5,11 @@ from dh5io.errors import DH5Error
 from dhspec.markers import MARKERS_GROUP_NAME, MARKERS_DATASET_DTYPE
 
 from dh5io.markers import (
+    Markers,
     add_marker_to_file,
     get_all_markers,
     get_marker_from_file,
+    get_markers,
     validate_markers,
     validate_marker_dataset,
 )
@@ -48,6 +50,59 @@ def test_add_markers_to_file_invalid_dtype(mock_h5_file):
         )
 
 
+def test_lazy_markers_mapping(mock_h5_file, valid_markers):
+    for name, times in valid_markers.items():
+        add_marker_to_file(mock_h5_file, marker_name=name, timestamps=times)
+
+    markers = get_markers(mock_h5_file)
+    assert isinstance(markers, Markers)
+    assert list(markers) == ["marker1", "marker2"]
+    assert len(markers) == 2
+    assert "marker1" in markers
+    assert "unknown" not in markers
+    assert markers.dataset("marker1") is markers.dataset("marker1")
+    assert np.array_equal(markers["marker1"], valid_markers["marker1"])
+    assert markers["marker1"] is markers["marker1"]
+    with pytest.raises(KeyError):
+        markers["unknown"]
+
+
+def test_lazy_markers_no_group(mock_h5_file):
+    markers = get_markers(mock_h5_file)
+    assert len(markers) == 0
+    times, marker_ids = markers.merged()
+    assert times.size == 0 and marker_ids.size == 0
+
+
+def test_markers_window(mock_h5_file):
+    times = np.arange(0, 100, 10, dtype=np.int64)
+    add_marker_to_file(mock_h5_file, marker_name="m", timestamps=times)
+
+    markers = get_markers(mock_h5_file)
+    assert np.array_equal(markers.window("m", 20, 50), [20, 30, 40])
+    assert np.array_equal(markers.window("m", 25, None), times[3:])
+    assert np.array_equal(markers.window("m", None, 15), [0, 10])
+    assert markers.window("m", 200, 300).size == 0
+    # same result once the full array is cached
+    markers["m"]
+    assert np.array_equal(markers.window("m", 20, 50), [20, 30, 40])
+
+
+def test_markers_merged(mock_h5_file):
+    add_marker_to_file(mock_h5_file, "a", np.array([1, 5, 9], dtype=np.int64))
+    add_marker_to_file(mock_h5_file, "b", np.array([2, 5, 10], dtype=np.int64))
+    add_marker_to_file(mock_h5_file, "c", np.array([0, 20], dtype=np.int64))
+
+    markers = get_markers(mock_h5_file)
+    times, marker_ids = markers.merged(["a", "b", "c"])
+    assert np.array_equal(times, [0, 1, 2, 5, 5, 9, 10, 20])
+    assert np.array_equal(marker_ids, [2, 0, 1, 0, 1, 0, 1, 2])
+
+    times, marker_ids = markers.merged(["b", "a"], t_start=2, t_stop=10)
+    assert np.array_equal(times, [2, 5, 5, 9])
+    assert np.array_equal(marker_ids, [0, 0, 1, 1])
+
+
 # def test_add_markers_to_file_replace(mock_h5_file, valid_markers):
 #     first_markers = {"marker1": np.array([1000000000], dtype=np.int64)}
 #     add_marker_to_file(mock_h5_file, first_markers)
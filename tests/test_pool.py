@@ -0,0 +1,121 @@
+import os
+import h5py
+import pytest
+import dh5io.cont as cont
+from dh5io import DH5File
+from dh5io.create import create_dh_file
+from dh5io.ensure_h5py_file import ensure_h5py_file
+from dh5io.pool import (
+    DEFAULT_POOL_SIZE,
+    FileHandlePool,
+    get_pool,
+    invalidate,
+    set_pool_size,
+)
+
+
+@pytest.fixture
+def dh5_filename(tmp_path):
+    filename = tmp_path / "test.dh5"
+    with create_dh_file(filename) as dh5file:
+        cont.create_empty_cont_group_in_file(
+            dh5file.file, 3, nSamples=10, nChannels=2, sample_period_ns=1000
+        )
+    invalidate()
+    yield filename
+    invalidate()
+
+
+@pytest.fixture
+def enabled_pool():
+    set_pool_size(8)
+    yield get_pool()
+    set_pool_size(DEFAULT_POOL_SIZE)
+
+
+def test_pool_reuses_handles(dh5_filename):
+    pool = FileHandlePool(maxsize=2)
+    f = pool.get(dh5_filename)
+    assert pool.get(dh5_filename) is f
+    assert pool.get(str(dh5_filename)) is f
+    assert len(pool) == 1
+    pool.invalidate(dh5_filename)
+    assert not f.id.valid
+    assert len(pool) == 0
+
+
+def test_pool_evicts_least_recently_used(tmp_path):
+    filenames = []
+    for i in range(3):
+        filenames.append(tmp_path / f"{i}.h5")
+        h5py.File(filenames[-1], "w").close()
+
+    pool = FileHandlePool(maxsize=2)
+    f0 = pool.get(filenames[0])
+    pool.get(filenames[1])
+    pool.get(filenames[0])
+    pool.get(filenames[2])
+    assert len(pool) == 2
+    assert f0.id.valid
+    pool.resize(0)
+    assert len(pool) == 0
+    assert not f0.id.valid
+
+
+def test_pool_reopens_modified_files(dh5_filename):
+    pool = FileHandlePool(maxsize=2)
+    f = pool.get(dh5_filename)
+    stat = os.stat(dh5_filename)
+    os.utime(dh5_filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert pool.get(dh5_filename) is not f
+    assert not f.id.valid
+    pool.invalidate()
+
+
+def test_path_based_calls_use_pool(dh5_filename, enabled_pool):
+    assert cont.enumerate_cont_groups(dh5_filename) == [3]
+    assert len(get_pool()) == 1
+    data = cont.get_cont_data_by_id_from_file(dh5_filename, 3)
+    assert data.shape == (10, 2)
+    assert len(get_pool()) == 1
+
+    # opening for writing closes the pooled handle
+    with DH5File(dh5_filename, "r+") as dh5file:
+        cont.create_empty_cont_group_in_file(
+            dh5file, 4, nSamples=10, nChannels=2, sample_period_ns=1000
+        )
+    assert len(get_pool()) == 0
+    assert cont.enumerate_cont_groups(dh5_filename) == [3, 4]
+
+
+def test_pool_is_disabled_by_default(dh5_filename):
+    assert DEFAULT_POOL_SIZE == 0
+    assert cont.enumerate_cont_groups(dh5_filename) == [3]
+    assert len(get_pool()) == 0
+    # no read-only handle is left open that would block writing
+    with h5py.File(dh5_filename, "a") as file:
+        file.attrs["written"] = 1
+
+
+def test_write_after_pooled_read(dh5_filename, enabled_pool):
+    assert cont.enumerate_cont_groups(dh5_filename) == [3]
+    assert len(enabled_pool) == 1
+    with pytest.raises(OSError):
+        h5py.File(dh5_filename, "a")
+
+    # opening for writing through ensure_h5py_file closes the pooled handle
+    write = ensure_h5py_file(lambda file: file.attrs.create("written", 1), mode="a")
+    write(dh5_filename)
+    assert len(enabled_pool) == 0
+    with h5py.File(dh5_filename, "a") as file:
+        assert file.attrs["written"] == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_pool_is_empty_after_fork(dh5_filename, enabled_pool):
+    get_pool().get(dh5_filename)
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if len(get_pool()) == 0 else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
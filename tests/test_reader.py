@@ -0,0 +1,77 @@
+import dataclasses
+import numpy as np
+import pytest
+from dh5io.errors import DH5Error
+from dh5io.reader import BaseSessionReader, DH5Reader, SessionReader, open_session
+
+pytest.importorskip("zarr")
+from dhzio.convert import dh5_to_dhz  # noqa: E402
+from dhzio.reader import DHZReader  # noqa: E402
+
+
+@pytest.fixture
+def sessions(session):
+    dhz = session.with_suffix(".dhz")
+    dh5_to_dhz(session, dhz, chunk_samples=256)
+    return session, dhz
+
+
+def test_open_session(sessions, tmp_path):
+    dh5, dhz = sessions
+    with open_session(dh5) as h5_reader, open_session(dhz) as zarr_reader:
+        assert isinstance(h5_reader, DH5Reader) and isinstance(zarr_reader, DHZReader)
+        assert isinstance(h5_reader, SessionReader) and isinstance(zarr_reader, SessionReader)
+
+    (tmp_path / "text.dh5").write_text("not a session")
+    with pytest.raises(DH5Error, match="neither"):
+        open_session(tmp_path / "text.dh5")
+
+
+def test_backends_agree(sessions):
+    dh5, dhz = sessions
+    with open_session(dh5) as a, open_session(dhz) as b:
+        header_a, header_b = a.header(), b.header()
+        assert dataclasses.replace(header_a, filename="") == dataclasses.replace(
+            header_b, filename=""
+        )
+        assert header_a.n_trials == 3 and header_a.spikes
+
+        assert a.cont_ids() == b.cont_ids() and a.spike_ids() == b.spike_ids()
+        cont_id, spike_id = a.cont_ids()[0], a.spike_ids()[0]
+        np.testing.assert_array_equal(a.regions(cont_id), b.regions(cont_id))
+        np.testing.assert_array_equal(
+            a.sample_times(cont_id, slice(990, 1010)), b.sample_times(cont_id, slice(990, 1010))
+        )
+
+        t_start, t_stop = a.regions(cont_id)["time"][[0, 1]]
+        window = (0.25, int(t_stop) + 250_000_000)
+        for kwargs in [{}, {"channels": [2, 0]}, {"channels": 1, "calibrated": True}]:
+            np.testing.assert_array_equal(
+                a.read_cont(cont_id, *window, **kwargs), b.read_cont(cont_id, *window, **kwargs)
+            )
+        assert a.read_cont(cont_id, *window).shape[0] == 1000
+
+        spikes_a = a.read_spikes(spike_id, *window, waveforms=True)
+        spikes_b = b.read_spikes(spike_id, *window, waveforms=True)
+        assert len(spikes_a.times) > 0
+        assert np.all((spikes_a.times >= 250_000_000) & (spikes_a.times < window[1]))
+        for field_a, field_b in zip(spikes_a, spikes_b):
+            np.testing.assert_array_equal(field_a, field_b)
+        assert spikes_a.waveforms.shape[:2] == (len(spikes_a.times), 32)
+
+        np.testing.assert_array_equal(a.trialmap(), b.trialmap())
+        np.testing.assert_array_equal(a.events(*window), b.events(*window))
+        assert a.marker_names() == b.marker_names() == sorted(header_a.markers)
+        for name in a.marker_names():
+            np.testing.assert_array_equal(a.marker(name, *window), b.marker(name, *window))
+        with pytest.raises(KeyError):
+            b.marker("missing")
+
+
+def test_incomplete_backend_fails_on_instantiation(tmp_path):
+    class IncompleteReader(BaseSessionReader):
+        def _group_names(self, path=""):
+            return []
+
+    with pytest.raises(TypeError, match="abstract"):
+        IncompleteReader(tmp_path)
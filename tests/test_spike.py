@@ -0,0 +1,36 @@
+import h5py
+import numpy as np
+import pytest
+import dh5io.spike as spike
+from dh5io.create import create_dh_file
+from dh5io.errors import DH5Error
+from dhspec.spike import SpikeParams
+
+
+def test_create_spike_group_with_data(tmp_path):
+    filename = tmp_path / "test.dh5"
+    params = SpikeParams(np.int16(4), np.int16(1), np.int16(2))
+    data = np.arange(3 * 4 * 2, dtype=np.int16).reshape(12, 2)
+    index = np.array([10, 20, 30], dtype=np.int64)
+    with create_dh_file(filename, overwrite=True) as dh5file:
+        spike.create_spike_group_with_data(
+            dh5file.file,
+            None,
+            data,
+            index,
+            params,
+            np.int32(1000),
+            cluster_info=np.array([0, 1, 0], dtype=np.uint8),
+        )
+        assert spike.enumerate_spike_groups(dh5file.file) == [0]
+        with pytest.raises(DH5Error, match="already exists"):
+            spike.create_empty_spike_group_in_file(dh5file.file, 0, 1, 1, params, 1000)
+        with pytest.raises(DH5Error, match="spikeSamples x nSpikes"):
+            spike.create_spike_group_with_data(dh5file.file, 1, data[:-1], index, params, 1000)
+
+    with h5py.File(filename, "r") as f:
+        group = f["SPIKE0"]
+        spike.validate_spike_group(group)
+        np.testing.assert_array_equal(group["DATA"][()], data)
+        np.testing.assert_array_equal(group["CLUSTER_INFO"][()], [0, 1, 0])
+        assert group.attrs["SpikeParams"]["preTrigSamples"] == 1
@@ -0,0 +1,76 @@
+import pickle
+import numpy as np
+import pytest
+from dh5io.dh5file import DH5File
+
+pytest.importorskip("spikeinterface")
+from dh5io.spikeinterface import (  # noqa: E402
+    DH5RecordingExtractor,
+    DH5SortingExtractor,
+    read_dh5_recording,
+    read_dh5_sorting,
+)
+
+
+def test_recording_segments_follow_regions(session):
+    recording = read_dh5_recording(session, cont_id=1)
+    assert isinstance(recording, DH5RecordingExtractor)
+    assert recording.get_num_segments() == 3
+    assert recording.get_sampling_frequency() == 1000.0
+    assert recording.get_num_channels() == 3
+
+    with DH5File(session) as dh5file:
+        lfp = dh5file.cont[1]
+        data = lfp[:]
+        calibrated = lfp.calibrated[0:5]
+        regions = lfp.regions
+    for segment_index, region in enumerate(regions):
+        assert recording.get_num_samples(segment_index) == region["stop"] - region["start"]
+        assert recording.get_times(segment_index)[0] == pytest.approx(region["time"] * 1e-9)
+        channel_ids = recording.channel_ids[[2, 0]]
+        np.testing.assert_array_equal(
+            recording.get_traces(segment_index, 10, 20, channel_ids=channel_ids),
+            data[region["start"] + 10 : region["start"] + 20][:, [2, 0]],
+        )
+
+    scaled = recording.get_traces(0, 0, 5, return_in_uV=True)
+    np.testing.assert_allclose(scaled, calibrated * 1e6, rtol=1e-6)
+
+
+def test_sorting_units_from_cluster_info(session):
+    sorting = read_dh5_sorting(session, spike_id=0, cont_id=1)
+    assert isinstance(sorting, DH5SortingExtractor)
+    assert sorting.get_num_segments() == 3
+    assert sorting.get_sampling_frequency() == 1000.0
+
+    with DH5File(session) as dh5file:
+        times = dh5file.file["SPIKE0/INDEX"][()]
+        clusters = dh5file.file["SPIKE0/CLUSTER_INFO"][()]
+        regions = dh5file.cont[1].regions
+    assert list(sorting.unit_ids) == list(np.unique(clusters))
+    assert sum(
+        len(sorting.get_unit_spike_train(unit, segment_index=s))
+        for unit in sorting.unit_ids
+        for s in range(3)
+    ) == len(times)
+
+    unit = sorting.unit_ids[0]
+    expected = np.sort(times[clusters == unit])
+    expected = expected[(expected >= regions["time"][1]) & (expected < regions["time"][2])]
+    train = sorting.get_unit_spike_train(unit, segment_index=1)
+    np.testing.assert_array_equal(train, (expected - regions["time"][1]) // 1_000_000)
+    assert np.all(sorting.get_unit_spike_train(unit, 1, start_frame=100, end_frame=200) >= 100)
+
+    single = DH5SortingExtractor(session, spike_id=0)
+    assert single.get_num_segments() == 1
+
+
+def test_extractors_are_picklable(session):
+    recording = DH5RecordingExtractor(session, 1)
+    sorting = DH5SortingExtractor(session, 0, cont_id=1)
+    for extractor in (recording, sorting):
+        assert extractor.check_serializability("pickle")
+    restored = pickle.loads(pickle.dumps(recording))
+    np.testing.assert_array_equal(restored.get_traces(1), recording.get_traces(1))
+    restored = pickle.loads(pickle.dumps(sorting))
+    assert restored.count_num_spikes_per_unit() == sorting.count_num_spikes_per_unit()
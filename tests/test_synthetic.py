@@ -0,0 +1,40 @@
+import numpy as np
+from dh5io.dh5file import DH5File
+from dh5io.synthetic import SyntheticConfig, generate_session
+from dh5io.validation import validate
+
+
+def test_generate_session(tmp_path):
+    config = SyntheticConfig(
+        n_cont=2, n_channels=3, n_regions=4, region_duration_s=2.0, block_samples=500
+    )
+    # spike blocks are limited to the memory of a CONT block
+    assert config.spike_block_spikes == 500 // 32
+    filename = generate_session(tmp_path / "synthetic.dh5", config)
+
+    report = validate(filename, "deep")
+    assert report.ok, report.errors
+
+    with DH5File(filename) as dh5file:
+        assert dh5file.get_cont_group_ids() == [1, 2]
+        data = dh5file.get_cont_data_dataset_by_id(1)
+        assert data.shape == (4 * 2000, 3)
+        assert config.cont_nbytes == 2 * data.size * 2
+        index = dh5file.get_cont_group_by_id(1)["INDEX"][()]
+        # one second gaps between regions
+        np.testing.assert_array_equal(np.diff(index["time"]), 3_000_000_000)
+
+        spikes = dh5file.get_spike_group_by_id(0)
+        times = spikes["INDEX"][()]
+        assert np.all(np.diff(times) >= 0)
+        assert set(np.unique(spikes["CLUSTER_INFO"][()])) <= {0, 1, 2}
+
+        trialmap = dh5file.get_trialmap()
+        assert len(trialmap) == 4
+        assert set(dh5file.get_markers()) == {"fixation", "stimulus", "response"}
+        assert len(dh5file.get_events_dataset()) == 4 * 5
+
+
+def test_for_size():
+    config = SyntheticConfig.for_size(10 * 2**20, n_channels=8)
+    assert abs(config.cont_nbytes - 10 * 2**20) < 1024
@@ -0,0 +1,143 @@
+import h5py
+import numpy as np
+import pytest
+import dh5io.cont as cont
+import dh5io.validation as validation
+from dh5io.create import create_dh_file
+from dh5io.markers import add_marker_to_file
+from dh5io.trialmap import add_trialmap_to_file
+from dh5io.validation import ValidationLevel, scan_data, validate
+from dhspec.cont import CHANNELS_DTYPE
+from dhspec.spike import SPIKE_PARAMS_DTYPE
+from dhspec.trialmap import TRIALMAP_DATASET_DTYPE
+
+
+def create_file(filename, data: np.ndarray, index: np.ndarray | None = None):
+    if index is None:
+        index = cont.create_empty_index_array(1)
+    with create_dh_file(filename, boards=["board"]) as dh5file:
+        cont.create_cont_group_from_data_in_file(
+            dh5file.file,
+            1,
+            data=data,
+            index=index,
+            sample_period_ns=1_000_000,
+            calibration=np.ones(data.shape[1]),
+            channels=np.zeros(data.shape[1], dtype=CHANNELS_DTYPE),
+        )
+        trialmap = np.rec.array(
+            [(1, 1, 0, 0, 10), (2, 1, 0, 20, 30)], dtype=TRIALMAP_DATASET_DTYPE
+        )
+        add_trialmap_to_file(dh5file.file, trialmap)
+        add_marker_to_file(dh5file.file, "m", np.array([1, 2, 3], dtype=np.int64))
+
+
+def test_valid_file_at_all_levels(tmp_path):
+    filename = tmp_path / "test.dh5"
+    create_file(filename, np.ones((100, 2), dtype=np.int16))
+    for level in ValidationLevel:
+        report = validate(filename, level)
+        assert report.ok, report.errors
+        assert report.warnings == []
+        assert report.level == level
+    checks = {c.check for c in validate(filename, "deep").checks}
+    assert {"cont_group", "cont_index", "cont_data_scan", "trialmap_times"} <= checks
+    assert "cont_data_scan" not in {c.check for c in validate(filename, "quick").checks}
+
+
+def test_report_to_dict(tmp_path):
+    filename = tmp_path / "test.dh5"
+    create_file(filename, np.ones((10, 2), dtype=np.int16))
+    d = validate(filename, "quick").to_dict()
+    assert d["level"] == "quick"
+    assert d["ok"] is True
+    assert all("duration_s" in c for c in d["checks"])
+
+
+def test_invalid_cont_index(tmp_path):
+    filename = tmp_path / "test.dh5"
+    index = cont.create_empty_index_array(3)
+    index["offset"] = [0, 50, 40]
+    index["time"] = [0, 100_000_000, 200_000_000]
+    create_file(filename, np.ones((100, 2), dtype=np.int16), index)
+
+    assert validate(filename, "quick").ok
+    report = validate(filename, "standard")
+    assert not report.ok
+    assert "not strictly increasing" in report.errors[0].message
+
+
+def test_overlapping_cont_regions(tmp_path):
+    filename = tmp_path / "test.dh5"
+    index = cont.create_empty_index_array(2)
+    index["offset"] = [0, 50]
+    # 50 samples at 1 ms end at 50 ms, second region starts at 40 ms
+    index["time"] = [0, 40_000_000]
+    create_file(filename, np.ones((100, 2), dtype=np.int16), index)
+    report = validate(filename, "standard")
+    assert "start before the previous region ends" in report.errors[0].message
+
+
+def test_unordered_trialmap_and_markers(tmp_path):
+    filename = tmp_path / "test.dh5"
+    create_file(filename, np.ones((10, 2), dtype=np.int16))
+    with create_dh_file(filename, overwrite=True) as dh5file:
+        trialmap = np.rec.array(
+            [(1, 1, 0, 20, 30), (2, 1, 0, 0, 10)], dtype=TRIALMAP_DATASET_DTYPE
+        )
+        add_trialmap_to_file(dh5file.file, trialmap)
+        add_marker_to_file(dh5file.file, "m", np.array([3, 2, 1], dtype=np.int64))
+
+    report = validate(filename, "standard")
+    messages = [e.message for e in report.errors]
+    assert "Trials in TRIALMAP are not ordered by StartTime" in messages
+    assert "Timestamps of marker 'm' are not sorted" in messages
+
+
+def test_spike_group_shape(tmp_path):
+    filename = tmp_path / "test.dh5"
+    create_file(filename, np.ones((10, 2), dtype=np.int16))
+    with create_dh_file(filename, overwrite=True) as dh5file:
+        spike_group = dh5file.file.create_group("SPIKE0")
+        spike_group.attrs["SpikeParams"] = np.array((32, 8, 10), dtype=SPIKE_PARAMS_DTYPE)
+        spike_group.attrs["SamplePeriod"] = np.int32(40_000)
+        spike_group.create_dataset("DATA", data=np.zeros((32 * 3 - 1, 1), dtype=np.int16))
+        spike_group.create_dataset("INDEX", data=np.array([1, 2, 3], dtype=np.int64))
+
+    report = validate(filename, "quick")
+    assert "spikeSamples x nSpikes = 32 x 3" in report.errors[0].message
+
+
+def test_deep_scan_saturation_and_zero_runs(tmp_path, monkeypatch):
+    # small blocks to check zero runs across block boundaries
+    monkeypatch.setattr(validation, "DEEP_SCAN_BLOCK_BYTES", 4 * 7)
+    filename = tmp_path / "test.dh5"
+    data = np.ones((4000, 2), dtype=np.int16)
+    data[10:1500] = 0
+    data[2000:2100] = 0
+    data[3000, 1] = 32767
+    data[3001, 0] = -32768
+    data[3990:] = 0
+    create_file(filename, data)
+
+    report = validate(filename, "deep", zero_run_s=1.0)
+    assert report.ok
+    messages = [w.message for w in report.warnings]
+    assert "2 saturated samples in /CONT1/DATA" in messages
+    assert any("1 all-zero stretches" in m and "longest 1490" in m for m in messages)
+
+
+def test_deep_scan_reports_checksum_errors(tmp_path):
+    filename = tmp_path / "test.h5"
+    pattern = np.arange(1000, 1000 + 64 * 2, dtype=np.int16).reshape(64, 2)
+    with h5py.File(filename, "w") as f:
+        f.create_dataset("DATA", data=pattern, chunks=(64, 2), fletcher32=True)
+    content = bytearray(filename.read_bytes())
+    position = content.find(pattern.tobytes())
+    assert position >= 0
+    content[position] ^= 0xFF
+    filename.write_bytes(bytes(content))
+
+    with h5py.File(filename, "r") as f:
+        with pytest.raises(validation.DH5Error, match="could not be read"):
+            scan_data(f["DATA"])
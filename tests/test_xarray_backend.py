@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from dh5io.dh5file import DH5File
+from dh5io.iostats import measure_io
+
+xr = pytest.importorskip("xarray")
+
+
+def test_open_dataset(session):
+    ds = xr.open_dataset(session, engine="dh5")
+    assert ds["CONT1"].dims == ("CONT1_time", "CONT1_channel")
+    assert ds["CONT1"].shape == (3000, 3)
+    assert ds["CONT1"].attrs["SamplePeriod"] == 1_000_000
+    assert ds["CONT1_time"].attrs["units"] == "s"
+    assert list(ds["CONT2_GlobalChanNumber"].values) == [200, 201, 202]
+    assert ds.sizes["trial"] == 3
+    assert set(ds["SPIKE0_counts"].dims) == {"trial", "SPIKE0_cluster_id"}
+    assert int(ds["SPIKE0_counts"].sum()) == ds.sizes["SPIKE0_spike"]
+    assert ds.sizes["marker_stimulus"] == 3
+
+    with DH5File(session) as dh5file:
+        expected = dh5file.get_calibrated_cont_data_by_id(1)
+        np.testing.assert_allclose(ds["CONT1"].values, expected)
+        np.testing.assert_array_equal(ds["CONT1_time"].values, dh5file.cont[1].times() * 1e-9)
+
+    raw = xr.open_dataset(session, engine="dh5", calibrated=False, drop_variables=["CONT2"])
+    assert raw["CONT1"].dtype == np.int16
+    assert "CONT2" not in raw and "CONT2_time" not in raw.coords
+
+
+def test_time_index_is_lazy(session):
+    from dh5io.xarray_backend import ContTimeIndex
+
+    ds = xr.open_dataset(session, engine="dh5")
+    assert isinstance(ds.xindexes["CONT1_time"], ContTimeIndex)
+
+    # slices keep the lazy index, positions are relative to the slice
+    window = ds.isel(CONT1_time=slice(990, 1010))
+    assert isinstance(window.xindexes["CONT1_time"], ContTimeIndex)
+    np.testing.assert_allclose(window["CONT1_time"].values[[0, 10]], [0.99, 1.5])
+    assert window.sel(CONT1_time=slice(1.5, None)).sizes["CONT1_time"] == 10
+
+    # labels in the gap between the regions at 0.999 s and 1.5 s
+    nearest = ds["CONT1"].sel(CONT1_time=[1.2, 1.3], method="nearest")
+    np.testing.assert_allclose(nearest["CONT1_time"].values, [0.999, 1.5])
+    with pytest.raises(KeyError):
+        ds["CONT1"].sel(CONT1_time=1.2)
+    assert float(ds["CONT1"].sel(CONT1_time=1.501)["CONT1_time"]) == pytest.approx(1.501)
+
+
+def test_sel_reads_only_hyperslab(session):
+    ds = xr.open_dataset(session, engine="dh5")
+    # second region runs from 1.5 s to 2.5 s (1 s region + 0.5 s gap)
+    with measure_io(log_level=None) as stats:
+        window = ds["CONT1"].sel(CONT1_time=slice(2.0, 2.0995)).isel(CONT1_channel=[0, 2])
+        values = window.values
+    assert values.shape == (100, 2)
+    assert stats.read_calls == 1
+    assert stats.bytes_requested == 100 * 3 * 2